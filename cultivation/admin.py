@@ -1,5 +1,13 @@
-from django.contrib import admin
-from .models import Environment, Lighting, Plant
+from collections import Counter
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.db.models import Count
+
+from . import cache, events
+from .managers import strain_key
+from .models import Environment, Lighting, Plant, Stage, Strain
 
 
 @admin.register(Lighting)
@@ -26,12 +34,120 @@ class EnvironmentAdmin(admin.ModelAdmin):
     def get_dimensions(self, obj):
         return f"{obj.height} x {obj.width} x {obj.depth}"
 
+class StrainAdminForm(forms.ModelForm):
+
+    class Meta:
+        model = Strain
+        fields = ('name',)
+
+    def clean_name(self):
+        # A chave (única e fora do formulário) é calculada no save(): sem isto um nome que só
+        # difere em maiúsculas, acentos ou espaços terminaria num IntegrityError
+        name = self.cleaned_data['name']
+        existing = Strain.objects.filter(key=strain_key(name)).exclude(pk=self.instance.pk).first()
+        if existing is not None:
+            raise forms.ValidationError(f'Já existe a variedade "{existing.name}" com esse nome.')
+        return name
+
+
+@admin.register(Strain)
+class StrainAdmin(admin.ModelAdmin):
+    form = StrainAdminForm
+    list_display = ('name', 'plant_count', 'created_at')
+    search_fields = ('name', 'key')
+
+    def get_queryset(self, request):
+        # Contagem agrupada pelo id da variedade (inteiro), num único SELECT
+        return super().get_queryset(request).annotate(plant_count=Count('plants'))
+
+    @admin.display(description="Plantas", ordering='plant_count')
+    def plant_count(self, obj):
+        return obj.plant_count
+
+class PlantActionForm(ActionForm):
+    """Parâmetros das ações em massa de plantas (ambiente, estágio e número de cópias)."""
+    environment = forms.ModelChoiceField(Environment.objects.select_related('owner'), required=False,
+                                         label="Ambiente")
+    stage = forms.ModelChoiceField(Stage.objects.select_related('owner'), required=False, label="Estágio")
+    copies = forms.IntegerField(min_value=1, max_value=200, required=False, label="Cópias")
+
+
 @admin.register(Plant)
 class PlantAdmin(admin.ModelAdmin):
     list_display = ('name', 'strain', 'owner', 'environment', 'stage', 'germination_date', 'is_active')
     list_filter = ('stage', 'is_active', 'owner', 'environment')
-    search_fields = ('name', 'strain', 'owner__email')
+    search_fields = ('name', 'strain__name', 'owner__email')
+    autocomplete_fields = ('strain',)
+    action_form = PlantActionForm
+    actions = ['move_to_environment', 'set_stage', 'activate', 'deactivate', 'clone']
 
     def get_queryset(self, request):
         # Otimiza a consulta para evitar múltiplas buscas ao banco de dados
-        return super().get_queryset(request).select_related('owner', 'environment')
\ No newline at end of file
+        return super().get_queryset(request).select_related('owner', 'environment', 'strain')
+
+    # As ações em massa são um único UPDATE (ou bulk_create), como na lista de plantas do site;
+    # nenhuma delas dispara sinais, então o cache e os eventos ao vivo dos donos afetados
+    # são tratados aqui.
+
+    def _action_value(self, request, name):
+        form = self.action_form(request.POST)
+        form.is_valid()
+        return form.cleaned_data.get(name)
+
+    def _invalidate(self, owner_ids):
+        for owner_id in owner_ids:
+            cache.bump('plant', owner_id)
+
+    def _update_for_owner(self, request, queryset, field, target, event):
+        """Aplica `field = target` só às plantas do mesmo dono do ambiente/estágio escolhido."""
+        if target is None:
+            label = self.action_form.base_fields[field].label.lower()
+            self.message_user(request, f"Escolha o {label} no campo ao lado da ação.", messages.ERROR)
+            return
+        skipped = queryset.exclude(owner_id=target.owner_id).count()
+        plants = queryset.filter(owner_id=target.owner_id)
+        pks = list(plants.values_list('pk', flat=True))
+        updated = plants.update_with_timestamp(**{field: target})
+        if updated:
+            self._invalidate([target.owner_id])
+            events.publish_on_commit(target.owner_id, event, {'plants': pks, field: events.related(target)})
+        self.message_user(request, f"{updated} planta(s) atualizada(s).")
+        if skipped:
+            self.message_user(request, f"{skipped} planta(s) de outros usuários ignorada(s).", messages.WARNING)
+
+    @admin.action(description="Mover as plantas selecionadas para o ambiente")
+    def move_to_environment(self, request, queryset):
+        self._update_for_owner(
+            request, queryset, 'environment', self._action_value(request, 'environment'), events.PLANT_MOVED,
+        )
+
+    @admin.action(description="Mudar o estágio das plantas selecionadas")
+    def set_stage(self, request, queryset):
+        self._update_for_owner(request, queryset, 'stage', self._action_value(request, 'stage'), events.PLANT_STAGE)
+
+    def _set_active(self, request, queryset, active):
+        owner_ids = set(queryset.values_list('owner_id', flat=True))
+        updated = queryset.update_with_timestamp(is_active=active)
+        self._invalidate(owner_ids)
+        self.message_user(request, f"{updated} planta(s) atualizada(s).")
+
+    @admin.action(description="Marcar as plantas selecionadas como ativas")
+    def activate(self, request, queryset):
+        self._set_active(request, queryset, True)
+
+    @admin.action(description="Marcar as plantas selecionadas como inativas")
+    def deactivate(self, request, queryset):
+        self._set_active(request, queryset, False)
+
+    @admin.action(description="Clonar as plantas selecionadas")
+    def clone(self, request, queryset):
+        copies = self._action_value(request, 'copies')
+        if not copies:
+            self.message_user(request, "Informe o número de cópias no campo ao lado da ação.", messages.ERROR)
+            return
+        clones = queryset.clone(copies)
+        created = Counter(plant.owner_id for plant in clones)
+        self._invalidate(created)
+        for owner_id, count in created.items():
+            events.publish_on_commit(owner_id, events.PLANT_CREATED, {'count': count})
+        self.message_user(request, f"{len(clones)} cópia(s) criada(s).")
\ No newline at end of file
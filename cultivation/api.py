@@ -0,0 +1,247 @@
+# cultivation/api.py
+
+"""
+API JSON (v1) de plantas, ambientes, estágios, luzes e variedades.
+
+- Somente leitura, autenticada pela sessão e restrita aos dados do usuário
+  (luzes e variedades são catálogos globais, servidos da memória; das
+  variedades, só as que o usuário usa).
+- ?fields=a,b escolhe os campos: só essas colunas são selecionadas e a
+  resposta é montada direto dos dicionários do values(), sem instanciar modelos.
+- Paginação por cursor: ?cursor= recebe o "next" da página anterior e
+  ?limit= vai até MAX_LIMIT itens por página.
+- ETag calculado só das versões do cache (cache.py), sem tocar no banco:
+  If-None-Match com a mesma ETag responde 304 sem nenhuma consulta.
+- As listas são transmitidas (StreamingHttpResponse) em blocos, lidos do
+  banco com iterator(), então a memória não cresce com o tamanho da página
+  (também sob ASGI, veja streaming.py).
+"""
+
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views import View
+
+from . import cache
+from .catalog import lighting as lighting_catalog, strains as strain_catalog
+from .models import Environment, Plant, Stage
+from .pagination import InvalidCursor, encode_cursor, keyset_queryset
+from .streaming import streaming_response
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 10000
+CHUNK_SIZE = 2000
+
+_encoder = DjangoJSONEncoder(separators=(',', ':'), ensure_ascii=False)
+
+
+class ApiError(Exception):
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def error_response(message, status):
+    return JsonResponse({'detail': message}, status=status, json_dumps_params={'ensure_ascii': False})
+
+
+def parse_fields(request, allowed, default):
+    """Campos pedidos em ?fields=, validados contra a lista da rota."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default)
+    fields = list(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in allowed]
+    if unknown or not fields:
+        raise ApiError(f"Campos desconhecidos: {', '.join(unknown) or raw}. Disponíveis: {', '.join(allowed)}.")
+    return fields
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError("limit precisa ser um número inteiro.")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f"limit precisa estar entre 1 e {MAX_LIMIT}.")
+    return limit
+
+
+def etag_for(request, owner_id, scopes):
+    versions = cache.get_versions(owner_id, scopes)
+    raw = f'{request.path}?{request.GET.urlencode()}|{owner_id}|{versions}'
+    return '"' + hashlib.md5(raw.encode()).hexdigest() + '"'
+
+
+def not_modified(request, etag):
+    header = request.headers.get('If-None-Match', '')
+    return etag in (tag.strip() for tag in header.split(',')) or header.strip() == '*'
+
+
+class ApiView(View):
+    """Base das rotas da API: autenticação, erros em JSON e ETag por versões do cache."""
+    http_method_names = ['get', 'head', 'options']
+    # Escopos de cache.py cujas versões compõem a ETag
+    scopes = ()
+    owner_scoped = True
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response("Autenticação necessária.", 401)
+        owner_id = request.user.pk if self.owner_scoped else None
+        etag = etag_for(request, owner_id, self.scopes)
+        if request.method in ('GET', 'HEAD') and not_modified(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            try:
+                response = super().dispatch(request, *args, **kwargs)
+            except ApiError as exc:
+                return error_response(str(exc), exc.status)
+        response['ETag'] = etag
+        # A resposta depende da sessão (usuário) e não pode ser reaproveitada entre usuários
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Cookie'
+        return response
+
+
+class ResourceView(ApiView):
+    """
+    Lista (sem pk) e detalhe (com pk) de um modelo do usuário.
+    `fields` são nomes de colunas (as FKs aparecem como <campo>_id).
+    """
+    model = None
+    fields = ()
+    default_fields = ()
+    # Ordenação da lista; termina no 'id' para o cursor ser exato
+    ordering = ('id',)
+
+    def get_queryset(self):
+        return self.model.objects.filter(owner=self.request.user)
+
+    def get(self, request, pk=None):
+        fields = parse_fields(request, self.fields, self.default_fields)
+        if pk is not None:
+            obj = self.get_queryset().filter(pk=pk).values(*fields).first()
+            if obj is None:
+                return error_response("Não encontrado.", 404)
+            return JsonResponse(obj, json_dumps_params={'ensure_ascii': False})
+        limit = parse_limit(request)
+        cursor = request.GET.get('cursor')
+        # Os campos da ordenação entram na consulta para montar o cursor, mas só
+        # aparecem na resposta se foram pedidos
+        keys = [name.lstrip('-') for name in self.ordering]
+        columns = list(dict.fromkeys(fields + keys))
+        hidden = [name for name in columns if name not in fields]
+        try:
+            queryset = keyset_queryset(self.get_queryset().values(*columns), self.ordering, cursor)
+        except InvalidCursor as exc:
+            return error_response(str(exc), 400)
+        return streaming_response(
+            request, self.stream(queryset[:limit + 1], limit, hidden), content_type='application/json',
+        )
+
+    def stream(self, queryset, limit, hidden):
+        """Gera '{"results":[...],"next":...}' em blocos de até CHUNK_SIZE itens."""
+        yield '{"results":['
+        separator = ''
+        chunk = []
+        sent = 0
+        last = next_cursor = None
+        for row in queryset.iterator(chunk_size=CHUNK_SIZE):
+            if sent == limit:
+                # A linha extra só indica que há uma próxima página
+                next_cursor = encode_cursor(last, self.ordering)
+                break
+            last = row
+            if hidden:
+                row = {key: value for key, value in row.items() if key not in hidden}
+            chunk.append(_encoder.encode(row))
+            sent += 1
+            if len(chunk) >= CHUNK_SIZE:
+                yield separator + ','.join(chunk)
+                separator, chunk = ',', []
+        if chunk:
+            yield separator + ','.join(chunk)
+        yield '],"next":' + json.dumps(next_cursor) + '}'
+
+
+class PlantApiView(ResourceView):
+    model = Plant
+    # Excluir um ambiente ou estágio zera a FK das plantas sem disparar post_save nelas
+    scopes = ('plant', 'environment', 'stage')
+    fields = (
+        'id', 'name', 'strain_id', 'germination_date', 'is_active', 'environment_id', 'stage_id',
+        'created_at', 'updated_at',
+    )
+    default_fields = fields
+    ordering = ('-germination_date', 'name', 'id')
+
+
+class EnvironmentApiView(ResourceView):
+    model = Environment
+    scopes = ('environment',)
+    fields = (
+        'id', 'name', 'height', 'width', 'depth', 'light_exposure_hours', 'is_active', 'created_at',
+    )
+    default_fields = fields
+
+
+class StageApiView(ResourceView):
+    model = Stage
+    scopes = ('stage',)
+    fields = ('id', 'name', 'light_hours_on', 'duration', 'duration_unit')
+    default_fields = fields
+
+
+class LightingApiView(ApiView):
+    """Catálogo global de luzes, servido da memória (catalog.py), sem paginação."""
+    scopes = (cache.LIGHTING,)
+    owner_scoped = False
+    fields = ('id', 'light_type', 'watts', 'label')
+
+    def get(self, request, pk=None):
+        fields = parse_fields(request, self.fields, self.fields)
+
+        def serialize(light):
+            row = {'id': light.pk, 'light_type': light.light_type, 'watts': light.watts, 'label': str(light)}
+            return {name: row[name] for name in fields}
+
+        if pk is not None:
+            light = lighting_catalog.get(pk)
+            if light is None:
+                return error_response("Não encontrado.", 404)
+            return JsonResponse(serialize(light), json_dumps_params={'ensure_ascii': False})
+        return JsonResponse(
+            {'results': [serialize(light) for light in lighting_catalog.all()], 'next': None},
+            json_dumps_params={'ensure_ascii': False},
+        )
+
+
+class StrainApiView(ApiView):
+    """
+    Variedades das plantas do usuário, servidas do catálogo em memória (catalog.py), sem
+    paginação. Os nomes são digitados livremente: as variedades dos outros não aparecem.
+    """
+    scopes = ('plant', cache.STRAIN)
+    fields = ('id', 'name')
+
+    def get(self, request, pk=None):
+        fields = parse_fields(request, self.fields, self.fields)
+        used = strain_catalog.used_by(request.user.pk)
+
+        def serialize(strain):
+            row = {'id': strain.pk, 'name': strain.name}
+            return {name: row[name] for name in fields}
+
+        if pk is not None:
+            strain = strain_catalog.get(pk) if pk in used else None
+            if strain is None:
+                return error_response("Não encontrado.", 404)
+            return JsonResponse(serialize(strain), json_dumps_params={'ensure_ascii': False})
+        return JsonResponse(
+            {'results': [serialize(strain) for strain in strain_catalog.all() if strain.pk in used], 'next': None},
+            json_dumps_params={'ensure_ascii': False},
+        )
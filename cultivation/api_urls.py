@@ -0,0 +1,19 @@
+# cultivation/api_urls.py
+
+from django.urls import path
+from . import api
+
+app_name = 'api'
+
+urlpatterns = [
+    path('plants/', api.PlantApiView.as_view(), name='plant_list'),
+    path('plants/<int:pk>/', api.PlantApiView.as_view(), name='plant_detail'),
+    path('environments/', api.EnvironmentApiView.as_view(), name='environment_list'),
+    path('environments/<int:pk>/', api.EnvironmentApiView.as_view(), name='environment_detail'),
+    path('stages/', api.StageApiView.as_view(), name='stage_list'),
+    path('stages/<int:pk>/', api.StageApiView.as_view(), name='stage_detail'),
+    path('lighting/', api.LightingApiView.as_view(), name='lighting_list'),
+    path('lighting/<int:pk>/', api.LightingApiView.as_view(), name='lighting_detail'),
+    path('strains/', api.StrainApiView.as_view(), name='strain_list'),
+    path('strains/<int:pk>/', api.StrainApiView.as_view(), name='strain_detail'),
+]
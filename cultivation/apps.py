@@ -1,6 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def restore_search_triggers(using, **kwargs):
+    # Uma migração que reconstrói cultivation_plant (ou outra tabela indexada) no SQLite
+    # apaga os triggers da busca junto com a tabela antiga
+    from django.db import connections
+    from django.db.migrations.loader import MigrationLoader
+    from . import search
+    connection = connections[using]
+    # Os triggers são os do esquema atual: num banco migrado só até uma migração
+    # anterior (migrate cultivation 0006) eles se referem a colunas que não existem
+    loader = MigrationLoader(connection, ignore_no_migrations=True)
+    if not set(loader.graph.leaf_nodes('cultivation')) <= set(loader.applied_migrations):
+        return
+    search.install(connection, create_tables=False)
 
 
 class CultivationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cultivation'
+
+    def ready(self):
+        # Conecta a invalidação do cache de fragmentos
+        from . import signals  # noqa: F401
+        post_migrate.connect(restore_search_triggers, sender=self, dispatch_uid='cultivation_search_triggers')
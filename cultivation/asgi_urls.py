@@ -0,0 +1,28 @@
+# cultivation/asgi_urls.py
+
+"""
+Rotas do cultivo no modo ASGI: as mesmas de urls.py (nomes e endereços), com as
+listas e os detalhes de plantas e ambientes trocados pelas views de async_views.py,
+mais o fluxo de eventos ao vivo, que só existe aqui.
+"""
+
+from django.urls import path
+
+from . import async_views
+from .urls import app_name, urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'environment_list': async_views.EnvironmentListView,
+    'environment_detail': async_views.EnvironmentDetailView,
+    'plant_list': async_views.PlantListView,
+    'plant_detail': async_views.PlantDetailView,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+] + [
+    # Eventos ao vivo (Server-Sent Events) das plantas e ambientes do usuário; só no ASGI
+    path('events/', async_views.EventStreamView.as_view(), name='event_stream'),
+]
@@ -0,0 +1,283 @@
+# cultivation/async_views.py
+
+"""
+Versões assíncronas das listas e dos detalhes de plantas e ambientes, servidas
+no modo ASGI (growplant/asgi.py troca as rotas pelas de cultivation/asgi_urls.py),
+e o fluxo de eventos ao vivo (Server-Sent Events, veja events.py).
+
+Mesmas páginas, mesmo cache de fragmentos e mesma ETag das views de views.py,
+mas as consultas usam o ORM assíncrono (aget, afirst, aaggregate, aiterator),
+o cache é lido pela API assíncrona (aget_fragment, apage_etag...) e a
+requisição não prende uma thread enquanto espera o banco.
+
+A renderização dos templates continua síncrona e vai para uma thread com
+sync_to_async: os cards leem os catálogos em memória (catalog.py), que podem
+se recarregar do banco no meio da renderização. O painel de telemetria do
+ambiente (rollups.series) também é síncrono e vai junto.
+"""
+
+import asyncio
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from django.utils.safestring import mark_safe
+from django.views import View
+
+from . import cache, events
+from .catalog import strains as strain_catalog
+from .forms import JournalEntryForm
+from .mixins import ConditionalGetMixin, apage_etag
+from .models import Environment, Plant
+from .pagination import InvalidCursor, KeysetPage, apaginate_keyset
+from . import views
+
+
+async def render(request, template_name, context):
+    """Renderiza o template numa thread (veja o docstring do módulo) e devolve a resposta."""
+    html = await sync_to_async(render_to_string)(template_name, context, request)
+    return HttpResponse(html)
+
+
+def render_cards(template_name, context):
+    """Renderiza os cards com o catálogo de variedades fixado (uma conferência da versão para todos)."""
+    with strain_catalog.pinned():
+        return render_to_string(template_name, context)
+
+
+class AsyncLoginRequiredMixin:
+    """LoginRequiredMixin para views assíncronas: o usuário vem de request.auser()."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        # O request.user preguiçoso buscaria o usuário de novo (e de forma síncrona) no template
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncConditionalGetMixin:
+    """ConditionalGetMixin com o validador da ETag lido pelo ORM assíncrono."""
+    conditional_scopes = ConditionalGetMixin.conditional_scopes
+
+    async def get_validator_parts(self):
+        """Partes da ETag além das versões; None desliga o GET condicional."""
+        return ()
+
+    async def get_etag(self, request):
+        # A sessão já foi carregada por request.auser(): as mensagens não consultam o banco
+        if len(messages.get_messages(request)):
+            return None
+        validator = await self.get_validator_parts()
+        return None if validator is None else await apage_etag(request, self.conditional_scopes, validator)
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await super().dispatch(request, *args, **kwargs)
+        etag = await self.get_etag(request)
+        response = None
+        if etag is not None:
+            response = get_conditional_response(request, etag=quote_etag(etag))
+        if response is None:
+            response = await super().dispatch(request, *args, **kwargs)
+        if etag is not None and response.status_code in (200, 304):
+            response.headers.setdefault('ETag', quote_etag(etag))
+        # A página depende da sessão: nada de cache compartilhado, e sempre revalidar
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class AsyncFragmentCachedListView(View):
+    """
+    Lista paginada por cursor com os cards no cache de fragmentos, como
+    FragmentCachedListMixin + KeysetPaginationMixin: num acerto não há consulta.
+    """
+    model = None
+    template_name = None
+    context_object_name = None
+    paginate_by = 50
+    keyset_ordering = ('pk',)
+    cursor_kwarg = 'cursor'
+    fragment_name = None
+    fragment_template = None
+    fragment_scopes = ()
+
+    def get_queryset(self):
+        """Os registros do usuário em `model` (a ordem é a de keyset_ordering)."""
+        return self.model._default_manager.filter(owner=self.request.user)
+
+    def get_fragment_key_parts(self):
+        return ()
+
+    async def get_context_data(self, **kwargs):
+        return kwargs
+
+    async def get(self, request, *args, **kwargs):
+        cursor = request.GET.get(self.cursor_kwarg, '')
+        key = await cache.afragment_key(
+            self.fragment_name, request.user.pk, self.fragment_scopes, cursor, *self.get_fragment_key_parts(),
+        )
+        cached = await cache.aget_fragment(key)
+        if cached is not None:
+            status = 'hit'
+            page = KeysetPage([], next_cursor=cached['next_cursor'], cursor=cursor or None)
+            html = mark_safe(cached['html'])
+        else:
+            status = 'miss'
+            try:
+                page = await apaginate_keyset(self.get_queryset(), self.keyset_ordering, cursor, self.paginate_by)
+            except InvalidCursor as exc:
+                raise Http404(str(exc))
+            html = mark_safe(await sync_to_async(render_cards)(
+                self.fragment_template, {self.context_object_name: page.object_list, 'page_obj': page},
+            ))
+            await cache.aset_fragment(key, {'html': str(html), 'next_cursor': page.next_cursor})
+
+        context = await self.get_context_data(
+            view=self, page_obj=page, is_paginated=page.has_other_pages(), object_list=page.object_list,
+            fragment_html=html, **{self.context_object_name: page.object_list},
+        )
+        response = await render(request, self.template_name, context)
+        response['X-Fragment-Cache'] = status
+        return response
+
+
+class EnvironmentListView(AsyncLoginRequiredMixin, AsyncFragmentCachedListView):
+    model = Environment
+    template_name = views.EnvironmentListView.template_name
+    context_object_name = views.EnvironmentListView.context_object_name
+    paginate_by = views.EnvironmentListView.paginate_by
+    fragment_name = views.EnvironmentListView.fragment_name
+    fragment_template = views.EnvironmentListView.fragment_template
+    fragment_scopes = views.EnvironmentListView.fragment_scopes
+
+
+class EnvironmentDetailView(AsyncLoginRequiredMixin, View):
+    template_name = views.EnvironmentDetailView.template_name
+
+    async def get(self, request, pk):
+        try:
+            environment = await Environment.objects.aget(owner=request.user, pk=pk)
+        except Environment.DoesNotExist:
+            raise Http404("Nenhum ambiente encontrado.")
+        context = await sync_to_async(views.environment_detail_context)(environment, request.GET.get('days'))
+        return await render(request, self.template_name, {
+            'view': self, 'object': environment, 'environment': environment, **context,
+        })
+
+
+class PlantListView(AsyncLoginRequiredMixin, AsyncConditionalGetMixin, AsyncFragmentCachedListView):
+    model = Plant
+    template_name = views.PlantListView.template_name
+    context_object_name = views.PlantListView.context_object_name
+    paginate_by = views.PlantListView.paginate_by
+    keyset_ordering = views.PlantListView.keyset_ordering
+    fragment_name = views.PlantListView.fragment_name
+    fragment_template = views.PlantListView.fragment_template
+    fragment_scopes = views.PlantListView.fragment_scopes
+
+    async def get_validator_parts(self):
+        last = await Plant.objects.filter(owner=self.request.user).aaggregate(last=Max('updated_at'))
+        return (last['last'],)
+
+    def get_fragment_key_parts(self):
+        # Os cards mostram a idade das plantas, que muda à meia-noite
+        return (datetime.date.today(),)
+
+    def get_queryset(self):
+        return (
+            Plant.objects.filter(owner=self.request.user)
+            .select_related('environment', 'stage')
+            .with_age()
+        )
+
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+        context['bulk_form_html'] = await sync_to_async(views.plant_bulk_form_html)(self.request.user)
+        return context
+
+
+class PlantDetailView(AsyncLoginRequiredMixin, AsyncConditionalGetMixin, View):
+    template_name = views.PlantDetailView.template_name
+    journal_ordering = views.PlantDetailView.journal_ordering
+    journal_page_size = views.PlantDetailView.journal_page_size
+
+    async def get_validator_parts(self):
+        updated_at = await (
+            Plant.objects.filter(owner=self.request.user, pk=self.kwargs['pk'])
+            .order_by().values_list('updated_at', flat=True).afirst()
+        )
+        return None if updated_at is None else (updated_at,)
+
+    async def get(self, request, pk):
+        try:
+            plant = await (
+                Plant.objects.filter(owner=request.user)
+                .select_related('environment', 'stage').with_age().aget(pk=pk)
+            )
+        except Plant.DoesNotExist:
+            raise Http404("Nenhuma planta encontrada.")
+        try:
+            journal_page = await apaginate_keyset(
+                plant.journal_entries.all(), self.journal_ordering, request.GET.get('cursor'),
+                self.journal_page_size,
+            )
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        return await render(request, self.template_name, {
+            'view': self, 'object': plant, 'plant': plant,
+            'journal_page': journal_page, 'journal_form': JournalEntryForm(),
+        })
+
+
+class EventStreamView(AsyncLoginRequiredMixin, View):
+    """
+    Fluxo text/event-stream com os eventos do usuário (events.py). Só existe no
+    modo ASGI: no WSGI cada conexão aberta prenderia uma thread do servidor.
+
+    Depois do login não há mais consultas: a conexão parada só espera a fila,
+    acordando a cada `heartbeat` segundos para um comentário que mantém proxies
+    e o navegador sabendo que ela está viva.
+    """
+    heartbeat = 15  # segundos
+    # Espera do EventSource antes de reconectar, em milissegundos
+    retry = 5000
+
+    async def get(self, request):
+        response = StreamingHttpResponse(
+            self.stream(request.user.pk, request.headers.get('Last-Event-ID')),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # O nginx não deve acumular o fluxo no buffer
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, owner_id, last_event_id=None):
+        # Registrada já dentro do loop que vai consumir a fila; o finally cancela o registro
+        # quando o cliente desconecta (o handler ASGI cancela a resposta)
+        subscription, backlog = events.broker.subscribe(owner_id, last_event_id)
+        try:
+            yield f'retry: {self.retry}\n\n'
+            for event in backlog:
+                yield event.encode()
+            while True:
+                try:
+                    event = await subscription.get(self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield event.encode()
+                if subscription.overflowed:
+                    # Parte dos eventos foi descartada com a fila cheia
+                    subscription.overflowed = False
+                    yield events.broker.reset_event().encode()
+        finally:
+            events.broker.unsubscribe(owner_id, subscription)
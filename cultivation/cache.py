@@ -0,0 +1,148 @@
+# cultivation/cache.py
+
+"""
+Cache de fragmentos HTML por usuário, invalidado por contadores de versão.
+
+Cada usuário tem um contador por escopo ('plant', 'environment', 'stage');
+as fontes de luz e as variedades, que são globais, têm um contador único cada. Os sinais em
+signals.py incrementam o contador do escopo a cada alteração, e a chave de
+um fragmento inclui as versões dos escopos de que ele depende: nada precisa
+ser apagado, as chaves antigas simplesmente deixam de ser lidas e expiram.
+
+Os contadores ficam no cache 'default', compartilhado por todos os processos
+(arquivos, veja settings.CACHES; ou Redis, Memcached...) para que todos vejam
+as mesmas versões.
+
+As views assíncronas (async_views.py) usam as variantes com prefixo 'a'
+(aget_versions, afragment_key, aget_fragment, aset_fragment), que chamam a
+API assíncrona do cache em vez de ler arquivos dentro do loop.
+"""
+
+import hashlib
+import time
+
+from django.core.cache import cache
+
+OWNER_SCOPES = ('plant', 'environment', 'stage')
+LIGHTING = 'lighting'
+STRAIN = 'strain'
+GLOBAL_SCOPES = (LIGHTING, STRAIN)
+FRAGMENT_TIMEOUT = 60 * 60
+
+STATS_KEYS = {'hit': 'cultivation:fragments:hits', 'miss': 'cultivation:fragments:misses'}
+
+
+def version_key(scope, owner_id=None):
+    if scope in GLOBAL_SCOPES:
+        return f'cultivation:version:{scope}'
+    return f'cultivation:version:{scope}:{owner_id}'
+
+
+def _initial_version():
+    # Um valor novo a cada (re)criação do contador: se ele for despejado do cache,
+    # as chaves montadas com o valor antigo nunca mais coincidem
+    return time.time_ns()
+
+
+def get_versions(owner_id, scopes):
+    """Versões atuais dos escopos, na mesma ordem, criando os contadores que faltarem."""
+    keys = [version_key(scope, owner_id) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_version(), timeout=None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return tuple(versions)
+
+
+async def aget_versions(owner_id, scopes):
+    """get_versions com a API assíncrona do cache."""
+    keys = [version_key(scope, owner_id) for scope in scopes]
+    found = await cache.aget_many(keys)
+    versions = []
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, _initial_version(), timeout=None)
+            found[key] = await cache.aget(key)
+        versions.append(found[key])
+    return tuple(versions)
+
+
+def bump(scope, owner_id=None):
+    """Invalida todos os fragmentos que dependem do escopo (do usuário, ou global para luzes e variedades)."""
+    # O relógio em vez de só incr(): no cache em arquivos o incr() é ler e regravar, e
+    # duas invalidações simultâneas em processos diferentes chegariam à mesma versão
+    key = version_key(scope, owner_id)
+    cache.set(key, max(_initial_version(), (cache.get(key) or 0) + 1), timeout=None)
+
+
+def reset_owner(owner_id):
+    """Recomeça os contadores de um usuário novo (o id pode ter sido de uma conta excluída)."""
+    cache.set_many({version_key(scope, owner_id): _initial_version() for scope in OWNER_SCOPES}, timeout=None)
+
+
+def fragment_key(name, owner_id, scopes, *parts):
+    return _fragment_key(name, owner_id, get_versions(owner_id, scopes), parts)
+
+
+async def afragment_key(name, owner_id, scopes, *parts):
+    return _fragment_key(name, owner_id, await aget_versions(owner_id, scopes), parts)
+
+
+def _fragment_key(name, owner_id, versions, parts):
+    versions = '.'.join(str(version) for version in versions)
+    suffix = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'cultivation:fragment:{name}:{owner_id}:{versions}:{suffix}'
+
+
+def get_fragment(key):
+    value = cache.get(key)
+    _count('miss' if value is None else 'hit')
+    return value
+
+
+async def aget_fragment(key):
+    value = await cache.aget(key)
+    await _acount('miss' if value is None else 'hit')
+    return value
+
+
+def set_fragment(key, value, timeout=FRAGMENT_TIMEOUT):
+    cache.set(key, value, timeout=timeout)
+
+
+async def aset_fragment(key, value, timeout=FRAGMENT_TIMEOUT):
+    await cache.aset(key, value, timeout=timeout)
+
+
+def _count(outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def _acount(outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def stats():
+    """Acertos e falhas acumulados do cache de fragmentos."""
+    values = cache.get_many(STATS_KEYS.values())
+    hits = values.get(STATS_KEYS['hit'], 0)
+    misses = values.get(STATS_KEYS['miss'], 0)
+    total = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_ratio': hits / total if total else 0.0}
+
+
+def reset_stats():
+    cache.delete_many(STATS_KEYS.values())
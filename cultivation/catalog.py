@@ -0,0 +1,214 @@
+# cultivation/catalog.py
+
+"""
+Catálogos em memória, por processo: fontes de luz e variedades.
+
+As duas tabelas são pequenas, globais e mudam pouco, mas aparecem em quase
+toda página (formulários, cards, detalhes). Cada catálogo é carregado uma
+vez por processo e recarregado só quando o seu contador de versão em
+cache.py ('lighting' ou 'strain', incrementados pelos sinais dos modelos)
+muda, o que vale para todos os processos que compartilham o cache.
+
+Conferir a versão é uma leitura do cache (um arquivo, no cache padrão): quem
+consulta o catálogo muitas vezes seguidas (a renderização dos cards, a
+exportação e a importação, uma vez por planta) fixa um estado com
+StrainCatalog.pinned() e confere a versão uma vez só.
+
+Os nomes das variedades são digitados livremente por cada usuário: o que é
+mostrado a alguém (autocompletar, API) passa por StrainCatalog.used_by, que
+restringe o catálogo às variedades das plantas daquele usuário.
+"""
+
+import bisect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from . import cache
+from .managers import strain_key
+from .models import Environment, Lighting, Plant, Strain
+
+
+class LightingCatalog:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._lights = ()
+        self._by_pk = {}
+
+    def _current(self):
+        version = cache.get_versions(None, (cache.LIGHTING,))[0]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    lights = tuple(Lighting.objects.all())  # já na ordem de Lighting.Meta.ordering
+                    self._lights, self._by_pk = lights, {light.pk: light for light in lights}
+                    self._version = version
+        return self._lights, self._by_pk
+
+    def all(self):
+        return list(self._current()[0])
+
+    def choices(self):
+        return [(light.pk, str(light)) for light in self._current()[0]]
+
+    def get(self, pk):
+        """Luz pelo pk, ou None se ela não existe."""
+        return self._current()[1].get(pk)
+
+    def watts(self, pks):
+        """Potência total das luzes dadas."""
+        by_pk = self._current()[1]
+        return sum(by_pk[pk].watts for pk in pks if pk in by_pk)
+
+    def for_environment(self, environment):
+        """
+        Luzes de um ambiente: só os ids saem do banco (direto do índice da
+        tabela de ligação), o resto vem do catálogo.
+        """
+        Through = Environment.lighting_system.through
+        pks = set(Through.objects.filter(environment=environment).values_list('lighting_id', flat=True))
+        return [light for light in self._current()[0] if light.pk in pks]
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._lights, self._by_pk = (), {}
+
+
+lighting = LightingCatalog()
+
+
+class CatalogSnapshot:
+    """Estado do StrainCatalog fixado por pinned() (None até a primeira consulta)."""
+    __slots__ = ('state',)
+
+    def __init__(self):
+        self.state = None
+
+
+class StrainCatalog:
+    """
+    Variedades por pk e por nome, com um índice de prefixos para o
+    autocompletar: uma lista ordenada com a chave (strain_key) de cada
+    sufixo que começa numa palavra do nome ("white widow" e "widow"), em que
+    a busca por prefixo é um bisect seguido de uma leitura sequencial.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._state = ({}, {}, [], [])
+        # Estado fixado por pinned() no contexto atual (thread ou tarefa)
+        self._pinned = ContextVar(f'strain_catalog_{id(self)}', default=None)
+
+    def _current(self):
+        pinned = self._pinned.get()
+        if pinned is not None and pinned.state is not None:
+            return pinned.state
+        version = cache.get_versions(None, (cache.STRAIN,))[0]
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._state = self._load()
+                    self._version = version
+        if pinned is not None:
+            pinned.state = self._state
+        return self._state
+
+    def snapshot(self):
+        """
+        Um estado para fixar com pinned(), preenchido na primeira consulta:
+        quem não chega a consultar o catálogo não confere a versão nem o carrega.
+        """
+        return CatalogSnapshot()
+
+    @contextmanager
+    def pinned(self, snapshot=None):
+        """
+        Dentro do bloco, as consultas usam `snapshot` (ou um novo) sem conferir
+        a versão no cache a cada chamada. Uma variedade criada no meio do bloco
+        ainda é encontrada por get(), que a lê do banco.
+        """
+        token = self._pinned.set(snapshot if snapshot is not None else self.snapshot())
+        try:
+            yield
+        finally:
+            self._pinned.reset(token)
+
+    @staticmethod
+    def _load():
+        by_pk, by_key, index = {}, {}, []
+        # Na ordem de Meta.ordering (nome): all() devolve os valores de by_pk como estão
+        for strain in Strain.objects.only('pk', 'name', 'key'):
+            by_pk[strain.pk] = by_key[strain.key] = strain
+            words = strain.key.split(' ')
+            for position in range(len(words)):
+                index.append((' '.join(words[position:]), strain.name.casefold(), strain.pk))
+        index.sort()
+        return by_pk, by_key, index, [entry[0] for entry in index]
+
+    def get(self, pk):
+        """
+        Variedade pelo pk, ou None se ela não existe. Uma variedade que ainda não
+        está no catálogo (criada há pouco, em outro processo) é lida do banco, e o
+        catálogo se recarrega na próxima consulta.
+        """
+        strain = self._current()[0].get(pk)
+        if strain is None and pk is not None:
+            strain = Strain.objects.only('pk', 'name', 'key').filter(pk=pk).first()
+            if strain is not None:
+                with self._lock:
+                    self._version = None
+        return strain
+
+    def all(self):
+        """Todas as variedades, na ordem do nome."""
+        return list(self._current()[0].values())
+
+    def find(self, name):
+        """Variedade com esse nome (sem diferenciar maiúsculas, acentos e espaços), ou None."""
+        return self._current()[1].get(strain_key(name))
+
+    def used_by(self, owner_id):
+        """
+        Pks das variedades das plantas do usuário, guardados no cache até a
+        próxima alteração nas plantas dele (escopo 'plant').
+        """
+        key = cache.fragment_key('strains_used', owner_id, ('plant',))
+        pks = cache.get_fragment(key)
+        if pks is None:
+            pks = frozenset(
+                Plant.objects.filter(owner_id=owner_id, strain__isnull=False)
+                .order_by().values_list('strain_id', flat=True).distinct()
+            )
+            cache.set_fragment(key, pks)
+        return pks
+
+    def complete(self, prefix, limit=10, only=None):
+        """
+        Até `limit` variedades com alguma palavra que começa com `prefix`, as do início
+        do nome primeiro; com `only`, só as variedades desses pks.
+        """
+        by_pk, _, index, keys = self._current()
+        prefix = strain_key(prefix)
+        if not prefix:
+            return []
+        start = bisect.bisect_left(keys, prefix)
+        # Chaves que começam com o prefixo são as da faixa [prefixo, prefixo + maior caractere)
+        end = bisect.bisect_left(keys, prefix + '\U0010ffff', start)
+        found = {}
+        for _, _, pk in index[start:end]:
+            if only is None or pk in only:
+                found.setdefault(pk, by_pk[pk])
+        matches = sorted(found.values(), key=lambda strain: (not strain.key.startswith(prefix), strain.name.casefold()))
+        return matches[:limit]
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._state = ({}, {}, [], [])
+
+
+strains = StrainCatalog()
@@ -0,0 +1,188 @@
+# cultivation/events.py
+
+"""
+Eventos ao vivo por dono (plantas criadas, movidas, com estágio novo e leituras
+de sensores), entregues às páginas abertas por Server-Sent Events
+(async_views.EventStreamView, só no modo ASGI).
+
+O pub/sub é em memória, por processo: cada conexão aberta é uma fila
+asyncio registrada para o seu dono, e publish() entrega o evento só às filas
+daquele dono. Publicar pode acontecer em qualquer thread (as views síncronas
+e os sinais rodam fora do loop): a entrega passa por call_soon_threadsafe.
+Uma conexão parada não custa nada além da fila e do temporizador do heartbeat.
+
+Cada dono guarda os últimos eventos: o navegador que reconecta com
+Last-Event-ID recebe o que perdeu. Se não dá para saber o que ele perdeu
+(outro processo, reinício, eventos já descartados ou fila cheia), ele recebe
+um evento 'reset' e decide se recarrega a página. Só os MAX_OWNERS donos que
+publicaram por último guardam histórico (além dos que têm conexão aberta):
+sem isso a memória cresceria com cada usuário que já publicou um evento.
+
+Com mais de um processo, cada um só entrega os eventos gerados nele; para
+todos verem tudo, troque o Broker por um pub/sub compartilhado (Redis...).
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import partial
+
+from django.db import transaction
+
+PLANT_CREATED = 'plant.created'
+PLANT_MOVED = 'plant.moved'
+PLANT_STAGE = 'plant.stage'
+TELEMETRY = 'telemetry'
+RESET = 'reset'
+
+QUEUE_SIZE = 100
+HISTORY_SIZE = 50
+MAX_OWNERS = 1000
+
+
+@dataclass(frozen=True)
+class Event:
+    id: str
+    sequence: int
+    type: str
+    data: dict
+
+    def encode(self):
+        """O evento no formato text/event-stream."""
+        data = json.dumps(self.data, separators=(',', ':'))
+        # Sem a linha id o navegador mantém o Last-Event-ID anterior (um "id:" vazio o apagaria)
+        prefix = f'id: {self.id}\n' if self.id else ''
+        return f'{prefix}event: {self.type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    """Fila de uma conexão, ligada ao loop em que ela foi aberta."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        # Roda no loop da conexão. Um cliente lento demais perde os eventos e recebe um 'reset'
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Próximo evento; asyncio.TimeoutError se nada chegar em `timeout` segundos."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Broker:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Identifica este processo nos ids dos eventos: um Last-Event-ID de outro não vale aqui
+        self._boot = uuid.uuid4().hex[:8]
+        self._sequence = itertools.count(1)
+        self._subscribers = {}
+        # Do dono que publicou há mais tempo para o mais recente
+        self._history = OrderedDict()
+        # Por dono, a sequência do último evento descartado do histórico
+        self._evicted = {}
+        # A maior sequência dos históricos apagados inteiros (donos sem conexão, veja _prune)
+        self._pruned = 0
+
+    def subscribe(self, owner_id, last_event_id=None):
+        """
+        Registra uma conexão do dono no loop atual. Devolve a Subscription e os
+        eventos a reenviar antes dela (os posteriores a `last_event_id`, ou um 'reset').
+        """
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(owner_id, set()).add(subscription)
+            backlog = self._backlog(owner_id, last_event_id)
+        return subscription, backlog
+
+    def _backlog(self, owner_id, last_event_id):
+        if not last_event_id:
+            return []
+        boot, _, sequence = last_event_id.partition('-')
+        # Sem histórico, o do dono pode ter sido apagado inteiro
+        evicted = self._evicted.get(owner_id, 0) if owner_id in self._history else self._pruned
+        if boot != self._boot or not sequence.isdigit() or int(sequence) < evicted:
+            return [self.reset_event()]
+        return [event for event in self._history.get(owner_id, ()) if event.sequence > int(sequence)]
+
+    def unsubscribe(self, owner_id, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(owner_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[owner_id]
+
+    def subscriber_count(self, owner_id=None):
+        with self._lock:
+            if owner_id is not None:
+                return len(self._subscribers.get(owner_id, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+    def reset_event(self):
+        return Event('', 0, RESET, {})
+
+    def publish(self, owner_id, type, data):
+        """Entrega o evento às conexões abertas do dono (em qualquer thread) e o guarda no histórico."""
+        with self._lock:
+            sequence = next(self._sequence)
+            event = Event(f'{self._boot}-{sequence}', sequence, type, data)
+            if owner_id not in self._history:
+                self._history[owner_id] = deque(maxlen=HISTORY_SIZE)
+                # Um histórico apagado antes (veja _prune) não volta: ids anteriores recebem 'reset'
+                self._evicted[owner_id] = self._pruned
+            history = self._history[owner_id]
+            self._history.move_to_end(owner_id)
+            if len(history) == history.maxlen:
+                self._evicted[owner_id] = history[0].sequence
+            history.append(event)
+            self._prune()
+            subscribers = list(self._subscribers.get(owner_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # O loop da conexão já foi fechado
+                self.unsubscribe(owner_id, subscription)
+        return event
+
+    def _prune(self):
+        # Chamado com o lock. Apaga o histórico dos donos sem conexão aberta que publicaram
+        # há mais tempo; quem voltar com um Last-Event-ID anterior recebe um 'reset'
+        excess = len(self._history) - MAX_OWNERS
+        if excess <= 0:
+            return
+        idle = (owner_id for owner_id in self._history if owner_id not in self._subscribers)
+        for owner_id in list(itertools.islice(idle, excess)):
+            self._pruned = max(self._pruned, self._history.pop(owner_id)[-1].sequence)
+            self._evicted.pop(owner_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._subscribers.clear()
+            self._history.clear()
+            self._evicted.clear()
+            self._pruned = 0
+
+
+broker = Broker()
+
+
+def publish_on_commit(owner_id, type, data):
+    """Publica depois do commit: quem recebe o evento e recarrega já encontra os dados gravados."""
+    transaction.on_commit(partial(broker.publish, owner_id, type, data))
+
+
+def related(obj):
+    """Ambiente ou estágio no formato dos eventos."""
+    return None if obj is None else {'id': obj.pk, 'name': obj.name}
@@ -0,0 +1,113 @@
+# cultivation/exports.py
+
+"""
+Exportação em CSV das plantas e dos ambientes do usuário.
+
+As linhas são lidas do banco com iterator(chunk_size=...) e escritas uma a
+uma na resposta (StreamingHttpResponse): nem o queryset nem o arquivo
+inteiro ficam na memória, que não cresce com o número de linhas (no modo
+ASGI também: veja streaming.py).
+
+O arquivo abre direto no Excel/LibreOffice: começa com o BOM do UTF-8 (para
+os acentos), separa as colunas com ';' (o separador de listas do Excel em
+pt-BR, onde a vírgula é decimal) e neutraliza textos que começam com
+=, +, - ou @, que a planilha tentaria interpretar como fórmula.
+"""
+
+import csv
+import datetime
+
+from django.utils import timezone
+
+from .catalog import strains as strain_catalog
+from .models import Plant
+
+CHUNK_SIZE = 2000
+BOM = '\ufeff'
+DELIMITER = ';'
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """Arquivo falso para o csv.writer: write() devolve a linha em vez de guardá-la."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value, tz):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'sim' if value else 'não'
+    if isinstance(value, str):
+        return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+    if isinstance(value, datetime.datetime) and value.tzinfo is not None:
+        return value.astimezone(tz).strftime('%Y-%m-%d %H:%M:%S')
+    return value
+
+
+def _related_name(obj):
+    return obj.name if obj is not None else ''
+
+
+# (cabeçalho, valor da coluna para um objeto)
+PLANT_COLUMNS = (
+    ('id', lambda plant: plant.pk),
+    ('nome', lambda plant: plant.name),
+    # Sem variedade, a célula fica vazia: a importação não cria uma "Variedade Desconhecida"
+    ('variedade', lambda plant: plant.strain_name if plant.strain_id is not None else ''),
+    ('data_germinacao', lambda plant: plant.germination_date),
+    ('idade_dias', lambda plant: plant.age_in_days),
+    ('ambiente', lambda plant: _related_name(plant.environment)),
+    ('estagio', lambda plant: _related_name(plant.stage)),
+    ('ativa', lambda plant: plant.is_active),
+    ('criada_em', lambda plant: plant.created_at),
+    ('atualizada_em', lambda plant: plant.updated_at),
+)
+
+PLANT_FIELDS = (
+    'name', 'strain', 'germination_date', 'is_active', 'created_at', 'updated_at',
+    'environment__name', 'stage__name',
+)
+
+ENVIRONMENT_COLUMNS = (
+    ('id', lambda environment: environment.pk),
+    ('nome', lambda environment: environment.name),
+    ('altura_cm', lambda environment: environment.height),
+    ('largura_cm', lambda environment: environment.width),
+    ('profundidade_cm', lambda environment: environment.depth),
+    ('horas_de_luz', lambda environment: environment.light_exposure_hours),
+    ('ativo', lambda environment: environment.is_active),
+    ('criado_em', lambda environment: environment.created_at),
+)
+
+
+def stream_csv(queryset, columns, chunk_size=CHUNK_SIZE):
+    """Gera o CSV linha a linha: o BOM com o cabeçalho e depois um objeto por vez."""
+    writer = csv.writer(Echo(), delimiter=DELIMITER)
+    # Resolvido uma vez: timezone.localtime() por célula custaria mais que o resto da linha
+    tz = timezone.get_current_timezone()
+    # O nome da variedade de cada planta vem do catálogo: a versão é conferida uma vez por arquivo
+    strains = strain_catalog.snapshot()
+    yield BOM + writer.writerow([header for header, _ in columns])
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        # Fixado a cada linha, sem atravessar o yield: o gerador pode avançar em threads diferentes
+        with strain_catalog.pinned(strains):
+            line = writer.writerow([_cell(value(obj), tz) for _, value in columns])
+        yield line
+
+
+def plant_queryset(owner):
+    # Ambiente e estágio no mesmo SELECT (só o nome deles), na ordem do índice plant_owner_germination_idx
+    return (
+        Plant.objects.filter(owner=owner)
+        .select_related('environment', 'stage')
+        .only(*PLANT_FIELDS)
+        .with_age()
+        .order_by('-germination_date', 'name', 'pk')
+    )
+
+
+def filename(prefix):
+    return f'{prefix}-{timezone.localdate():%Y-%m-%d}.csv'
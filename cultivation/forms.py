@@ -1,9 +1,121 @@
 # cultivation/forms.py
 
 from django import forms
-from .models import Environment, Lighting, Plant, Stage
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.urls import reverse_lazy
+from django.utils.choices import BaseChoiceIterator
+from .catalog import lighting as lighting_catalog, strains as strain_catalog
+from .managers import strain_key
+from .models import UNKNOWN_STRAIN, Environment, JournalEntry, Lighting, Plant, Stage, Strain
 from datetime import date
 
+
+class LightingChoiceIterator(BaseChoiceIterator):
+
+    def __iter__(self):
+        return iter(lighting_catalog.choices())
+
+
+class LightingMultipleChoiceField(forms.ModelMultipleChoiceField):
+    """
+    Escolha de luzes servida pelo catálogo em memória: renderizar as opções
+    e validar as luzes escolhidas não consulta o banco.
+    """
+
+    def _get_choices(self):
+        # Iterável preguiçoso (como o ModelChoiceIterator): o catálogo só é lido na renderização
+        return LightingChoiceIterator()
+
+    choices = property(_get_choices, forms.ChoiceField.choices.fset)
+
+    def _check_values(self, value):
+        lights = []
+        for pk in dict.fromkeys(value):
+            try:
+                light = lighting_catalog.get(int(pk))
+            except (TypeError, ValueError):
+                raise ValidationError(
+                    self.error_messages['invalid_pk_value'], code='invalid_pk_value', params={'pk': pk}
+                )
+            if light is None:
+                raise ValidationError(
+                    self.error_messages['invalid_choice'], code='invalid_choice', params={'value': pk}
+                )
+            lights.append(light)
+        return lights
+
+
+class StrainField(forms.CharField):
+    """
+    Variedade digitada pelo nome, com sugestões do autocompletar. Um nome já
+    conhecido vira a variedade do catálogo em memória (sem consulta); um nome
+    novo vira uma Strain ainda não salva, gravada pelo PlantForm.save().
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('max_length', Strain._meta.get_field('name').max_length)
+        kwargs.setdefault('widget', forms.TextInput(attrs={
+            'autocomplete': 'off',
+            'data-autocomplete-url': reverse_lazy('cultivation:strain_autocomplete'),
+        }))
+        super().__init__(**kwargs)
+
+    def prepare_value(self, value):
+        # Valor inicial vindo da instância: o pk da variedade
+        if isinstance(value, int):
+            strain = strain_catalog.get(value)
+            return strain.name if strain is not None else ''
+        if isinstance(value, Strain):
+            return value.name
+        return value
+
+    def has_changed(self, initial, data):
+        return super().has_changed(self.prepare_value(initial), data)
+
+    def clean(self, value):
+        name = ' '.join(super().clean(value).split())
+        # "Variedade Desconhecida" é como aparece uma planta sem variedade (exportações
+        # antigas, por exemplo): não vira uma variedade, como na migração 0007
+        if not name or strain_key(name) == strain_key(str(UNKNOWN_STRAIN)):
+            return None
+        return strain_catalog.find(name) or Strain(name=name)
+
+
+class LookupSelect(forms.Select):
+    """
+    Select de um ModelChoiceField que renderiza só a opção vazia e a escolhida.
+    As outras opções vêm da busca paginada em `lookup_url` (JSON, veja
+    OwnerLookupView), pelo campo de busca que o main.js coloca no lugar do
+    select: com centenas de ambientes, a página não carrega todos eles.
+    """
+
+    def __init__(self, lookup_url, attrs=None):
+        super().__init__(attrs)
+        self.lookup_url = lookup_url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['attrs']['data-lookup-url'] = str(self.lookup_url)
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        field = self.choices.field
+        options = [] if field.empty_label is None else [('', field.empty_label)]
+        selected = [pk for pk in value if pk not in ('', None)]
+        if selected:
+            # Uma consulta pelo pk da escolhida, em vez de percorrer o queryset inteiro
+            try:
+                options.extend(self.choices.choice(obj) for obj in field.queryset.filter(pk__in=selected))
+            except (ValueError, ValidationError):
+                pass  # valor enviado inválido: o campo já mostra o erro
+        return [
+            (None, [self.create_option(name, option_value, label, str(option_value) in value, index, attrs=attrs)],
+             index)
+            for index, (option_value, label) in enumerate(options)
+        ]
+
+
 class EnvironmentForm(forms.ModelForm):
     class Meta:
         model = Environment
@@ -16,12 +128,18 @@ class EnvironmentForm(forms.ModelForm):
             'lighting_system',
             'light_exposure_hours',
         ]
+        # O Django por padrão já renderiza o ManyToManyField como um box de seleção múltipla,
+        # mas podemos melhorar o widget se quisermos, como torná-lo um CheckboxSelectMultiple.
+        # O widget é definido aqui (e não no __init__) para que receba as opções do campo.
+        widgets = {
+            'lighting_system': forms.CheckboxSelectMultiple(),
+        }
+        field_classes = {
+            'lighting_system': LightingMultipleChoiceField,
+        }
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # O Django por padrão já renderiza o ManyToManyField como um box de seleção múltipla,
-        # mas podemos melhorar o widget se quisermos, como torná-lo um CheckboxSelectMultiple.
-        self.fields['lighting_system'].widget = forms.CheckboxSelectMultiple()
         self.fields['lighting_system'].help_text = 'Selecione uma ou mais luzes para este ambiente.'
         self.fields['lighting_system'].required = False
 
@@ -37,6 +155,11 @@ class PlantForm(forms.ModelForm):
         widget=forms.DateInput(attrs={'type': 'date'}),
         initial=date.today #
     )
+    strain = StrainField(
+        label="Genética / Variedade",
+        required=False,
+        help_text="Comece a digitar para ver as variedades já cadastradas. Ex: White Widow, Tomate Cereja",
+    )
 
     class Meta:
         model = Plant
@@ -47,6 +170,11 @@ class PlantForm(forms.ModelForm):
             'stage',
             'environment',
         ]
+        # Ambientes e estágios são buscados pelo nome, sob demanda (LookupSelect)
+        widgets = {
+            'stage': LookupSelect(reverse_lazy('cultivation:stage_lookup')),
+            'environment': LookupSelect(reverse_lazy('cultivation:environment_lookup')),
+        }
 
     def __init__(self, *args, **kwargs):
         # Pega o usuário que será passado pela view
@@ -58,8 +186,133 @@ class PlantForm(forms.ModelForm):
             # Adiciona o filtro para o campo de estágios
             self.fields['stage'].queryset = Stage.objects.filter(owner=user)
 
+    def save(self, commit=True):
+        strain = self.instance.strain
+        if strain is not None and strain.pk is None:
+            # Nome novo: entra no catálogo só agora, com o formulário já válido
+            self.instance.strain = Strain.objects.intern(strain.name)
+        return super().save(commit)
+
 class StageForm(forms.ModelForm):
     class Meta:
         model = Stage
         # O 'owner' será definido na view
-        fields = ['name', 'light_hours_on', 'duration', 'duration_unit']
\ No newline at end of file
+        fields = ['name', 'light_hours_on', 'duration', 'duration_unit']
+
+
+class PlantImportForm(forms.Form):
+    file = forms.FileField(
+        label="Arquivo CSV",
+        help_text=(
+            "Colunas: nome, variedade, data_germinacao (AAAA-MM-DD) e, opcionalmente, ambiente, estagio "
+            "(pelo nome) e ativa (sim/não). O CSV da exportação pode ser reenviado como está."
+        ),
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,text/csv'}),
+    )
+
+
+class PlantPkListField(forms.Field):
+    """Lista de ids de plantas marcadas; a posse é conferida no próprio UPDATE (filtrado pelo dono)."""
+    widget = forms.MultipleHiddenInput
+    default_error_messages = {
+        'invalid': "Seleção de plantas inválida.",
+        'too_many': "Selecione no máximo %(limit)s plantas por vez.",
+    }
+
+    def __init__(self, *, limit=1000, **kwargs):
+        self.limit = limit
+        super().__init__(**kwargs)
+
+    def to_python(self, value):
+        if not value:
+            return []
+        try:
+            pks = list(dict.fromkeys(int(pk) for pk in value))
+        except (TypeError, ValueError):
+            raise ValidationError(self.error_messages['invalid'], code='invalid')
+        if len(pks) > self.limit:
+            raise ValidationError(self.error_messages['too_many'], code='too_many', params={'limit': self.limit})
+        return pks
+
+
+class PlantBulkForm(forms.Form):
+    """Ações em massa sobre as plantas marcadas na lista."""
+    ACTIONS = [
+        ('', "Escolha uma ação"),
+        ('move', "Mover para o ambiente"),
+        ('clear_environment', "Tirar do ambiente"),
+        ('stage', "Mudar o estágio"),
+        ('clear_stage', "Limpar o estágio"),
+        ('activate', "Marcar como ativas"),
+        ('deactivate', "Marcar como inativas"),
+        ('clone', "Clonar"),
+    ]
+    # Ação -> campo com o destino obrigatório. Tirar do ambiente e limpar o estágio são
+    # ações à parte: um destino em branco nunca apaga o ambiente ou o estágio sem querer
+    TARGETS = {'move': 'environment', 'stage': 'stage'}
+    MAX_COPIES = 200
+
+    action = forms.ChoiceField(
+        label="Ação", choices=ACTIONS, error_messages={'required': "Escolha uma ação."},
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    plants = PlantPkListField(error_messages={'required': "Selecione ao menos uma planta."})
+    environment = forms.ModelChoiceField(
+        label="Ambiente", queryset=Environment.objects.none(), required=False, empty_label="Escolha o ambiente",
+        widget=LookupSelect(reverse_lazy('cultivation:environment_lookup'), attrs={'class': 'form-select'}),
+    )
+    stage = forms.ModelChoiceField(
+        label="Estágio", queryset=Stage.objects.none(), required=False, empty_label="Escolha o estágio",
+        widget=LookupSelect(reverse_lazy('cultivation:stage_lookup'), attrs={'class': 'form-select'}),
+    )
+    copies = forms.IntegerField(
+        label="Cópias", min_value=1, max_value=MAX_COPIES, initial=1, required=False,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user:
+            # Como no PlantForm: só os ambientes e estágios do usuário
+            self.fields['environment'].queryset = Environment.objects.filter(owner=user)
+            self.fields['stage'].queryset = Stage.objects.filter(owner=user)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        action = cleaned_data.get('action')
+        target = self.TARGETS.get(action)
+        if target and not cleaned_data.get(target) and target not in self.errors:
+            self.add_error(target, f"Escolha o {self.fields[target].label.lower()} de destino.")
+        if action == 'clone' and not cleaned_data.get('copies'):
+            self.add_error('copies', "Informe quantas cópias criar.")
+        return cleaned_data
+
+
+class JournalEntryForm(forms.ModelForm):
+    recorded_at = forms.DateTimeField(
+        label="Data",
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local', 'class': 'form-control'},
+                                   format='%Y-%m-%dT%H:%M'),
+        initial=timezone.now,
+    )
+
+    class Meta:
+        model = JournalEntry
+        fields = ['kind', 'recorded_at', 'note', 'volume_ml', 'ph', 'ec', 'height_cm']
+        # Classes do Bootstrap no próprio widget: o detail da planta renderiza os campos um a um, sem crispy
+        widgets = {
+            'kind': forms.Select(attrs={'class': 'form-select'}),
+            'note': forms.Textarea(attrs={'rows': 2, 'class': 'form-control'}),
+            'volume_ml': forms.NumberInput(attrs={'class': 'form-control'}),
+            'ph': forms.NumberInput(attrs={'class': 'form-control'}),
+            'ec': forms.NumberInput(attrs={'class': 'form-control'}),
+            'height_cm': forms.NumberInput(attrs={'class': 'form-control'}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        values = [cleaned_data.get(name) for name in ('note', 'volume_ml', 'ph', 'ec', 'height_cm')]
+        if all(value in (None, '') for value in values):
+            raise ValidationError("Escreva uma anotação ou preencha ao menos uma medida.")
+        return cleaned_data
@@ -0,0 +1,232 @@
+# cultivation/imports.py
+
+"""
+Importação de plantas a partir de um CSV com cabeçalho.
+
+- Os cabeçalhos são os da exportação (exports.py: nome, variedade,
+  data_germinacao, ambiente, estagio, ativa) ou os nomes dos campos do
+  modelo; colunas desconhecidas (id, idade_dias...) são ignoradas.
+- Cada célula é validada pelos campos do PlantForm (mesmas regras do
+  cadastro), sem instanciar um formulário por linha.
+- Ambiente e estágio vêm pelo nome e são resolvidos em dicionários
+  carregados uma vez (um SELECT para cada tabela), não uma consulta por linha.
+- A variedade vem do catálogo em memória (catalog.py); um nome novo entra
+  no catálogo uma vez por arquivo, na primeira linha em que aparece.
+- As linhas válidas são gravadas com bulk_create, em lotes, numa única
+  transação: se alguma linha tiver erro, nada é gravado e os erros voltam
+  com o número da linha, para o arquivo ser corrigido e reenviado inteiro.
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import cache, events
+from .catalog import strains as strain_catalog
+from .forms import PlantForm
+from .managers import strain_key
+from .models import Environment, Plant, Stage, Strain
+
+DEFAULT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+# Cabeçalho aceito -> campo do Plant
+HEADERS = {
+    'nome': 'name', 'name': 'name',
+    'variedade': 'strain', 'strain': 'strain',
+    'data_germinacao': 'germination_date', 'germination_date': 'germination_date',
+    'ambiente': 'environment', 'environment': 'environment',
+    'estagio': 'stage', 'stage': 'stage',
+    'ativa': 'is_active', 'is_active': 'is_active',
+}
+REQUIRED = ('name', 'strain', 'germination_date')
+# Campos validados diretamente pelo campo correspondente do PlantForm
+FORM_FIELDS = ('name', 'strain', 'germination_date')
+BOOLEANS = {
+    '': True, 'sim': True, 's': True, 'true': True, '1': True, 'yes': True,
+    'não': False, 'nao': False, 'n': False, 'false': False, '0': False, 'no': False,
+}
+
+
+class PlantImportError(ValueError):
+    """Arquivo ou linha de importação inválidos."""
+
+
+@dataclass
+class ImportResult:
+    valid: int = 0
+    created: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    def as_dict(self):
+        return {'valid': self.valid, 'created': self.created, 'rejected': self.rejected, 'errors': self.errors}
+
+
+def open_csv(uploaded):
+    """
+    Lê o arquivo enviado como CSV (UTF-8, com ou sem BOM), separado por ';'
+    (o que a exportação e o Excel em pt-BR geram) ou por ','.
+    Gera (número_da_linha, dict) para cada linha.
+    """
+    text = io.TextIOWrapper(uploaded, encoding='utf-8-sig', newline='')
+    header = text.readline()
+    delimiter = ';' if header.count(';') >= header.count(',') else ','
+    names = next(csv.reader([header], delimiter=delimiter), [])
+    columns = {}
+    for index, name in enumerate(names):
+        target = HEADERS.get(name.strip().lower())
+        if target and target not in columns:
+            columns[target] = index
+    missing = [name for name in REQUIRED if name not in columns]
+    if missing:
+        labels = {value: key for key, value in HEADERS.items() if key.isascii() and key != value}
+        raise PlantImportError(
+            "Coluna(s) obrigatória(s) ausente(s): " + ', '.join(labels.get(name, name) for name in missing) + "."
+        )
+    reader = csv.reader(text, delimiter=delimiter)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            # NUL, campo acima do field_size_limit...: o arquivo inteiro é recusado
+            raise PlantImportError(f"O arquivo não é um CSV válido ({exc}).")
+        if not any(cell.strip() for cell in row):
+            continue
+        # +1: o cabeçalho já foi lido fora do reader
+        yield reader.line_num + 1, {
+            name: row[index].strip() if index < len(row) else '' for name, index in columns.items()
+        }
+
+
+def _lookup(model, owner):
+    """Nome (sem diferenciar maiúsculas) -> pk; nomes repetidos ficam como None (ambíguos)."""
+    by_name = {}
+    for pk, name in model.objects.filter(owner=owner).values_list('pk', 'name'):
+        key = name.strip().casefold()
+        by_name[key] = None if key in by_name else pk
+    return by_name
+
+
+class PlantRowValidator:
+    """
+    Valida linhas já decodificadas com as regras do PlantForm e devolve
+    Plants não salvos. As consultas (ambientes e estágios do usuário) são
+    feitas uma única vez, na criação.
+    """
+    related = {'environment': (Environment, "Ambiente"), 'stage': (Stage, "Estágio")}
+
+    def __init__(self, owner):
+        self.owner = owner
+        # Os próprios objetos de campo do formulário: clean() aplica max_length, required e o formato da data
+        self.fields = {name: PlantForm.base_fields[name] for name in FORM_FIELDS}
+        self.lookups = {name: _lookup(model, owner) for name, (model, _) in self.related.items()}
+        # Num lote as mesmas datas se repetem muito: cada texto é validado uma vez só
+        self._dates = {}
+        # Variedades criadas por este lote: chave -> pk
+        self.new_strains = {}
+
+    def _resolve(self, name, value):
+        if not value:
+            return None
+        key = value.casefold()
+        lookup = self.lookups[name]
+        label = self.related[name][1]
+        if key not in lookup:
+            raise PlantImportError(f"{label} '{value}' não encontrado.")
+        if lookup[key] is None:
+            raise PlantImportError(f"{label} '{value}' é ambíguo: há mais de um com esse nome.")
+        return lookup[key]
+
+    def _strain_id(self, strain):
+        if strain is None:
+            return None
+        if strain.pk is not None:
+            return strain.pk
+        key = strain_key(strain.name)
+        if key not in self.new_strains:
+            self.new_strains[key] = Strain.objects.intern(strain.name).pk
+        return self.new_strains[key]
+
+    def build(self, row):
+        values = {}
+        errors = []
+        for name, form_field in self.fields.items():
+            value = row.get(name, '')
+            try:
+                if name == 'germination_date':
+                    if value not in self._dates:
+                        self._dates[value] = form_field.clean(value)
+                    values[name] = self._dates[value]
+                else:
+                    values[name] = form_field.clean(value)
+            except ValidationError as exc:
+                errors.append(f"{form_field.label or name}: {' '.join(exc.messages)}")
+        for name in self.related:
+            try:
+                values[f'{name}_id'] = self._resolve(name, row.get(name, ''))
+            except PlantImportError as exc:
+                errors.append(str(exc))
+        active = row.get('is_active', '').lower()
+        if active not in BOOLEANS:
+            errors.append(f"Ativa: valor '{row['is_active']}' inválido (use sim ou não).")
+        if errors:
+            raise PlantImportError(' '.join(errors))
+        values['strain_id'] = self._strain_id(values.pop('strain'))
+        return Plant(owner_id=self.owner.pk, is_active=BOOLEANS[active], **values)
+
+
+def import_plants(rows, owner, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Valida e grava as plantas de `rows` (pares (linha, dict) de open_csv).
+
+    Tudo numa transação: as linhas válidas vão sendo gravadas em lotes (a
+    memória não cresce com o arquivo) e, se alguma linha for inválida, a
+    transação é desfeita no fim e só os erros são devolvidos.
+    """
+    result = ImportResult()
+    validator = PlantRowValidator(owner)
+    batch = []
+    try:
+        # Uma conferência da versão do catálogo de variedades para o arquivo inteiro
+        with transaction.atomic(), strain_catalog.pinned():
+            for line_number, row in rows:
+                try:
+                    plant = validator.build(row)
+                except PlantImportError as exc:
+                    result.add_error(line_number, str(exc))
+                    continue
+                result.valid += 1
+                if result.rejected:
+                    # Nada será gravado: só continua validando para relatar os erros
+                    continue
+                batch.append(plant)
+                if len(batch) >= batch_size:
+                    Plant.objects.bulk_create(batch, batch_size=batch_size)
+                    batch = []
+            if result.rejected:
+                transaction.set_rollback(True)
+            else:
+                if batch:
+                    Plant.objects.bulk_create(batch, batch_size=batch_size)
+                result.created = result.valid
+    finally:
+        if validator.new_strains and not result.created:
+            # As variedades novas foram desfeitas com o resto (linhas inválidas ou arquivo
+            # ilegível), mas o catálogo em memória pode tê-las carregado durante a transação
+            cache.bump(cache.STRAIN)
+    if result.created:
+        # bulk_create não dispara os sinais que invalidam o cache de fragmentos nem os eventos ao vivo
+        cache.bump('plant', owner.pk)
+        events.publish_on_commit(owner.pk, events.PLANT_CREATED, {'count': result.created})
+    return result
@@ -0,0 +1,204 @@
+# cultivation/management/commands/bench_asgi.py
+
+import asyncio
+import datetime
+import json
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from cultivation.asgi_urls import ASYNC_VIEWS
+
+from .bench_views import Command as ViewsCommand, percentile
+from .generate_synthetic_data import SYNTHETIC_DOMAIN
+
+HOST = 'testserver'
+
+# modo -> (servidor, ROOT_URLCONF)
+MODES = {
+    # Servidor WSGI com um pool de threads: cada requisição prende uma thread do começo ao fim
+    'wsgi': ('wsgi', 'growplant.urls'),
+    # ASGI com as views síncronas de sempre, cada requisição numa thread do handler
+    'asgi-sync': ('asgi', 'growplant.urls'),
+    # O modo ASGI do projeto (growplant/asgi.py): listas e detalhes com as views assíncronas
+    'asgi': ('asgi', 'growplant.asgi_urls'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara a vazão de requisições concorrentes às listas e aos detalhes de plantas e "
+        "ambientes servidos pelo handler WSGI (pool de threads) e pelo handler ASGI (com as "
+        "views síncronas e com as assíncronas de async_views.py), no próprio processo, sobre "
+        "o banco semeado com generate_synthetic_data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default=f'user0@{SYNTHETIC_DOMAIN}', help="Usuário cujas páginas são medidas.")
+        parser.add_argument('--requests', type=int, default=400, help="Requisições por rota em cada modo.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Requisições em andamento ao mesmo tempo.")
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--modes', default=','.join(MODES), help="Modos medidos, separados por vírgula.")
+        parser.add_argument('--routes', default='', help="Filtra rotas cujo nome contém este texto.")
+        parser.add_argument('--output', help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = [mode for mode in modes if mode not in MODES]
+        if unknown:
+            raise CommandError(f"Modo(s) desconhecido(s): {', '.join(unknown)}. Use: {', '.join(MODES)}.")
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--requests e --concurrency precisam ser positivos.")
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f"Usuário {options['email']} não encontrado. Rode antes: manage.py generate_synthetic_data"
+            )
+
+        setup_test_environment()  # 'testserver' em ALLOWED_HOSTS: as requisições não saem do processo
+        try:
+            results = self._run(user, modes, options)
+        finally:
+            teardown_test_environment()
+
+        report = {'meta': self._meta(user, options), 'results': results}
+        self._print(results)
+        if options.get('output'):
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['output']}"))
+
+    def _run(self, user, modes, options):
+        targets = ViewsCommand._targets(user)
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        routes = {
+            name: ViewsCommand._url(f'cultivation:{name}', targets)[0]
+            for name in sorted(ASYNC_VIEWS) if options['routes'] in name
+        }
+
+        results = {}
+        for mode in modes:
+            server, urlconf = MODES[mode]
+            with override_settings(ROOT_URLCONF=urlconf):
+                for name, url in routes.items():
+                    if server == 'wsgi':
+                        row = self._run_wsgi(url, cookie, options)
+                    else:
+                        row = asyncio.run(self._run_asgi(url, cookie, options))
+                    results.setdefault(name, {})[mode] = row
+                    self.stdout.write(f"  {mode:<10} {name}: {row['throughput']:.0f} req/s")
+        return results
+
+    def _run_wsgi(self, url, cookie, options):
+        application = WSGIHandler()
+
+        def call():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url, 'QUERY_STRING': '', 'SCRIPT_NAME': '',
+                'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'HTTP_HOST': HOST, 'HTTP_COOKIE': cookie,
+                'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(), 'wsgi.errors': BytesIO(),
+            }
+            started = time.perf_counter()
+            status = []
+            body = application(environ, lambda line, headers, exc_info=None: status.append(line))
+            for _chunk in body:
+                pass
+            body.close()
+            return (time.perf_counter() - started) * 1000, int(status[0].split()[0])
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(lambda _: call(), range(options['warmup'])))
+            started = time.perf_counter()
+            samples = list(executor.map(lambda _: call(), range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        return self._summary(samples, elapsed)
+
+    async def _run_asgi(self, url, cookie, options):
+        application = ASGIHandler()
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url, 'raw_path': url.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+        }
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            body = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            status = []
+
+            async def receive():
+                if body:
+                    return body.pop()
+                # Sem desconexão: o handler cancela esta espera quando a resposta termina
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(dict(scope), receive, send)
+                return (time.perf_counter() - started) * 1000, status[0]
+
+        await asyncio.gather(*(call() for _ in range(options['warmup'])))
+        started = time.perf_counter()
+        samples = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return self._summary(samples, elapsed)
+
+    @staticmethod
+    def _summary(samples, elapsed):
+        latencies = [latency for latency, _status in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _latency, status in samples if status != 200),
+            'seconds': round(elapsed, 3),
+            'throughput': round(len(samples) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+        }
+
+    @staticmethod
+    def _meta(user, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'user': user.email,
+            'database': settings.DATABASES['default']['ENGINE'],
+        }
+
+    def _print(self, results):
+        self.stdout.write(
+            f"{'rota':<22} {'modo':<10} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'erros':>6}"
+        )
+        for name, modes in results.items():
+            for mode, row in modes.items():
+                self.stdout.write(
+                    f"{name:<22} {mode:<10} {row['throughput']:>8.0f} {row['p50_ms']:>8.2f} "
+                    f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>6}"
+                )
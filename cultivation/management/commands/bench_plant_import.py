@@ -0,0 +1,56 @@
+# cultivation/management/commands/bench_plant_import.py
+
+import io
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from cultivation import imports
+from cultivation.models import Environment, Plant, Stage
+
+BENCH_EMAIL = 'bench-import@growplant.invalid'
+
+
+class Command(BaseCommand):
+    help = "Mede a vazão (linhas/s) da importação de plantas por CSV para diferentes tamanhos de lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Linhas do CSV.")
+        parser.add_argument(
+            '--batch-sizes', default='500,2000,10000',
+            help="Tamanhos de lote separados por vírgula."
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        # Usuário descartável: tudo o que a rodada grava é removido no final
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        user = User.objects.create_user(email=BENCH_EMAIL, password=None)
+        try:
+            environments = [Environment.objects.create(owner=user, name=f"Tenda {i}", height=200, width=100,
+                                                       depth=100) for i in range(12)]
+            stages = [Stage.objects.create(owner=user, name=f"Estágio {i}", duration=4) for i in range(6)]
+            data = self._csv(environments, stages, options['rows'])
+
+            self.stdout.write(f"{'lote':>8} {'linhas':>10} {'segundos':>10} {'linhas/s':>12}")
+            for batch_size in (int(size) for size in options['batch_sizes'].split(',')):
+                started = time.perf_counter()
+                result = imports.import_plants(imports.open_csv(io.BytesIO(data)), user, batch_size=batch_size)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{batch_size:>8} {result.created:>10} {elapsed:>10.3f} {result.created / elapsed:>12,.0f}"
+                )
+                Plant.objects.filter(owner=user).delete()
+        finally:
+            user.delete()
+
+    @staticmethod
+    def _csv(environments, stages, rows):
+        lines = ['nome;variedade;data_germinacao;ambiente;estagio;ativa']
+        for i in range(rows):
+            lines.append(
+                f"Planta {i};Skunk #{i % 7};2026-{i % 12 + 1:02d}-{i % 28 + 1:02d};"
+                f"{environments[i % len(environments)].name};{stages[i % len(stages)].name};{'sim' if i % 5 else 'não'}"
+            )
+        return ('\n'.join(lines) + '\n').encode('utf-8')
@@ -0,0 +1,80 @@
+# cultivation/management/commands/bench_search.py
+
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from cultivation import search
+from cultivation.models import Environment, Strain
+
+BENCH_EMAIL = 'bench-search-{}@growplant.invalid'
+STRAINS = ('Skunk #1', 'White Widow', 'Northern Lights', 'Amnesia Haze', 'Gorilla Glue', 'Jack Herer', 'Blueberry')
+
+
+class Command(BaseCommand):
+    help = "Compara a busca indexada (FTS5) com icontains sobre muitas plantas de vários usuários."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Plantas no total.")
+        parser.add_argument('--owners', type=int, default=10, help="Usuários entre os quais as plantas se dividem.")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--queries', default='planta 12345,widow,northern light tenda 3,floracao,xyz')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("A busca indexada só existe no SQLite (FTS5).")
+        User = get_user_model()
+        emails = [BENCH_EMAIL.format(i) for i in range(options['owners'])]
+        # Usuários descartáveis: tudo o que a rodada grava é removido no final
+        User.objects.filter(email__in=emails).delete()
+        users = [User.objects.create_user(email=email, password=None) for email in emails]
+        try:
+            started = time.perf_counter()
+            self._populate(users, options['rows'])
+            self.stdout.write(f"{options['rows']} plantas indexadas em {time.perf_counter() - started:.1f}s\n")
+
+            user = users[0]
+            self.stdout.write(f"{'busca':<28} {'achadas':>8} {'fts5 ms':>9} {'icontains ms':>13}")
+            for query in options['queries'].split(','):
+                words = search.terms(query)
+                fts = self._time(lambda: search.search(user, query), options['repeat'])
+                scan = self._time(lambda: search._search_icontains(user, words, search.DEFAULT_LIMIT,
+                                                                   search.SearchResult(query)), options['repeat'])
+                found = len(search.search(user, query).plants)
+                self.stdout.write(f"{query:<28} {found:>8} {fts:>9.2f} {scan:>13.2f}")
+        finally:
+            User.objects.filter(email__in=emails).delete()
+
+    @staticmethod
+    def _time(func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    @staticmethod
+    def _populate(users, rows):
+        per_owner = rows // len(users)
+        strain_ids = [Strain.objects.intern(name).pk for name in STRAINS]
+        strains = ' '.join(f"WHEN {i} THEN {pk}" for i, pk in enumerate(strain_ids))
+        for user in users:
+            environments = [Environment.objects.create(owner=user, name=f"Tenda {i}", height=200, width=100,
+                                                       depth=100) for i in range(12)]
+            with transaction.atomic(), connection.cursor() as cursor:
+                # Os triggers indexam cada linha inserida, como num cadastro normal
+                cursor.execute(
+                    f"""
+                    WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < %s)
+                    INSERT INTO cultivation_plant (owner_id, environment_id, name, strain_id, germination_date,
+                                                   is_active, created_at, updated_at, last_entry_kind)
+                    SELECT %s, %s + i %% 12, 'Planta ' || i, CASE i %% {len(STRAINS)} {strains} END,
+                           '2026-01-01', 1, '2026-01-01 00:00:00', '2026-01-01 00:00:00', ''
+                    FROM seq
+                    """,
+                    [per_owner, user.pk, environments[0].pk],
+                )
@@ -0,0 +1,153 @@
+# cultivation/management/commands/bench_sqlite_concurrency.py
+
+import datetime
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from growplant.sqlite import BUSY_TIMEOUT, TRANSACTION_MODE, apply_pragmas
+
+from .bench_views import percentile
+
+SCHEMA = """
+CREATE TABLE plant (
+    id INTEGER PRIMARY KEY,
+    owner_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    germination_date TEXT NOT NULL,
+    is_active INTEGER NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX plant_owner_idx ON plant (owner_id, germination_date);
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara vazão e erros de 'database is locked' do SQLite com a configuração padrão do "
+        "Django e com o perfil de produção (growplant/sqlite.py), com leitores e escritores "
+        "concorrentes imitando a lista de plantas e a edição de uma planta."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duração de cada rodada.")
+        parser.add_argument('--rows', type=int, default=20000, help="Plantas no banco de teste.")
+        parser.add_argument('--owners', type=int, default=100)
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for label, production in (('padrão', False), ('produção', True)):
+                path = os.path.join(directory, f'{label}.sqlite3')
+                self._seed(path, options)
+                results[label] = self._run(path, production, options)
+
+        self.stdout.write(
+            f"{'perfil':<10} {'leituras/s':>11} {'escritas/s':>11} {'travado':>8} "
+            f"{'leitura p95 ms':>15} {'escrita p95 ms':>15}"
+        )
+        for label, row in results.items():
+            self.stdout.write(
+                f"{label:<10} {row['reads'] / options['seconds']:>11.0f} "
+                f"{row['writes'] / options['seconds']:>11.0f} {row['locked']:>8} "
+                f"{row['read_p95_ms']:>15.2f} {row['write_p95_ms']:>15.2f}"
+            )
+
+    @staticmethod
+    def _seed(path, options):
+        connection = sqlite3.connect(path)
+        connection.executescript(SCHEMA)
+        start = datetime.date(2026, 1, 1)
+        connection.executemany(
+            'INSERT INTO plant (owner_id, name, germination_date, is_active, updated_at) VALUES (?, ?, ?, 1, ?)',
+            (
+                (number % options['owners'], f'Planta {number}',
+                 (start - datetime.timedelta(days=number % 365)).isoformat(), start.isoformat())
+                for number in range(options['rows'])
+            ),
+        )
+        connection.commit()
+        connection.close()
+
+    def _run(self, path, production, options):
+        stop = threading.Event()
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'locked': 0, 'read_latencies': [], 'write_latencies': []}
+
+        def connect():
+            # Mesmo comportamento do backend do Django: autocommit e BEGIN explícito. A mesma espera
+            # por trava nos dois perfis: a comparação mede só o WAL e o BEGIN IMMEDIATE
+            connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None)
+            if production:
+                apply_pragmas(connection)
+            return connection
+
+        def worker(number, write):
+            reads = writes = locked = 0
+            latencies = []
+            persistent = connect() if production else None
+            owner = number % options['owners']
+            while not stop.is_set():
+                # Sem o perfil, cada operação abre uma conexão nova (CONN_MAX_AGE=0)
+                connection = persistent or connect()
+                started = time.perf_counter()
+                try:
+                    if write:
+                        connection.execute(f"BEGIN {TRANSACTION_MODE if production else 'DEFERRED'}")
+                        row = connection.execute(
+                            'SELECT id FROM plant WHERE owner_id = ? ORDER BY germination_date DESC LIMIT 1',
+                            (owner,),
+                        ).fetchone()
+                        connection.execute(
+                            'UPDATE plant SET is_active = 1 - is_active, updated_at = ? WHERE id = ?',
+                            (datetime.datetime.now().isoformat(), row[0]),
+                        )
+                        connection.execute('COMMIT')
+                        writes += 1
+                    else:
+                        connection.execute(
+                            'SELECT id, name, germination_date FROM plant WHERE owner_id = ? '
+                            'ORDER BY germination_date DESC, name LIMIT 60',
+                            (owner,),
+                        ).fetchall()
+                        reads += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except sqlite3.OperationalError:
+                    locked += 1
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                finally:
+                    if persistent is None:
+                        connection.close()
+            if persistent is not None:
+                persistent.close()
+            with lock:
+                totals['reads'] += reads
+                totals['writes'] += writes
+                totals['locked'] += locked
+                totals['write_latencies' if write else 'read_latencies'].extend(latencies)
+
+        threads = [
+            threading.Thread(target=worker, args=(number, number < options['writers']))
+            for number in range(options['readers'] + options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        return {
+            'reads': totals['reads'],
+            'writes': totals['writes'],
+            'locked': totals['locked'],
+            'read_p95_ms': percentile(totals['read_latencies'], 0.95) if totals['read_latencies'] else 0.0,
+            'write_p95_ms': percentile(totals['write_latencies'], 0.95) if totals['write_latencies'] else 0.0,
+        }
@@ -0,0 +1,71 @@
+# cultivation/management/commands/bench_telemetry.py
+
+import datetime
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from cultivation import telemetry
+from cultivation.models import Environment, SensorReading, SensorRollup
+
+BENCH_EMAIL = 'bench-telemetry@growplant.invalid'
+
+
+class Command(BaseCommand):
+    help = "Mede a vazão (linhas/s) da ingestão de telemetria para diferentes tamanhos de lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000, help="Leituras por rodada.")
+        parser.add_argument(
+            '--batch-sizes', default='100,1000,5000,10000',
+            help="Tamanhos de lote separados por vírgula."
+        )
+        parser.add_argument('--environments', type=int, default=24, help="Ambientes (tendas) simulados.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        # Usuário descartável: tudo o que a rodada grava é removido no final
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        user = User.objects.create_user(email=BENCH_EMAIL, password=None)
+        try:
+            environments = Environment.objects.bulk_create([
+                Environment(owner=user, name=f"Tenda {i}", height=200, width=100, depth=100)
+                for i in range(options['environments'])
+            ])
+            environment_ids = {env.pk for env in environments}
+            lines = self._ndjson_lines(sorted(environment_ids), options['rows'])
+
+            self.stdout.write(f"{'lote':>8} {'linhas':>10} {'segundos':>10} {'linhas/s':>12}")
+            for batch_size in (int(size) for size in options['batch_sizes'].split(',')):
+                started = time.perf_counter()
+                result = telemetry.ingest_readings(
+                    telemetry.parse_ndjson(lines), environment_ids, batch_size=batch_size
+                )
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{batch_size:>8} {result.accepted:>10} {elapsed:>10.3f} {result.accepted / elapsed:>12,.0f}"
+                )
+                # Os agregados também: a próxima rodada começa do zero, não somando aos desta
+                SensorReading.objects.filter(environment_id__in=environment_ids).delete()
+                SensorRollup.objects.filter(environment_id__in=environment_ids).delete()
+        finally:
+            user.delete()
+
+    @staticmethod
+    def _ndjson_lines(environment_ids, rows):
+        """Gera o mesmo lote NDJSON que as sondas enviariam: 3 métricas por ambiente a cada 5 s."""
+        metrics = (('TEMP', 24.0), ('HUM', 60.0), ('CO2', 800.0))
+        start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        lines = []
+        for i in range(rows):
+            metric, base = metrics[i % 3]
+            tick = i // (3 * len(environment_ids))
+            lines.append(json.dumps({
+                'environment': environment_ids[(i // 3) % len(environment_ids)],
+                'metric': metric,
+                'value': base + (i % 17) / 10,
+                'recorded_at': (start + datetime.timedelta(seconds=5 * tick)).isoformat(),
+            }))
+        return lines
@@ -0,0 +1,260 @@
+# cultivation/management/commands/bench_views.py
+
+import datetime
+import json
+import statistics
+import subprocess
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.template.base import Template
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import NoReverseMatch, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from cultivation import urls as cultivation_urls
+from cultivation.models import Environment, Lighting, Plant, Stage
+from growplant.testing import route_names
+from user import urls as user_urls
+from user.tokens import account_activation_token
+
+from .generate_synthetic_data import SYNTHETIC_DOMAIN
+
+# Rotas que alteram estado ou exigem um corpo específico ficam fora da medição
+SKIPPED_ROUTES = {
+    'cultivation:telemetry_ingest': "somente POST (veja bench_telemetry)",
+    'cultivation:plant_bulk': "somente POST (altera as plantas marcadas)",
+    'logout': "encerra a sessão usada pelas demais rotas",
+}
+
+# Rotas com <pk> cujo objeto não sai do prefixo do nome (plant_detail -> plant)
+PK_TARGETS = {
+    'cultivation:journal_entry_add': 'plant',
+}
+
+
+def percentile(samples, fraction):
+    """Percentil pelo método do posto mais próximo."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class Instrumentation:
+    """Acumula, por requisição, consultas SQL, tempo de SQL e tempo de renderização de templates."""
+
+    def __init__(self):
+        self.reset()
+        self._depth = 0
+
+    def reset(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - started
+            self.queries += 1
+
+    def wrap_template_render(self, render):
+        instrumentation = self
+
+        def timed_render(template, context):
+            # Só o template mais externo conta: extends/include renderizam templates aninhados
+            instrumentation._depth += 1
+            started = time.perf_counter()
+            try:
+                return render(template, context)
+            finally:
+                instrumentation._depth -= 1
+                if instrumentation._depth == 0:
+                    instrumentation.template_seconds += time.perf_counter() - started
+
+        return timed_render
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede cada view de cultivation e user pelo cliente de testes do Django, sobre o banco "
+        "semeado com generate_synthetic_data, e grava p50/p95/p99, consultas, tempo de SQL e "
+        "tempo de template por rota em JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', default=f'user0@{SYNTHETIC_DOMAIN}', help="Usuário cujas páginas são medidas.")
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--routes', default='', help="Filtra rotas cujo nome contém este texto.")
+        parser.add_argument('--output', help="Arquivo JSON de saída.")
+        parser.add_argument('--compare', help="JSON de uma rodada anterior para comparar.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(
+                f"Usuário {options['email']} não encontrado. Rode antes: manage.py generate_synthetic_data"
+            )
+
+        setup_test_environment()  # e-mail em memória e 'testserver' em ALLOWED_HOSTS: nada sai da máquina
+        instrumentation = Instrumentation()
+        original_render = Template.render
+        Template.render = instrumentation.wrap_template_render(original_render)
+        try:
+            results = self._run(user, instrumentation, options)
+        finally:
+            Template.render = original_render
+            teardown_test_environment()
+
+        report = {'meta': self._meta(user, options), 'routes': results}
+        self._print(results, options.get('compare'))
+        if options.get('output'):
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['output']}"))
+
+    def _run(self, user, instrumentation, options):
+        routes = sorted(
+            route_names(cultivation_urls.urlpatterns, cultivation_urls.app_name) | route_names(user_urls.urlpatterns)
+        )
+        targets = self._targets(user)
+        authenticated = Client()
+        authenticated.force_login(user)
+        anonymous = Client()
+        results = {}
+
+        with connection.execute_wrapper(instrumentation):
+            for name in routes:
+                if options['routes'] and options['routes'] not in name:
+                    continue
+                if name in SKIPPED_ROUTES:
+                    self.stdout.write(f"  {name}: ignorada ({SKIPPED_ROUTES[name]})")
+                    continue
+                url, logged_in = self._url(name, targets)
+                client = authenticated if logged_in else anonymous
+
+                for _ in range(options['warmup']):
+                    self._get(client, url)
+                latencies, queries, sql, templates = [], [], [], []
+                for _ in range(options['iterations']):
+                    instrumentation.reset()
+                    started = time.perf_counter()
+                    response = self._get(client, url)
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    queries.append(instrumentation.queries)
+                    sql.append(instrumentation.sql_seconds * 1000)
+                    templates.append(instrumentation.template_seconds * 1000)
+
+                results[name] = {
+                    'status': response.status_code,
+                    'p50_ms': round(percentile(latencies, 0.50), 3),
+                    'p95_ms': round(percentile(latencies, 0.95), 3),
+                    'p99_ms': round(percentile(latencies, 0.99), 3),
+                    'mean_ms': round(statistics.fmean(latencies), 3),
+                    'queries': max(queries),
+                    'sql_ms': round(statistics.median(sql), 3),
+                    'template_ms': round(statistics.median(templates), 3),
+                }
+        return results
+
+    @staticmethod
+    def _get(client, url):
+        response = client.get(url)
+        if response.streaming:
+            # Respostas transmitidas (exportações CSV, API) só consultam e montam o corpo enquanto são lidas
+            for _chunk in response.streaming_content:
+                pass
+            response.close()
+        return response
+
+    @staticmethod
+    def _targets(user):
+        """Objetos do usuário usados nas rotas com <pk> (os mais carregados de cada tipo)."""
+        plant = Plant.objects.filter(owner=user, environment__isnull=False).first()
+        environment = plant.environment if plant else Environment.objects.filter(owner=user).first()
+        targets = {
+            'user': user,
+            'environment': environment,
+            'plant': plant,
+            'stage': Stage.objects.filter(owner=user).first(),
+            'lighting': Lighting.objects.first(),
+        }
+        missing = [name for name, obj in targets.items() if obj is None]
+        if missing:
+            raise CommandError(f"O usuário não tem dados suficientes ({', '.join(missing)}).")
+        return targets
+
+    @staticmethod
+    def _url(name, targets):
+        """Devolve (url, precisa_de_login) para uma rota nomeada."""
+        user = targets['user']
+        short = name.split(':')[-1]
+        if name.startswith('cultivation:'):
+            try:
+                return reverse(name), True
+            except NoReverseMatch:
+                pass
+            # A rota pede um <pk>: o objeto vem de PK_TARGETS ou do prefixo de *_detail/_edit/_delete
+            target = PK_TARGETS.get(name)
+            if target is None and short.endswith(('_detail', '_edit', '_delete')):
+                target = short.split('_')[0]
+            if target not in targets:
+                raise CommandError(f"Não sei qual objeto usar no <pk> da rota {name}: acrescente-a em PK_TARGETS.")
+            return reverse(name, kwargs={'pk': targets[target].pk}), True
+        uid = urlsafe_base64_encode(force_bytes(user.pk))
+        if short == 'activate':
+            return reverse(name, kwargs={'uidb64': uid, 'token': account_activation_token.make_token(user)}), False
+        if short == 'password_reset_confirm':
+            return reverse(name, kwargs={'uidb64': uid, 'token': default_token_generator.make_token(user)}), False
+        if short == 'resend_activation':
+            return reverse(name, kwargs={'emailb64': urlsafe_base64_encode(force_bytes(user.email))}), False
+        logged_in = short.startswith(('profile', 'password_change'))
+        return reverse(name), logged_in
+
+    @staticmethod
+    def _meta(user, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'iterations': options['iterations'],
+            'user': user.email,
+            'dataset': {
+                'plants': Plant.objects.filter(owner=user).count(),
+                'environments': Environment.objects.filter(owner=user).count(),
+                'stages': Stage.objects.filter(owner=user).count(),
+            },
+        }
+
+    def _print(self, results, compare_path):
+        baseline = {}
+        if compare_path:
+            with open(compare_path) as handle:
+                baseline = json.load(handle)['routes']
+        self.stdout.write(
+            f"{'rota':<40} {'p50':>8} {'p95':>8} {'p99':>8} {'sql#':>5} {'sql ms':>8} {'tpl ms':>8}"
+            + (f" {'Δp50':>8}" if baseline else '')
+        )
+        for name, row in results.items():
+            line = (
+                f"{name:<40} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+                f"{row['queries']:>5} {row['sql_ms']:>8.2f} {row['template_ms']:>8.2f}"
+            )
+            if name in baseline:
+                delta = (row['p50_ms'] - baseline[name]['p50_ms']) / baseline[name]['p50_ms'] * 100
+                line += f" {delta:>+7.1f}%"
+            self.stdout.write(line)
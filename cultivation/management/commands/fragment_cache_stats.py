@@ -0,0 +1,20 @@
+# cultivation/management/commands/fragment_cache_stats.py
+
+from django.core.management.base import BaseCommand
+
+from cultivation import cache
+
+
+class Command(BaseCommand):
+    help = "Mostra os acertos e falhas do cache de fragmentos das listas de plantas e ambientes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zera os contadores depois de mostrar.")
+
+    def handle(self, *args, **options):
+        stats = cache.stats()
+        self.stdout.write(
+            f"acertos: {stats['hits']}  falhas: {stats['misses']}  taxa de acerto: {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            cache.reset_stats()
@@ -0,0 +1,175 @@
+# cultivation/management/commands/generate_synthetic_data.py
+
+import datetime
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from cultivation import cache
+from cultivation.models import Environment, Lighting, Plant, Stage, Strain
+
+SYNTHETIC_DOMAIN = 'synthetic.growplant.invalid'
+
+STRAINS = [
+    'Skunk #1', 'White Widow', 'Northern Lights', 'Blue Dream', 'Gorilla Glue', 'Amnesia Haze',
+    'OG Kush', 'Girl Scout Cookies', 'Tomate Cereja', 'Manjericão Genovese', 'Pimenta Biquinho',
+    'Morango Albion', 'Alface Crespa', 'Variedade Desconhecida',
+]
+STAGE_PRESETS = [
+    ('Germinação', 18, 1), ('Plântula', 18, 2), ('Vegetativo', 18, 4),
+    ('Floração', 12, 8), ('Secagem', 0, 2), ('Cura', 0, 4),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera usuários, ambientes, estágios, plantas e luzes sintéticos para testes de carga. "
+        "O resultado é determinístico para uma mesma --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--environments', type=int, default=5, help="Ambientes por usuário.")
+        parser.add_argument('--stages', type=int, default=6, help="Estágios por usuário.")
+        parser.add_argument('--plants', type=int, default=100, help="Plantas por usuário.")
+        parser.add_argument('--lights-per-environment', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default='growplant123', help="Senha de todos os usuários gerados.")
+        parser.add_argument(
+            '--clear', action='store_true',
+            help=f"Remove antes os usuários sintéticos (@{SYNTHETIC_DOMAIN}) de rodadas anteriores."
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        started = time.perf_counter()
+        if options['clear']:
+            User.objects.filter(email__endswith=f'@{SYNTHETIC_DOMAIN}').delete()
+
+        lights = self._lighting_catalog()
+        # O hash da senha (PBKDF2) é caro: calculado uma única vez e reaproveitado por todos
+        password = make_password(options['password'])
+        batch_size = options['batch_size']
+        # Usuários são gerados em grupos, para limitar a memória mesmo com milhões de plantas
+        users_per_chunk = max(1, batch_size // max(1, options['plants']))
+
+        totals = {'users': 0, 'environments': 0, 'stages': 0, 'plants': 0, 'lights': 0}
+        for first in range(0, options['users'], users_per_chunk):
+            indexes = range(first, min(first + users_per_chunk, options['users']))
+            with transaction.atomic():
+                counts = self._generate_chunk(User, indexes, password, lights, options)
+            for key, value in counts.items():
+                totals[key] += value
+            self.stdout.write(f"  {indexes.stop}/{options['users']} usuários", ending='\r')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Gerados {totals['users']} usuários, {totals['environments']} ambientes, "
+            f"{totals['stages']} estágios, {totals['plants']} plantas e {totals['lights']} "
+            f"associações de luz em {elapsed:.1f}s."
+        ))
+
+    @staticmethod
+    def _lighting_catalog():
+        """Garante um catálogo global de luzes (tipo x potência é único) e o devolve."""
+        wanted = [
+            Lighting(light_type=light_type, watts=watts)
+            for light_type in Lighting.LightTypes.values for watts in (100, 200, 300, 600, 1000)
+        ]
+        Lighting.objects.bulk_create(wanted, ignore_conflicts=True)
+        # bulk_create não dispara sinais: invalida o catálogo de luzes dos processos à mão
+        cache.bump(cache.LIGHTING)
+        return list(Lighting.objects.order_by('pk').values_list('pk', flat=True))
+
+    def _generate_chunk(self, User, indexes, password, lights, options):
+        batch_size = options['batch_size']
+        # Um gerador por usuário, semeado pela semente e pelo índice: o resultado não
+        # depende do tamanho dos grupos nem da ordem em que eles são gravados.
+        rngs = {index: random.Random(f"{options['seed']}:{index}") for index in indexes}
+        joined = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+        users = User.objects.bulk_create([
+            User(email=f'user{index}@{SYNTHETIC_DOMAIN}', password=password, is_active=True, date_joined=joined)
+            for index in indexes
+        ], batch_size=batch_size)
+
+        environments = Environment.objects.bulk_create([
+            Environment(
+                owner=user, name=f'Tenda {number + 1}',
+                height=rngs[index].choice((120, 160, 180, 200)),
+                width=rngs[index].choice((60, 80, 100, 120, 150)),
+                depth=rngs[index].choice((60, 80, 100, 120, 150)),
+                light_exposure_hours=rngs[index].choice((12, 18, 20)),
+            )
+            for index, user in zip(indexes, users)
+            for number in range(options['environments'])
+        ], batch_size=batch_size)
+
+        environments_by_owner = {}
+        for environment in environments:
+            environments_by_owner.setdefault(environment.owner_id, []).append(environment.pk)
+
+        Through = Environment.lighting_system.through
+        per_environment = min(options['lights_per_environment'], len(lights))
+        through_rows = [
+            Through(environment_id=environment_id, lighting_id=light)
+            for index, user in zip(indexes, users)
+            for environment_id in environments_by_owner.get(user.pk, [])
+            for light in rngs[index].sample(lights, per_environment)
+        ]
+        Through.objects.bulk_create(through_rows, batch_size=batch_size)
+
+        stages = Stage.objects.bulk_create([
+            Stage(
+                owner=user,
+                name=STAGE_PRESETS[number % len(STAGE_PRESETS)][0]
+                + (f' {number // len(STAGE_PRESETS) + 1}' if number >= len(STAGE_PRESETS) else ''),
+                light_hours_on=STAGE_PRESETS[number % len(STAGE_PRESETS)][1],
+                duration=STAGE_PRESETS[number % len(STAGE_PRESETS)][2],
+            )
+            for user in users
+            for number in range(options['stages'])
+        ], batch_size=batch_size)
+        stages_by_owner = {}
+        for stage in stages:
+            stages_by_owner.setdefault(stage.owner_id, []).append(stage.pk)
+
+        # Variedades do catálogo global; a desconhecida fica sem variedade (NULL)
+        strain_ids = [
+            None if name == 'Variedade Desconhecida' else Strain.objects.intern(name).pk for name in STRAINS
+        ]
+
+        today = datetime.date(2026, 1, 1)
+        plants = 0
+        batch = []
+        for index, user in zip(indexes, users):
+            rng = rngs[index]
+            owner_environments = environments_by_owner.get(user.pk) or [None]
+            owner_stages = stages_by_owner.get(user.pk) or [None]
+            for number in range(options['plants']):
+                batch.append(Plant(
+                    owner_id=user.pk,
+                    # ~10% das plantas ficam sem ambiente, como na vida real
+                    environment_id=None if rng.random() < 0.1 else rng.choice(owner_environments),
+                    stage_id=rng.choice(owner_stages),
+                    name=f'Planta {number + 1}',
+                    strain_id=rng.choice(strain_ids),
+                    germination_date=today - datetime.timedelta(days=rng.randrange(365)),
+                    is_active=rng.random() < 0.8,
+                ))
+                if len(batch) >= batch_size:
+                    Plant.objects.bulk_create(batch, batch_size=batch_size)
+                    plants += len(batch)
+                    batch = []
+        Plant.objects.bulk_create(batch, batch_size=batch_size)
+        plants += len(batch)
+
+        return {
+            'users': len(users), 'environments': len(environments), 'stages': len(stages),
+            'plants': plants, 'lights': len(through_rows),
+        }
@@ -0,0 +1,17 @@
+# cultivation/management/commands/rebuild_rollups.py
+
+from django.core.management.base import BaseCommand
+
+from cultivation import rollups
+
+
+class Command(BaseCommand):
+    help = "Recalcula os agregados horários/diários da telemetria a partir das leituras brutas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('environments', nargs='*', type=int, help="IDs dos ambientes (padrão: todos).")
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rollups.rebuild(options['environments'] or None, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS("Agregados recalculados."))
@@ -0,0 +1,22 @@
+# cultivation/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from cultivation import search
+
+
+class Command(BaseCommand):
+    help = "Refaz os índices de busca (FTS5) das plantas e do diário, em blocos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=search.DEFAULT_CHUNK_SIZE,
+                            help="Linhas por transação.")
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("A busca indexada só existe no SQLite (FTS5).")
+        search.install()
+        counts = search.rebuild(chunk_size=options['chunk_size'])
+        for table, count in counts.items():
+            self.stdout.write(f"{table}: {count} linha(s)")
+        self.stdout.write(self.style.SUCCESS("Índices de busca refeitos."))
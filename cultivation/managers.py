@@ -0,0 +1,95 @@
+# cultivation/managers.py
+
+import datetime
+import unicodedata
+
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+CLONE_BATCH_SIZE = 2000
+
+
+class DaysBetween(models.Func):
+    """
+    Diferença em dias inteiros entre duas datas, calculada no banco.
+    No SQLite usa julianday(), que é nativo (a subtração de datas do Django
+    chamaria uma função Python para cada linha).
+    """
+    arg_joiner = ' - '
+    template = '(%(expressions)s)'
+    output_field = models.IntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='CAST(julianday(%(expressions)s) AS INTEGER)',
+            arg_joiner=') - julianday(',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function='DATEDIFF',
+                           template='%(function)s(%(expressions)s)', arg_joiner=', ', **extra_context)
+
+
+class PlantQuerySet(models.QuerySet):
+
+    def with_age(self, today=None):
+        """
+        Anota age_days (dias desde a germinação) e age_weeks (semanas completas),
+        lidos por Plant.age_in_days e Plant.age_in_weeks sem recalcular a data por planta.
+        """
+        today = today or datetime.date.today()
+        return self.annotate(
+            age_days=DaysBetween(models.Value(today, output_field=models.DateField()), 'germination_date'),
+        ).annotate(age_weeks=models.F('age_days') / 7)
+
+    def update_with_timestamp(self, **values):
+        """
+        Um único UPDATE nas plantas do queryset, mantendo o updated_at (o update()
+        do Django não passa pelo auto_now). Não dispara sinais: quem chama
+        invalida o cache (cache.bump).
+        """
+        return self.update(updated_at=timezone.now(), **values)
+
+    def clone(self, copies, batch_size=CLONE_BATCH_SIZE):
+        """
+        Cria `copies` cópias de cada planta do queryset com um bulk_create; as
+        cópias são numeradas no nome ("Skunk (cópia 2)"). Devolve as cópias.
+        """
+        name_length = self.model._meta.get_field('name').max_length
+        clones = []
+        for plant in self.order_by('pk'):
+            for number in range(1, copies + 1):
+                suffix = f" (cópia {number})"
+                clones.append(self.model(
+                    owner_id=plant.owner_id, environment_id=plant.environment_id, stage_id=plant.stage_id,
+                    name=plant.name[:name_length - len(suffix)] + suffix, strain_id=plant.strain_id,
+                    germination_date=plant.germination_date, is_active=plant.is_active,
+                ))
+        return self.model.objects.bulk_create(clones, batch_size=batch_size)
+
+
+def strain_key(name):
+    """Chave de um nome de variedade: sem maiúsculas, sem acentos e com os espaços normalizados."""
+    decomposed = unicodedata.normalize('NFKD', ' '.join(name.split()).casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+class StrainManager(models.Manager):
+
+    def intern(self, name):
+        """
+        A variedade de `name` (sem diferenciar maiúsculas, acentos e espaços),
+        criada se ainda não existe. Duas requisições criando o mesmo nome ao
+        mesmo tempo recebem a mesma variedade.
+        """
+        key = strain_key(name)
+        strain = self.filter(key=key).first()
+        if strain is not None:
+            return strain
+        try:
+            with transaction.atomic():
+                return self.create(name=name)
+        except IntegrityError:
+            return self.get(key=key)
@@ -0,0 +1,108 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:39
+
+import datetime
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Environment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Estufa', max_length=100, verbose_name='Nome do Ambiente')),
+                ('height', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Altura (cm)')),
+                ('width', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Largura (cm)')),
+                ('depth', models.DecimalField(decimal_places=2, max_digits=6, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))], verbose_name='Profundidade (cm)')),
+                ('light_exposure_hours', models.PositiveSmallIntegerField(default=12, help_text='Número de horas que as luzes ficam acesas por dia.', verbose_name='Tempo de Exposição à Luz (horas/dia)')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Ativo')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Ambiente de Cultivo',
+                'verbose_name_plural': 'Ambientes de Cultivo',
+            },
+        ),
+        migrations.CreateModel(
+            name='Lighting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('light_type', models.CharField(choices=[('LED', 'LED'), ('HPS', 'HPS'), ('MH', 'MH'), ('CMH', 'CMH'), ('FLR', 'Fluorescente'), ('OTH', 'Outro')], default='LED', max_length=3, verbose_name='Tipo de Luz')),
+                ('watts', models.PositiveIntegerField(verbose_name='Potência (Watts)')),
+            ],
+            options={
+                'verbose_name': 'Fonte de Luz',
+                'verbose_name_plural': 'Fontes de Luz',
+                'ordering': ['light_type', 'watts'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Plant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(default='Planta', help_text='Um nome ou identificador para esta planta específica. Ex: Skunk #1', max_length=100, verbose_name='Nome da Planta')),
+                ('strain', models.CharField(default='Variedade Desconhecida', help_text="O nome da variedade ou 'strain'. Ex: White Widow, Tomate Cereja", max_length=100, verbose_name='Genética / Variedade')),
+                ('germination_date', models.DateField(default=datetime.date.today, verbose_name='Data de Germinação')),
+                ('is_active', models.BooleanField(default=True, help_text='Desmarque se a planta foi descartada ou não está mais sendo monitorada.', verbose_name='Ativa')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Planta',
+                'verbose_name_plural': 'Plantas',
+                'ordering': ['-germination_date', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorReading',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('TEMP', 'Temperatura (°C)'), ('HUM', 'Umidade Relativa (%)'), ('CO2', 'CO2 (ppm)')], max_length=4, verbose_name='Métrica')),
+                ('value', models.FloatField(verbose_name='Valor')),
+                ('recorded_at', models.DateTimeField(verbose_name='Registrado em')),
+            ],
+            options={
+                'verbose_name': 'Leitura de Sensor',
+                'verbose_name_plural': 'Leituras de Sensores',
+            },
+        ),
+        migrations.CreateModel(
+            name='SensorRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('TEMP', 'Temperatura (°C)'), ('HUM', 'Umidade Relativa (%)'), ('CO2', 'CO2 (ppm)')], max_length=4, verbose_name='Métrica')),
+                ('resolution', models.CharField(choices=[('H', 'Hora'), ('D', 'Dia')], max_length=1, verbose_name='Resolução')),
+                ('bucket_start', models.DateTimeField(verbose_name='Início do Intervalo')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Leituras')),
+                ('total', models.FloatField(default=0, verbose_name='Soma')),
+                ('minimum', models.FloatField(verbose_name='Mínimo')),
+                ('maximum', models.FloatField(verbose_name='Máximo')),
+            ],
+            options={
+                'verbose_name': 'Agregado de Leituras',
+                'verbose_name_plural': 'Agregados de Leituras',
+            },
+        ),
+        migrations.CreateModel(
+            name='Stage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome do Estágio')),
+                ('light_hours_on', models.PositiveSmallIntegerField(default=12, help_text='Número de horas que as luzes ficam LIGADAS por dia neste estágio.', verbose_name='Horas de Luz (Ligada)')),
+                ('duration', models.PositiveIntegerField(verbose_name='Duração Estimada')),
+                ('duration_unit', models.CharField(choices=[('D', 'Dias'), ('W', 'Semanas')], default='W', max_length=1, verbose_name='Unidade de Duração')),
+            ],
+            options={
+                'verbose_name': 'Estágio de Cultivo',
+                'verbose_name_plural': 'Estágios de Cultivo',
+            },
+        ),
+    ]
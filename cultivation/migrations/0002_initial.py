@@ -0,0 +1,90 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('cultivation', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='environment',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='environments', to=settings.AUTH_USER_MODEL, verbose_name='Proprietário'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='lighting',
+            unique_together={('light_type', 'watts')},
+        ),
+        migrations.AddField(
+            model_name='environment',
+            name='lighting_system',
+            field=models.ManyToManyField(blank=True, to='cultivation.lighting', verbose_name='Sistema de Iluminação'),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='environment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='plants', to='cultivation.environment', verbose_name='Ambiente de Cultivo'),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='owner',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='plants', to=settings.AUTH_USER_MODEL, verbose_name='Proprietário'),
+        ),
+        migrations.AddField(
+            model_name='sensorreading',
+            name='environment',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='readings', to='cultivation.environment', verbose_name='Ambiente de Cultivo'),
+        ),
+        migrations.AddField(
+            model_name='sensorrollup',
+            name='environment',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='cultivation.environment', verbose_name='Ambiente de Cultivo'),
+        ),
+        migrations.AddField(
+            model_name='stage',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='stage',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='cultivation.stage', verbose_name='Estágio Atual'),
+        ),
+        migrations.AddIndex(
+            model_name='environment',
+            index=models.Index(fields=['owner', 'is_active'], name='environment_owner_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensorreading',
+            index=models.Index(fields=['environment', 'metric', 'recorded_at'], name='reading_env_metric_time_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sensorrollup',
+            constraint=models.UniqueConstraint(fields=('environment', 'metric', 'resolution', 'bucket_start'), name='unique_rollup_bucket'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stage',
+            unique_together={('owner', 'name')},
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['owner', '-germination_date', 'name'], name='plant_owner_germination_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['owner', 'environment'], name='plant_owner_environment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['owner', 'is_active'], name='plant_owner_active_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='plant',
+            name='plant_owner_environment_idx',
+        ),
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['owner', '-environment', '-germination_date', 'name'], name='plant_owner_env_list_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0003_plant_env_list_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['owner', 'updated_at'], name='plant_owner_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0004_plant_owner_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plant',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Última Atividade'),
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='last_entry_kind',
+            field=models.CharField(blank=True, choices=[('NOTE', 'Anotação'), ('WATR', 'Rega'), ('FEED', 'Nutrição'), ('MEAS', 'Medição')], editable=False, max_length=4, verbose_name='Tipo da Última Entrada'),
+        ),
+        migrations.CreateModel(
+            name='JournalEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('NOTE', 'Anotação'), ('WATR', 'Rega'), ('FEED', 'Nutrição'), ('MEAS', 'Medição')], default='NOTE', max_length=4, verbose_name='Tipo')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Data')),
+                ('note', models.TextField(blank=True, verbose_name='Anotação')),
+                ('volume_ml', models.PositiveIntegerField(blank=True, null=True, verbose_name='Volume (ml)')),
+                ('ph', models.DecimalField(blank=True, decimal_places=1, max_digits=3, null=True, verbose_name='pH')),
+                ('ec', models.DecimalField(blank=True, decimal_places=2, max_digits=4, null=True, verbose_name='EC (mS/cm)')),
+                ('height_cm', models.DecimalField(blank=True, decimal_places=1, max_digits=6, null=True, verbose_name='Altura (cm)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('plant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='journal_entries', to='cultivation.plant', verbose_name='Planta')),
+            ],
+            options={
+                'verbose_name': 'Entrada do Diário',
+                'verbose_name_plural': 'Entradas do Diário',
+                'indexes': [models.Index(fields=['plant', 'recorded_at'], name='journal_plant_timeline_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Índices de busca textual (FTS5) das plantas e do diário; veja cultivation/search.py
+#
+# O SQL fica congelado aqui, como estava nesta migração: o search.py acompanha o
+# esquema atual (a 0007 troca a coluna strain pela tabela de variedades).
+
+from django.db import migrations
+
+PLANT_TABLE = 'cultivation_plant_search'
+JOURNAL_TABLE = 'cultivation_journal_search'
+TABLE_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'"
+
+SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {PLANT_TABLE} USING fts5(owner, name, strain, environment, {TABLE_OPTIONS})",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {JOURNAL_TABLE} USING fts5(owner, note, {TABLE_OPTIONS})",
+)
+
+_PLANT_ROW = (
+    "new.id, 'u' || new.owner_id, new.name, new.strain, "
+    "(SELECT name FROM cultivation_environment WHERE id = new.environment_id)"
+)
+
+TRIGGERS = {
+    'cultivation_plant_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_ai AFTER INSERT ON cultivation_plant BEGIN
+            INSERT OR REPLACE INTO {PLANT_TABLE}(rowid, owner, name, strain, environment) VALUES ({_PLANT_ROW});
+        END""",
+    # Só quando muda algo indexado: o save() regrava todas as colunas, e a última atividade do
+    # diário (Plant.last_activity_at) é atualizada a cada entrada
+    'cultivation_plant_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_au AFTER UPDATE ON cultivation_plant
+        WHEN old.name IS NOT new.name OR old.strain IS NOT new.strain
+          OR old.environment_id IS NOT new.environment_id OR old.owner_id IS NOT new.owner_id BEGIN
+            INSERT OR REPLACE INTO {PLANT_TABLE}(rowid, owner, name, strain, environment) VALUES ({_PLANT_ROW});
+        END""",
+    'cultivation_plant_search_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_ad AFTER DELETE ON cultivation_plant BEGIN
+            DELETE FROM {PLANT_TABLE} WHERE rowid = old.id;
+        END""",
+    # A planta mudou de dono (admin): as entradas do diário dela vão junto
+    'cultivation_journal_search_owner_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_journal_search_owner_au AFTER UPDATE ON cultivation_plant
+        WHEN old.owner_id IS NOT new.owner_id BEGIN
+            UPDATE {JOURNAL_TABLE} SET owner = 'u' || new.owner_id
+            WHERE rowid IN (SELECT id FROM cultivation_journalentry WHERE plant_id = new.id);
+        END""",
+    'cultivation_environment_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_environment_search_au AFTER UPDATE ON cultivation_environment
+        WHEN old.name IS NOT new.name BEGIN
+            UPDATE {PLANT_TABLE} SET environment = new.name
+            WHERE rowid IN (SELECT id FROM cultivation_plant WHERE environment_id = new.id);
+        END""",
+    'cultivation_journal_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_journal_search_ai AFTER INSERT ON cultivation_journalentry
+        WHEN new.note <> '' BEGIN
+            INSERT OR REPLACE INTO {JOURNAL_TABLE}(rowid, owner, note)
+            SELECT new.id, 'u' || owner_id, new.note FROM cultivation_plant WHERE id = new.plant_id;
+        END""",
+    # O diário só recebe entradas novas, mas elas somem junto com a planta
+    'cultivation_journal_search_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_journal_search_ad AFTER DELETE ON cultivation_journalentry BEGIN
+            DELETE FROM {JOURNAL_TABLE} WHERE rowid = old.id;
+        END""",
+}
+
+SOURCES = {
+    PLANT_TABLE: (
+        'cultivation_plant',
+        f"""INSERT INTO {PLANT_TABLE}(rowid, owner, name, strain, environment)
+            SELECT p.id, 'u' || p.owner_id, p.name, p.strain, e.name
+            FROM cultivation_plant p LEFT JOIN cultivation_environment e ON e.id = p.environment_id
+            WHERE p.id > %s AND p.id <= %s""",
+    ),
+    JOURNAL_TABLE: (
+        'cultivation_journalentry',
+        f"""INSERT INTO {JOURNAL_TABLE}(rowid, owner, note)
+            SELECT j.id, 'u' || p.owner_id, j.note
+            FROM cultivation_journalentry j JOIN cultivation_plant p ON p.id = j.plant_id
+            WHERE j.id > %s AND j.id <= %s AND j.note <> ''""",
+    ),
+}
+
+
+def install(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    # Indexa o que já existe; daqui em diante os triggers mantêm os índices
+    with schema_editor.connection.cursor() as cursor:
+        for statement in (*SCHEMA, *TRIGGERS.values()):
+            cursor.execute(statement)
+        for source, insert in SOURCES.values():
+            cursor.execute(f"SELECT MAX(id) FROM {source}")
+            upper = cursor.fetchone()[0]
+            if upper is not None:
+                cursor.execute(insert, [0, upper])
+
+
+def uninstall(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for table in (PLANT_TABLE, JOURNAL_TABLE):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0005_journal'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,169 @@
+# Variedades normalizadas: Plant.strain deixa de ser texto livre e passa a apontar para
+# cultivation_strain, com um registro por nome (sem diferenciar maiúsculas, acentos e espaços)
+
+import importlib
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+UNKNOWN_STRAIN = 'Variedade Desconhecida'
+BATCH_SIZE = 2000
+
+search_0006 = importlib.import_module('cultivation.migrations.0006_search')
+PLANT_TABLE = search_0006.PLANT_TABLE
+
+# Triggers da busca que mudam com a tabela de variedades; os outros são os da 0006
+_PLANT_ROW = (
+    "new.id, 'u' || new.owner_id, new.name, "
+    "(SELECT name FROM cultivation_strain WHERE id = new.strain_id), "
+    "(SELECT name FROM cultivation_environment WHERE id = new.environment_id)"
+)
+
+TRIGGERS = {
+    'cultivation_plant_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_ai AFTER INSERT ON cultivation_plant BEGIN
+            INSERT OR REPLACE INTO {PLANT_TABLE}(rowid, owner, name, strain, environment) VALUES ({_PLANT_ROW});
+        END""",
+    'cultivation_plant_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_au AFTER UPDATE ON cultivation_plant
+        WHEN old.name IS NOT new.name OR old.strain_id IS NOT new.strain_id
+          OR old.environment_id IS NOT new.environment_id OR old.owner_id IS NOT new.owner_id BEGIN
+            INSERT OR REPLACE INTO {PLANT_TABLE}(rowid, owner, name, strain, environment) VALUES ({_PLANT_ROW});
+        END""",
+    'cultivation_plant_search_ad': search_0006.TRIGGERS['cultivation_plant_search_ad'],
+    'cultivation_journal_search_owner_au': search_0006.TRIGGERS['cultivation_journal_search_owner_au'],
+    'cultivation_strain_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_strain_search_au AFTER UPDATE ON cultivation_strain
+        WHEN old.name IS NOT new.name BEGIN
+            UPDATE {PLANT_TABLE} SET strain = new.name
+            WHERE rowid IN (SELECT id FROM cultivation_plant WHERE strain_id = new.id);
+        END""",
+}
+
+PLANT_SOURCE = f"""
+    INSERT INTO {PLANT_TABLE}(rowid, owner, name, strain, environment)
+    SELECT p.id, 'u' || p.owner_id, p.name, s.name, e.name
+    FROM cultivation_plant p
+    LEFT JOIN cultivation_strain s ON s.id = p.strain_id
+    LEFT JOIN cultivation_environment e ON e.id = p.environment_id"""
+
+
+def strain_key(name):
+    # Cópia de cultivation.managers.strain_key, como estava nesta migração
+    decomposed = unicodedata.normalize('NFKD', ' '.join(name.split()).casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _execute(schema_editor, statements):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def drop_old_triggers(apps, schema_editor):
+    _execute(schema_editor, [f"DROP TRIGGER IF EXISTS {name}" for name in search_0006.TRIGGERS])
+
+
+def restore_old_triggers(apps, schema_editor):
+    _execute(schema_editor, search_0006.TRIGGERS.values())
+
+
+def install_triggers(apps, schema_editor):
+    # Os da 0006 que não mudaram também: todos foram apagados no começo desta migração.
+    # Os nomes das variedades mudaram (grafia canônica, desconhecida -> vazio): reindexa as plantas
+    _execute(schema_editor, [
+        *{**search_0006.TRIGGERS, **TRIGGERS}.values(),
+        f"DELETE FROM {PLANT_TABLE}", PLANT_SOURCE,
+    ])
+
+
+def drop_triggers(apps, schema_editor):
+    _execute(schema_editor, [f"DROP TRIGGER IF EXISTS {name}" for name in {**search_0006.TRIGGERS, **TRIGGERS}])
+
+
+def create_strains(apps, schema_editor):
+    Plant = apps.get_model('cultivation', 'Plant')
+    Strain = apps.get_model('cultivation', 'Strain')
+    # Uma variedade por chave; a grafia mais usada vira o nome dela
+    by_key = {}
+    targets = {}
+    spellings = Plant.objects.order_by().values('strain').annotate(plants=Count('pk')).order_by('-plants', 'strain')
+    for row in spellings:
+        name = ' '.join(row['strain'].split())
+        key = strain_key(name)
+        if not key or key == strain_key(UNKNOWN_STRAIN):
+            continue
+        by_key.setdefault(key, name)
+        targets[row['strain']] = key
+    Strain.objects.bulk_create(
+        [Strain(name=name, key=key) for key, name in by_key.items()], batch_size=BATCH_SIZE,
+    )
+    pks = dict(Strain.objects.values_list('key', 'pk'))
+    # Em blocos de pk: um UPDATE por variedade presente no bloco, sem varrer a tabela por nome
+    last = 0
+    while True:
+        rows = list(
+            Plant.objects.filter(pk__gt=last).order_by('pk').values_list('pk', 'strain')[:BATCH_SIZE]
+        )
+        if not rows:
+            break
+        groups = {}
+        for pk, name in rows:
+            if name in targets:
+                groups.setdefault(pks[targets[name]], []).append(pk)
+        for strain_pk, plant_pks in groups.items():
+            Plant.objects.filter(pk__in=plant_pks).update(strain_ref_id=strain_pk)
+        last = rows[-1][0]
+
+
+def restore_names(apps, schema_editor):
+    Plant = apps.get_model('cultivation', 'Plant')
+    Strain = apps.get_model('cultivation', 'Strain')
+    # A coluna volta com o valor padrão (UNKNOWN_STRAIN): só as plantas com variedade mudam
+    for pk, name in Strain.objects.values_list('pk', 'name'):
+        Plant.objects.filter(strain_ref_id=pk).update(strain=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0006_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_old_triggers, restore_old_triggers),
+        migrations.CreateModel(
+            name='Strain',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nome')),
+                ('key', models.CharField(editable=False, max_length=100, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Variedade',
+                'verbose_name_plural': 'Variedades',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='plant',
+            name='strain_ref',
+            field=models.ForeignKey(blank=True, help_text="O nome da variedade ou 'strain'. Ex: White Widow, Tomate Cereja", null=True, on_delete=django.db.models.deletion.PROTECT, related_name='plants', to='cultivation.strain', verbose_name='Genética / Variedade'),
+        ),
+        migrations.RunPython(create_strains, restore_names),
+        migrations.RemoveField(
+            model_name='plant',
+            name='strain',
+        ),
+        migrations.RenameField(
+            model_name='plant',
+            old_name='strain_ref',
+            new_name='strain',
+        ),
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0007_strain'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='environment',
+            index=models.Index(fields=['owner', 'name'], name='environment_owner_name_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cultivation', '0008_environment_owner_name_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plant',
+            index=models.Index(fields=['owner', 'strain'], name='plant_owner_strain_idx'),
+        ),
+    ]
@@ -0,0 +1,140 @@
+# cultivation/mixins.py
+
+import hashlib
+from datetime import date
+
+from django.contrib import messages
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import condition
+from django.views.generic.base import ContextMixin
+
+from . import cache
+from .catalog import strains as strain_catalog
+from .pagination import KeysetPage
+
+
+def page_etag(request, scopes, validator):
+    """ETag de uma página do usuário: endereço, data de hoje, versões de `scopes` e as partes de `validator`."""
+    return _page_etag(request, cache.get_versions(request.user.pk, scopes), validator)
+
+
+async def apage_etag(request, scopes, validator):
+    """page_etag com as versões lidas pela API assíncrona do cache."""
+    return _page_etag(request, await cache.aget_versions(request.user.pk, scopes), validator)
+
+
+def _page_etag(request, versions, validator):
+    parts = (request.get_full_path(), request.user.pk, date.today(), versions, *validator)
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+class OwnerScopedObjectMixin:
+    """
+    Restringe as views de objeto único aos registros do usuário logado.
+
+    O filtro por dono vai direto no `get_queryset`, então o objeto é buscado
+    com um único SELECT (que já devolve 404 se ele for de outro usuário)
+    e fica guardado para o resto da requisição, em vez de ser buscado uma
+    vez no `test_func` e de novo pela view genérica.
+    As views podem estender `get_queryset` com select_related/prefetch_related
+    para o que o template usa.
+    """
+    owner_field = 'owner'
+
+    def get_queryset(self):
+        return super().get_queryset().filter(**{self.owner_field: self.request.user})
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_owner_scoped_object'):
+            self._owner_scoped_object = super().get_object()
+        return self._owner_scoped_object
+
+
+class FragmentCachedListMixin:
+    """
+    Guarda no cache o HTML dos cards de cada página de uma lista paginada por
+    cursor (KeysetPaginationMixin), com a chave montada pelo usuário, pelas
+    versões dos escopos de que os cards dependem e pelo cursor.
+
+    Num acerto a view não consulta a lista nem renderiza os cards: o template
+    só insere `fragment_html`. O cabeçalho X-Fragment-Cache diz se foi hit ou miss.
+    """
+    fragment_name = None
+    fragment_template = None
+    fragment_scopes = ()
+
+    def get_fragment_key_parts(self):
+        """Partes extras da chave, para o que os cards mostram além dos escopos (ex.: a data de hoje)."""
+        return ()
+
+    def get_context_data(self, **kwargs):
+        cursor = self.request.GET.get(self.cursor_kwarg, '')
+        key = cache.fragment_key(
+            self.fragment_name, self.request.user.pk, self.fragment_scopes, cursor, *self.get_fragment_key_parts(),
+        )
+        cached = cache.get_fragment(key)
+        if cached is not None:
+            self.fragment_cache_status = 'hit'
+            page = KeysetPage([], next_cursor=cached['next_cursor'], cursor=cursor or None)
+            # Pula o get_context_data do ListView, que é quem executa a consulta da página
+            context = ContextMixin.get_context_data(self, **kwargs)
+            context.update({
+                'paginator': None, 'page_obj': page, 'is_paginated': page.has_other_pages(),
+                'object_list': [], 'fragment_html': mark_safe(cached['html']),
+            })
+            return context
+
+        self.fragment_cache_status = 'miss'
+        context = super().get_context_data(**kwargs)
+        # Os cards leem o nome da variedade de cada planta: uma conferência da versão para todos
+        with strain_catalog.pinned():
+            html = render_to_string(self.fragment_template, context)
+        cache.set_fragment(key, {'html': str(html), 'next_cursor': context['page_obj'].next_cursor})
+        context['fragment_html'] = html
+        return context
+
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        response['X-Fragment-Cache'] = self.fragment_cache_status
+        return response
+
+
+class ConditionalGetMixin:
+    """
+    GET condicional: a ETag é calculada antes de a view rodar, a partir dos
+    contadores de versão do usuário (cache.py), de `get_validator_parts` (por
+    exemplo o max(updated_at) das plantas) e da data de hoje (as páginas
+    mostram a idade das plantas). Se o navegador mandar a mesma ETag em
+    If-None-Match, a resposta é um 304 sem consultar a lista nem renderizar.
+
+    Não há Last-Modified: excluir uma planta ou renomear um ambiente não
+    move o max(updated_at), então só a ETag identifica a versão com segurança.
+    Com mensagens pendentes (o "salvo com sucesso" depois de um redirect) a
+    página é sempre renderizada, para que a mensagem apareça.
+    """
+    # As plantas mostram o nome da variedade, vindo do catálogo global
+    conditional_scopes = ('plant', 'environment', 'stage', cache.STRAIN)
+
+    def get_validator_parts(self):
+        """Partes da ETag além das versões; None desliga o GET condicional (ex.: objeto inexistente)."""
+        return ()
+
+    def get_etag(self, request, *args, **kwargs):
+        if len(messages.get_messages(request)):
+            return None
+        validator = self.get_validator_parts()
+        if validator is None:
+            return None
+        return page_etag(request, self.conditional_scopes, validator)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or not request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        view = condition(etag_func=self.get_etag)(super().dispatch)
+        response = view(request, *args, **kwargs)
+        # A página depende da sessão: nada de cache compartilhado, e sempre revalidar
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -1,11 +1,14 @@
 import datetime
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import decimal
 
+from .managers import PlantQuerySet, StrainManager, strain_key
+
 class Lighting(models.Model):
     """
     Representa uma fonte de luz que pode ser usada em um ambiente.
@@ -95,6 +98,12 @@ class Environment(models.Model):
     class Meta:
         verbose_name = _("Ambiente de Cultivo")
         verbose_name_plural = _("Ambientes de Cultivo")
+        indexes = [
+            # Ambientes ativos de um usuário (formulário de planta, filtros)
+            models.Index(fields=['owner', 'is_active'], name='environment_owner_active_idx'),
+            # Busca de ambientes pelo nome no formulário de planta, paginada na ordem do nome
+            models.Index(fields=['owner', 'name'], name='environment_owner_name_idx'),
+        ]
 
 class Stage(models.Model):
     """
@@ -134,6 +143,48 @@ class Stage(models.Model):
         # Garante que um usuário não pode ter dois estágios com o mesmo nome
         unique_together = ('owner', 'name')
 
+
+class EntryKind(models.TextChoices):
+    """Tipos de entrada do diário (JournalEntry.Kind); também usados em Plant.last_entry_kind."""
+    NOTE = 'NOTE', _('Anotação')
+    WATERING = 'WATR', _('Rega')
+    FEEDING = 'FEED', _('Nutrição')
+    MEASUREMENT = 'MEAS', _('Medição')
+
+
+class Strain(models.Model):
+    """
+    Variedade (genética) do catálogo global, compartilhado por todos os
+    usuários: cada nome existe uma vez só, e as plantas guardam só o id.
+    Cada usuário só vê as variedades das próprias plantas (StrainCatalog.used_by).
+
+    Nomes que diferem só em maiúsculas, acentos ou espaços são a mesma
+    variedade (o campo `key`). Use Strain.objects.intern(nome) para obter a
+    variedade de um nome, criando-a se ainda não existe.
+    """
+    name = models.CharField(max_length=100, verbose_name=_("Nome"))
+    key = models.CharField(max_length=100, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = StrainManager()
+
+    def save(self, *args, **kwargs):
+        self.name = ' '.join(self.name.split())
+        self.key = strain_key(self.name)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = _("Variedade")
+        verbose_name_plural = _("Variedades")
+        ordering = ['name']
+
+
+UNKNOWN_STRAIN = _("Variedade Desconhecida")
+
+
 class Plant(models.Model):
     """
     Representa uma única planta sendo cultivada.
@@ -150,6 +201,8 @@ class Plant(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
         related_name='plants',
+        # Os índices compostos abaixo já começam pelo proprietário
+        db_index=False,
         verbose_name=_("Proprietário")
     )
     environment = models.ForeignKey(
@@ -166,10 +219,13 @@ class Plant(models.Model):
         default="Planta",
         help_text=_("Um nome ou identificador para esta planta específica. Ex: Skunk #1")
     )
-    strain = models.CharField(
-        max_length=100,
+    strain = models.ForeignKey(
+        Strain,
+        on_delete=models.PROTECT,  # Uma variedade em uso não pode sumir do catálogo
+        null=True,                 # Sem variedade: "Variedade Desconhecida"
+        blank=True,
+        related_name='plants',
         verbose_name=_("Genética / Variedade"),
-        default="Variedade Desconhecida",
         help_text=_("O nome da variedade ou 'strain'. Ex: White Widow, Tomate Cereja")
     )
     germination_date = models.DateField(verbose_name=_("Data de Germinação"), default=datetime.date.today)
@@ -187,13 +243,43 @@ class Plant(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Cópia da entrada mais recente do diário (mantida por JournalEntry.save), para as
+    # listas mostrarem a última atividade sem consultar o diário de cada planta
+    last_activity_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                            verbose_name=_("Última Atividade"))
+    last_entry_kind = models.CharField(max_length=4, blank=True, editable=False, choices=EntryKind.choices,
+                                       verbose_name=_("Tipo da Última Entrada"))
+
+    objects = PlantQuerySet.as_manager()
+
+    # Campos cujas mudanças viram eventos ao vivo (events.py, via signals.py)
+    tracked_fields = ('environment_id', 'stage_id')
 
     def __str__(self):
-        return f"{self.name} ({self.strain})"
+        return f"{self.name} ({self.strain_name})"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        plant = super().from_db(db, field_names, values)
+        # Os valores como vieram do banco, para o post_save saber o que mudou sem consultar de novo
+        plant._loaded_values = {name: plant.__dict__[name] for name in cls.tracked_fields if name in plant.__dict__}
+        return plant
+
+    @property
+    def strain_name(self):
+        """Nome da variedade, lido do catálogo em memória (catalog.py): nenhuma consulta por planta."""
+        if self.strain_id is None:
+            return UNKNOWN_STRAIN
+        from .catalog import strains
+        # Com on_delete=PROTECT a variedade existe: fora do catálogo, ela é buscada no banco
+        return strains.get(self.strain_id).name
 
     @property
     def age_in_days(self):
         """Calcula a idade da planta em dias desde a germinação."""
+        # Já calculada pelo banco quando a planta veio de Plant.objects.with_age()
+        if 'age_days' in self.__dict__:
+            return self.age_days
         from datetime import date
         today = date.today()
         age = today - self.germination_date
@@ -207,7 +293,8 @@ class Plant(models.Model):
         if days_old < 0:
             return "Ainda não germinou"
 
-        weeks = days_old // 7  # Divisão inteira para obter o número de semanas completas
+        # Divisão inteira para obter o número de semanas completas (ou a anotação age_weeks)
+        weeks = self.__dict__.get('age_weeks', days_old // 7)
         days = days_old % 7  # O resto da divisão para obter os dias restantes
 
         if weeks > 0 and days > 0:
@@ -220,4 +307,157 @@ class Plant(models.Model):
     class Meta:
         verbose_name = _("Planta")
         verbose_name_plural = _("Plantas")
-        ordering = ['-germination_date', 'name']
\ No newline at end of file
+        ordering = ['-germination_date', 'name']
+        indexes = [
+            # Lista de plantas do usuário, já na ordem de Meta.ordering (o SQLite completa com o rowid,
+            # então o desempate por pk da paginação por cursor também sai do índice)
+            models.Index(fields=['owner', '-germination_date', 'name'], name='plant_owner_germination_idx'),
+            # Lista de plantas agrupada por ambiente (ambientes mais novos primeiro, plantas sem
+            # ambiente no fim); o prefixo (owner, environment) também atende filtros por ambiente
+            models.Index(fields=['owner', '-environment', '-germination_date', 'name'],
+                         name='plant_owner_env_list_idx'),
+            # Plantas ativas/inativas de um usuário
+            models.Index(fields=['owner', 'is_active'], name='plant_owner_active_idx'),
+            # max(updated_at) das plantas de um usuário (GET condicional) sai de uma única busca no índice
+            models.Index(fields=['owner', 'updated_at'], name='plant_owner_updated_idx'),
+            # Variedades usadas por um usuário (autocompletar e API), lidas só do índice
+            models.Index(fields=['owner', 'strain'], name='plant_owner_strain_idx'),
+        ]
+
+class JournalEntry(models.Model):
+    """
+    Entrada do diário de uma planta (anotação, rega, nutrição ou medição).
+
+    O diário só recebe entradas novas: uma entrada salva não pode ser
+    alterada nem excluída (some junto com a planta). Cada entrada nova
+    atualiza Plant.last_activity_at/last_entry_kind na mesma transação.
+    """
+    Kind = EntryKind
+
+    plant = models.ForeignKey(
+        Plant,
+        on_delete=models.CASCADE,
+        related_name='journal_entries',
+        # Coberto pelo índice da linha do tempo, que começa pela planta
+        db_index=False,
+        verbose_name=_("Planta")
+    )
+    kind = models.CharField(max_length=4, choices=EntryKind.choices, default=EntryKind.NOTE,
+                            verbose_name=_("Tipo"))
+    recorded_at = models.DateTimeField(default=timezone.now, verbose_name=_("Data"))
+    note = models.TextField(blank=True, verbose_name=_("Anotação"))
+    volume_ml = models.PositiveIntegerField(null=True, blank=True, verbose_name=_("Volume (ml)"))
+    ph = models.DecimalField(max_digits=3, decimal_places=1, null=True, blank=True, verbose_name=_("pH"))
+    ec = models.DecimalField(max_digits=4, decimal_places=2, null=True, blank=True, verbose_name=_("EC (mS/cm)"))
+    height_cm = models.DecimalField(max_digits=6, decimal_places=1, null=True, blank=True,
+                                    verbose_name=_("Altura (cm)"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class AppendOnly(Exception):
+        """Tentativa de alterar ou excluir uma entrada já gravada."""
+
+    def __str__(self):
+        return f"{self.get_kind_display()} @ {self.recorded_at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise self.AppendOnly("Entradas do diário não podem ser alteradas.")
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            # Uma entrada retroativa não substitui uma mais recente
+            Plant.objects.filter(
+                models.Q(last_activity_at__isnull=True) | models.Q(last_activity_at__lte=self.recorded_at),
+                pk=self.plant_id,
+            ).update(last_activity_at=self.recorded_at, last_entry_kind=self.kind)
+
+    def delete(self, *args, **kwargs):
+        raise self.AppendOnly("Entradas do diário não podem ser excluídas.")
+
+    class Meta:
+        verbose_name = _("Entrada do Diário")
+        verbose_name_plural = _("Entradas do Diário")
+        indexes = [
+            # Linha do tempo de uma planta, mais novas primeiro: lido de trás para frente. O SQLite
+            # completa o índice com o rowid, então o desempate por -pk do cursor também sai dele
+            # (um índice em -recorded_at inverteria só a data, e o pk precisaria de ordenação em memória)
+            models.Index(fields=['plant', 'recorded_at'], name='journal_plant_timeline_idx'),
+        ]
+
+
+class SensorReading(models.Model):
+    """
+    Representa uma leitura de sensor (temperatura, umidade, CO2) de um ambiente.
+    Tabela de série temporal: escrita em lote e consultada por intervalo de tempo.
+    """
+    class Metric(models.TextChoices):
+        TEMPERATURE = 'TEMP', _('Temperatura (°C)')
+        HUMIDITY = 'HUM', _('Umidade Relativa (%)')
+        CO2 = 'CO2', _('CO2 (ppm)')
+
+    environment = models.ForeignKey(
+        Environment,
+        on_delete=models.CASCADE,
+        related_name='readings',
+        # O índice composto abaixo já começa pelo ambiente, então o índice simples da FK é dispensável
+        db_index=False,
+        verbose_name=_("Ambiente de Cultivo")
+    )
+    metric = models.CharField(max_length=4, choices=Metric.choices, verbose_name=_("Métrica"))
+    value = models.FloatField(verbose_name=_("Valor"))
+    recorded_at = models.DateTimeField(verbose_name=_("Registrado em"))
+
+    def __str__(self):
+        return f"{self.environment_id} {self.metric}={self.value} @ {self.recorded_at:%Y-%m-%d %H:%M:%S}"
+
+    class Meta:
+        verbose_name = _("Leitura de Sensor")
+        verbose_name_plural = _("Leituras de Sensores")
+        indexes = [
+            # Caminho de acesso principal: leituras de uma métrica de um ambiente em um intervalo de tempo
+            models.Index(fields=['environment', 'metric', 'recorded_at'], name='reading_env_metric_time_idx'),
+        ]
+
+
+class SensorRollup(models.Model):
+    """
+    Agregado (mín/máx/soma/contagem) das leituras de uma métrica por hora ou por dia.
+    Atualizado de forma incremental a cada lote ingerido, para que os gráficos
+    leiam poucas centenas de linhas em vez de milhões de leituras brutas.
+    """
+    class Resolution(models.TextChoices):
+        HOUR = 'H', _('Hora')
+        DAY = 'D', _('Dia')
+
+    environment = models.ForeignKey(
+        Environment,
+        on_delete=models.CASCADE,
+        related_name='rollups',
+        # Coberto pela restrição de unicidade, que começa pelo ambiente
+        db_index=False,
+        verbose_name=_("Ambiente de Cultivo")
+    )
+    metric = models.CharField(max_length=4, choices=SensorReading.Metric.choices, verbose_name=_("Métrica"))
+    resolution = models.CharField(max_length=1, choices=Resolution.choices, verbose_name=_("Resolução"))
+    bucket_start = models.DateTimeField(verbose_name=_("Início do Intervalo"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Leituras"))
+    total = models.FloatField(default=0, verbose_name=_("Soma"))
+    minimum = models.FloatField(verbose_name=_("Mínimo"))
+    maximum = models.FloatField(verbose_name=_("Máximo"))
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def __str__(self):
+        return f"{self.environment_id} {self.metric}/{self.resolution} @ {self.bucket_start:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        verbose_name = _("Agregado de Leituras")
+        verbose_name_plural = _("Agregados de Leituras")
+        constraints = [
+            # Também serve de índice para as consultas por ambiente, métrica, resolução e intervalo
+            models.UniqueConstraint(
+                fields=['environment', 'metric', 'resolution', 'bucket_start'],
+                name='unique_rollup_bucket',
+            ),
+        ]
@@ -0,0 +1,171 @@
+# cultivation/pagination.py
+
+"""
+Paginação por cursor (keyset) para as listas do cultivo.
+
+Em vez de OFFSET, cada página filtra a partir da chave de ordenação da última
+linha da página anterior. Assim toda página é uma única consulta limitada
+que percorre o índice, com o mesmo custo na primeira ou na milésima página.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.http import Http404
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou que não corresponde à ordenação da lista."""
+
+
+class KeysetPage:
+    """Página de resultados com a mesma interface básica de um `Page` do Django."""
+
+    def __init__(self, object_list, next_cursor=None, cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _split(ordering):
+    """Converte ('-campo', 'outro') em [('campo', True), ('outro', False)]."""
+    return [(name[1:], True) if name.startswith('-') else (name, False) for name in ordering]
+
+
+def _field(queryset, name):
+    if name == 'pk':
+        return queryset.model._meta.pk
+    if name in queryset.query.annotations:
+        return queryset.query.annotations[name].output_field
+    return queryset.model._meta.get_field(name)
+
+
+def encode_cursor(obj, ordering):
+    """Gera o cursor opaco que aponta para logo depois de `obj` (instância ou dicionário de values())."""
+    values = []
+    for name, _descending in _split(ordering):
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(queryset, ordering, token):
+    """Decodifica o cursor e converte cada valor para o tipo Python do campo."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Cursor inválido.")
+    fields = _split(ordering)
+    if not isinstance(raw, list) or len(raw) != len(fields):
+        raise InvalidCursor("Cursor inválido.")
+    try:
+        return [_field(queryset, name).to_python(value) for (name, _descending), value in zip(fields, raw)]
+    except ValidationError:
+        raise InvalidCursor("Cursor inválido.")
+
+
+def _nullable(queryset, ordering):
+    """Campos da ordenação que aceitam NULL (ordenados com os nulos no fim)."""
+    return {name for name, _descending in _split(ordering) if getattr(_field(queryset, name), 'null', False)}
+
+
+def _order_by(ordering, nullable):
+    expressions = []
+    for name, descending in _split(ordering):
+        if name in nullable:
+            expression = F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_last=True)
+            expressions.append(expression)
+        else:
+            expressions.append(f'-{name}' if descending else name)
+    return expressions
+
+
+def keyset_filter(ordering, values, nullable=()):
+    """
+    Monta o filtro "linhas depois da chave `values`" para a ordenação dada:
+    (a > x) OU (a = x E b > y) OU (a = x E b = y E c > z) ...
+    Nos campos de `nullable`, os nulos ficam depois de todos os valores.
+    """
+    condition = Q()
+    equal = Q()
+    for (name, descending), value in zip(_split(ordering), values):
+        if value is None:
+            # Já no grupo dos nulos, que é o último: só avança pelos campos seguintes
+            equal &= Q(**{f'{name}__isnull': True})
+            continue
+        lookup = 'lt' if descending else 'gt'
+        after = Q(**{f'{name}__{lookup}': value})
+        if name in nullable:
+            after |= Q(**{f'{name}__isnull': True})
+        condition |= equal & after
+        equal &= Q(**{name: value})
+    return condition
+
+
+def keyset_queryset(queryset, ordering, cursor):
+    """Ordena o queryset e, se houver cursor, filtra as linhas que vêm depois dele."""
+    nullable = _nullable(queryset, ordering)
+    queryset = queryset.order_by(*_order_by(ordering, nullable))
+    if cursor:
+        values = decode_cursor(queryset, ordering, cursor)
+        queryset = queryset.filter(keyset_filter(ordering, values, nullable))
+    return queryset
+
+
+def paginate_keyset(queryset, ordering, cursor, page_size):
+    """Devolve a página de `page_size` itens que começa logo após `cursor`."""
+    queryset = keyset_queryset(queryset, ordering, cursor)
+    # Busca um item a mais só para saber se existe próxima página
+    return _page(list(queryset[:page_size + 1]), ordering, cursor, page_size)
+
+
+async def apaginate_keyset(queryset, ordering, cursor, page_size):
+    """Versão de paginate_keyset para as views assíncronas, com a página lida por aiterator()."""
+    queryset = keyset_queryset(queryset, ordering, cursor)
+    object_list = [obj async for obj in queryset[:page_size + 1].aiterator()]
+    return _page(object_list, ordering, cursor, page_size)
+
+
+def _page(object_list, ordering, cursor, page_size):
+    next_cursor = None
+    if len(object_list) > page_size:
+        object_list = object_list[:page_size]
+        next_cursor = encode_cursor(object_list[-1], ordering)
+    return KeysetPage(object_list, next_cursor=next_cursor, cursor=cursor or None)
+
+
+class KeysetPaginationMixin:
+    """
+    Substitui a paginação por OFFSET do ListView por paginação por cursor.
+
+    A ordenação precisa terminar em uma coluna única (normalmente 'pk'),
+    para que o cursor identifique uma posição exata na lista.
+    """
+    keyset_ordering = ('pk',)
+    paginate_by = 50
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            page = paginate_keyset(queryset, self.keyset_ordering, cursor, page_size)
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        return None, page, page.object_list, page.has_other_pages()
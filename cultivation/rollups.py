@@ -0,0 +1,250 @@
+# cultivation/rollups.py
+
+"""
+Agregados horários e diários da telemetria.
+
+Os agregados são atualizados incrementalmente a cada lote gravado por
+`telemetry.ingest_readings`, e `series` escolhe a resolução adequada
+para a janela pedida, lendo sempre um número limitado de linhas.
+"""
+
+import datetime
+from dataclasses import dataclass
+
+from django.db import connections, router, transaction
+from django.db.models import Min, Q
+
+from .models import SensorReading, SensorRollup
+
+Resolution = SensorRollup.Resolution
+
+# Janelas até este tamanho são servidas direto das leituras brutas
+RAW_WINDOW = datetime.timedelta(hours=1)
+DEFAULT_MAX_POINTS = 500
+
+# Funções de mínimo/máximo escalares usadas no upsert, por banco
+UPSERT_FUNCTIONS = {
+    'sqlite': ('MIN', 'MAX'),
+    'postgresql': ('LEAST', 'GREATEST'),
+}
+
+BUCKET_SIZES = {
+    Resolution.HOUR: datetime.timedelta(hours=1),
+    Resolution.DAY: datetime.timedelta(days=1),
+}
+
+
+@dataclass
+class Point:
+    bucket_start: datetime.datetime
+    count: int
+    minimum: float
+    maximum: float
+    mean: float
+
+
+def bucket_start(moment, resolution):
+    """Início (UTC) do intervalo da resolução que contém `moment`."""
+    moment = moment.astimezone(datetime.timezone.utc)
+    if resolution == Resolution.DAY:
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def update_rollups(readings):
+    """
+    Incorpora `readings` (já gravadas) aos agregados horários e diários.
+
+    O lote é agregado em memória e gravado com um único upsert
+    (INSERT ... ON CONFLICT DO UPDATE), que soma contagem/total e ajusta
+    mín/máx no próprio banco, sem ler os agregados existentes.
+    """
+    buckets = {}
+    for reading in readings:
+        for resolution in BUCKET_SIZES:
+            key = (reading.environment_id, reading.metric, resolution, bucket_start(reading.recorded_at, resolution))
+            current = buckets.get(key)
+            if current is None:
+                buckets[key] = [1, reading.value, reading.value, reading.value]
+            else:
+                current[0] += 1
+                current[1] += reading.value
+                if reading.value < current[2]:
+                    current[2] = reading.value
+                if reading.value > current[3]:
+                    current[3] = reading.value
+    if not buckets:
+        return
+
+    connection = connections[router.db_for_write(SensorRollup)]
+    functions = UPSERT_FUNCTIONS.get(connection.vendor)
+    if functions is None:
+        _merge_with_orm(buckets)
+        return
+
+    least, greatest = functions
+    table = connection.ops.quote_name(SensorRollup._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (environment_id, metric, resolution, bucket_start, count, total, minimum, maximum) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON CONFLICT (environment_id, metric, resolution, bucket_start) DO UPDATE SET "
+        f"count = {table}.count + excluded.count, "
+        f"total = {table}.total + excluded.total, "
+        f"minimum = {least}({table}.minimum, excluded.minimum), "
+        f"maximum = {greatest}({table}.maximum, excluded.maximum)"
+    )
+    bucket_field = SensorRollup._meta.get_field('bucket_start')
+    params = [
+        (environment_id, metric, resolution, bucket_field.get_db_prep_value(start, connection),
+         count, total, minimum, maximum)
+        for (environment_id, metric, resolution, start), (count, total, minimum, maximum) in buckets.items()
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def _merge_with_orm(buckets):
+    """Caminho genérico para bancos sem upsert: lê os agregados tocados e mescla em Python."""
+    condition = Q()
+    for resolution in BUCKET_SIZES:
+        starts = [key[3] for key in buckets if key[2] == resolution]
+        condition |= Q(resolution=resolution, bucket_start__gte=min(starts), bucket_start__lte=max(starts))
+    existing = SensorRollup.objects.select_for_update().filter(
+        condition,
+        environment_id__in={key[0] for key in buckets},
+        metric__in={key[1] for key in buckets},
+    )
+
+    to_update = []
+    for rollup in existing:
+        key = (rollup.environment_id, rollup.metric, rollup.resolution, rollup.bucket_start)
+        values = buckets.pop(key, None)
+        if values is None:
+            continue
+        count, total, minimum, maximum = values
+        rollup.count += count
+        rollup.total += total
+        rollup.minimum = min(rollup.minimum, minimum)
+        rollup.maximum = max(rollup.maximum, maximum)
+        to_update.append(rollup)
+
+    if to_update:
+        SensorRollup.objects.bulk_update(to_update, ['count', 'total', 'minimum', 'maximum'])
+    SensorRollup.objects.bulk_create([
+        SensorRollup(
+            environment_id=environment_id, metric=metric, resolution=resolution, bucket_start=start,
+            count=count, total=total, minimum=minimum, maximum=maximum,
+        )
+        for (environment_id, metric, resolution, start), (count, total, minimum, maximum) in buckets.items()
+    ])
+
+
+def choose_resolution(start, end, max_points=DEFAULT_MAX_POINTS):
+    """
+    Escolhe a resolução mais fina que ainda cabe em `max_points` por métrica.
+    Devolve None quando a janela é curta o bastante para as leituras brutas.
+    """
+    window = end - start
+    if window <= RAW_WINDOW:
+        return None
+    for resolution, size in BUCKET_SIZES.items():
+        if window / size <= max_points:
+            return resolution
+    return Resolution.DAY
+
+
+def series(environment, start, end, metrics=None, max_points=DEFAULT_MAX_POINTS):
+    """
+    Devolve (resolução, {métrica: [Point, ...]}) para a janela [start, end).
+    Todas as métricas saem de uma única consulta.
+    """
+    metrics = metrics or SensorReading.Metric.values
+    resolution = choose_resolution(start, end, max_points)
+    points = {metric: [] for metric in metrics}
+
+    if resolution is None:
+        rows = SensorReading.objects.filter(
+            environment=environment, metric__in=metrics, recorded_at__gte=start, recorded_at__lt=end,
+        ).order_by('metric', 'recorded_at').values_list('metric', 'recorded_at', 'value')
+        for metric, recorded_at, value in rows:
+            points[metric].append(Point(recorded_at, 1, value, value, value))
+        return resolution, points
+
+    rows = SensorRollup.objects.filter(
+        environment=environment, metric__in=metrics, resolution=resolution,
+        bucket_start__gte=bucket_start(start, resolution), bucket_start__lt=end,
+    ).order_by('metric', 'bucket_start').values_list('metric', 'bucket_start', 'count', 'minimum', 'maximum', 'total')
+    for metric, start_at, count, minimum, maximum, total in rows:
+        points[metric].append(Point(start_at, count, minimum, maximum, total / count))
+    return resolution, points
+
+
+def summarize(points):
+    """Resume uma lista de pontos em mín/máx/média ponderada/contagem."""
+    count = sum(point.count for point in points)
+    if not count:
+        return None
+    return {
+        'count': count,
+        'minimum': min(point.minimum for point in points),
+        'maximum': max(point.maximum for point in points),
+        'mean': sum(point.mean * point.count for point in points) / count,
+    }
+
+
+def rebuild(environment_ids=None, chunk_size=5000):
+    """
+    Recalcula os agregados a partir das leituras brutas, um dia (UTC) de cada
+    ambiente e métrica por vez.
+
+    Cada dia é apagado e recalculado na mesma transação, que segura a escrita
+    no banco enquanto isso: uma leitura gravada pela ingestão durante a
+    reconstrução entra no agregado uma vez só (antes do DELETE, é recontada
+    com o resto do dia; depois do commit, somada ao dia já recalculado). Dias
+    com agregados e sem leituras (leituras apagadas) ficam sem agregados.
+    """
+    if environment_ids is None:
+        environment_ids = (
+            set(SensorReading.objects.order_by().values_list('environment_id', flat=True).distinct())
+            | set(SensorRollup.objects.order_by().values_list('environment_id', flat=True).distinct())
+        )
+    day = BUCKET_SIZES[Resolution.DAY]
+    for environment_id in sorted(environment_ids):
+        for metric in SensorReading.Metric.values:
+            start = _next_day(environment_id, metric)
+            while start is not None:
+                end = start + day
+                with transaction.atomic():
+                    # O DELETE primeiro: ele pega o bloqueio de escrita antes da leitura do dia
+                    SensorRollup.objects.filter(
+                        environment_id=environment_id, metric=metric, resolution__in=list(BUCKET_SIZES),
+                        bucket_start__gte=start, bucket_start__lt=end,
+                    ).delete()
+                    readings = SensorReading.objects.filter(
+                        environment_id=environment_id, metric=metric, recorded_at__gte=start, recorded_at__lt=end,
+                    ).only('environment_id', 'metric', 'value', 'recorded_at')
+                    chunk = []
+                    for reading in readings.iterator(chunk_size=chunk_size):
+                        chunk.append(reading)
+                        if len(chunk) >= chunk_size:
+                            update_rollups(chunk)
+                            chunk = []
+                    update_rollups(chunk)
+                start = _next_day(environment_id, metric, end)
+
+
+def _next_day(environment_id, metric, after=None):
+    """Início do primeiro dia (UTC), a partir de `after`, com leituras ou agregados da métrica, ou None."""
+    readings = SensorReading.objects.filter(environment_id=environment_id, metric=metric)
+    days = SensorRollup.objects.filter(environment_id=environment_id, metric=metric, resolution=Resolution.DAY)
+    if after is not None:
+        readings = readings.filter(recorded_at__gte=after)
+        days = days.filter(bucket_start__gte=after)
+    found = [
+        moment for moment in (
+            readings.aggregate(first=Min('recorded_at'))['first'],
+            days.aggregate(first=Min('bucket_start'))['first'],
+        )
+        if moment is not None
+    ]
+    return bucket_start(min(found), Resolution.DAY) if found else None
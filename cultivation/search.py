@@ -0,0 +1,329 @@
+# cultivation/search.py
+
+"""
+Busca textual nas plantas (nome, variedade e nome do ambiente) e nas
+anotações do diário, restrita ao dono.
+
+- Índices FTS5 do SQLite: cultivation_plant_search (uma linha por planta,
+  rowid = id da planta) e cultivation_journal_search (uma linha por entrada
+  com anotação, rowid = id da entrada).
+- Mantidos por triggers no próprio banco, não por sinais: bulk_create,
+  update() e o SET NULL da exclusão de um ambiente também passam por eles.
+- O dono é um termo da coluna owner ('u<id>'), então a restrição ao usuário
+  é resolvida dentro do índice junto com os termos da busca, sem ler as
+  linhas dos outros usuários.
+- Cada palavra da busca vira um prefixo ("sku" acha "Skunk"), sem diferenciar
+  maiúsculas nem acentos ("floracao" acha "Floração"); todas precisam aparecer.
+- Ordenado pela função bm25() do FTS5, no próprio SQL (veja ranked()), com
+  pesos por coluna (o nome pesa mais que a variedade, que pesa mais que o ambiente).
+
+Em outros bancos a busca cai para icontains, sem índice.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import JournalEntry, Plant
+
+PLANT_TABLE = 'cultivation_plant_search'
+JOURNAL_TABLE = 'cultivation_journal_search'
+# Prefixos de 2 a 6 letras indexados: a busca por prefixo custa o mesmo que por uma palavra inteira
+TABLE_OPTIONS = "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'"
+DEFAULT_LIMIT = 50
+DEFAULT_CHUNK_SIZE = 5000
+MAX_TERMS = 8
+# Mesma noção de palavra do tokenizer unicode61: letras e dígitos (o '_' separa)
+WORD = re.compile(r'[^\W_]+')
+# Peso de cada coluna no bm25 (a coluna owner, que só restringe ao dono, pesa 0)
+PLANT_WEIGHTS = {'name': 10, 'strain': 5, 'environment': 2}
+JOURNAL_WEIGHTS = {'note': 1}
+SNIPPET_WORDS = 24
+
+SCHEMA = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {PLANT_TABLE} USING fts5(owner, name, strain, environment, {TABLE_OPTIONS})",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {JOURNAL_TABLE} USING fts5(owner, note, {TABLE_OPTIONS})",
+)
+
+_PLANT_ROW = (
+    "new.id, 'u' || new.owner_id, new.name, "
+    "(SELECT name FROM cultivation_strain WHERE id = new.strain_id), "
+    "(SELECT name FROM cultivation_environment WHERE id = new.environment_id)"
+)
+
+# Recriados pelo post_migrate (apps.py): o SQLite apaga os triggers de uma tabela quando
+# uma migração a reconstrói (_remake_table)
+TRIGGERS = {
+    'cultivation_plant_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_ai AFTER INSERT ON cultivation_plant BEGIN
+            INSERT OR REPLACE INTO {PLANT_TABLE}(rowid, owner, name, strain, environment) VALUES ({_PLANT_ROW});
+        END""",
+    # Só quando muda algo indexado: o save() regrava todas as colunas, e a última atividade do
+    # diário (Plant.last_activity_at) é atualizada a cada entrada
+    'cultivation_plant_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_au AFTER UPDATE ON cultivation_plant
+        WHEN old.name IS NOT new.name OR old.strain_id IS NOT new.strain_id
+          OR old.environment_id IS NOT new.environment_id OR old.owner_id IS NOT new.owner_id BEGIN
+            INSERT OR REPLACE INTO {PLANT_TABLE}(rowid, owner, name, strain, environment) VALUES ({_PLANT_ROW});
+        END""",
+    'cultivation_plant_search_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_plant_search_ad AFTER DELETE ON cultivation_plant BEGIN
+            DELETE FROM {PLANT_TABLE} WHERE rowid = old.id;
+        END""",
+    # A planta mudou de dono (admin): as entradas do diário dela vão junto
+    'cultivation_journal_search_owner_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_journal_search_owner_au AFTER UPDATE ON cultivation_plant
+        WHEN old.owner_id IS NOT new.owner_id BEGIN
+            UPDATE {JOURNAL_TABLE} SET owner = 'u' || new.owner_id
+            WHERE rowid IN (SELECT id FROM cultivation_journalentry WHERE plant_id = new.id);
+        END""",
+    'cultivation_environment_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_environment_search_au AFTER UPDATE ON cultivation_environment
+        WHEN old.name IS NOT new.name BEGIN
+            UPDATE {PLANT_TABLE} SET environment = new.name
+            WHERE rowid IN (SELECT id FROM cultivation_plant WHERE environment_id = new.id);
+        END""",
+    # Variedade renomeada no catálogo (admin)
+    'cultivation_strain_search_au': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_strain_search_au AFTER UPDATE ON cultivation_strain
+        WHEN old.name IS NOT new.name BEGIN
+            UPDATE {PLANT_TABLE} SET strain = new.name
+            WHERE rowid IN (SELECT id FROM cultivation_plant WHERE strain_id = new.id);
+        END""",
+    'cultivation_journal_search_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_journal_search_ai AFTER INSERT ON cultivation_journalentry
+        WHEN new.note <> '' BEGIN
+            INSERT OR REPLACE INTO {JOURNAL_TABLE}(rowid, owner, note)
+            SELECT new.id, 'u' || owner_id, new.note FROM cultivation_plant WHERE id = new.plant_id;
+        END""",
+    # O diário só recebe entradas novas, mas elas somem junto com a planta
+    'cultivation_journal_search_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS cultivation_journal_search_ad AFTER DELETE ON cultivation_journalentry BEGIN
+            DELETE FROM {JOURNAL_TABLE} WHERE rowid = old.id;
+        END""",
+}
+
+# Linhas de cada índice para um intervalo de ids (usadas pelo rebuild)
+SOURCES = {
+    PLANT_TABLE: (
+        'cultivation_plant',
+        f"""INSERT INTO {PLANT_TABLE}(rowid, owner, name, strain, environment)
+            SELECT p.id, 'u' || p.owner_id, p.name, s.name, e.name
+            FROM cultivation_plant p
+            LEFT JOIN cultivation_strain s ON s.id = p.strain_id
+            LEFT JOIN cultivation_environment e ON e.id = p.environment_id
+            WHERE p.id > %s AND p.id <= %s""",
+    ),
+    JOURNAL_TABLE: (
+        'cultivation_journalentry',
+        f"""INSERT INTO {JOURNAL_TABLE}(rowid, owner, note)
+            SELECT j.id, 'u' || p.owner_id, j.note
+            FROM cultivation_journalentry j JOIN cultivation_plant p ON p.id = j.plant_id
+            WHERE j.id > %s AND j.id <= %s AND j.note <> ''""",
+    ),
+}
+
+
+def is_supported(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def install(conn=connection, create_tables=True):
+    """
+    Cria as tabelas FTS5 e os triggers que ainda não existem (só no SQLite).
+    Com create_tables=False só recria os triggers, e só se as tabelas já
+    existem (a migração que as cria pode ainda não ter rodado).
+    """
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s", [PLANT_TABLE])
+        if cursor.fetchone() is None:
+            if not create_tables:
+                return
+            for statement in SCHEMA:
+                cursor.execute(statement)
+        for statement in TRIGGERS.values():
+            cursor.execute(statement)
+
+
+def uninstall(conn=connection):
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for name in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for table in (PLANT_TABLE, JOURNAL_TABLE):
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+def rebuild(chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Refaz os índices a partir das tabelas, em blocos de `chunk_size` ids, cada
+    bloco na sua própria transação: o banco não fica travado para escrita
+    durante a reconstrução inteira e a busca continua respondendo (cada
+    intervalo é apagado e regravado de uma vez). Devolve {tabela: linhas}.
+    """
+    counts = {}
+    for table, (source, insert) in SOURCES.items():
+        counts[table] = 0
+        last = 0
+        while True:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT MAX(id) FROM (SELECT id FROM {source} WHERE id > %s ORDER BY id LIMIT %s)",
+                    [last, chunk_size],
+                )
+                upper = cursor.fetchone()[0]
+                if upper is None:
+                    # Sobras de linhas que não existem mais, depois do último id
+                    cursor.execute(f"DELETE FROM {table} WHERE rowid > %s", [last])
+                    break
+                cursor.execute(f"DELETE FROM {table} WHERE rowid > %s AND rowid <= %s", [last, upper])
+                cursor.execute(insert, [last, upper])
+                counts[table] += cursor.rowcount
+                last = upper
+        with connection.cursor() as cursor:
+            # Junta os segmentos criados pelos blocos em um só
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    return counts
+
+
+def normalize(text):
+    """Como o tokenizer unicode61 com remove_diacritics: sem maiúsculas e sem acentos."""
+    if text.isascii():
+        return text.casefold()
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def terms(query):
+    return WORD.findall(normalize(query))[:MAX_TERMS]
+
+
+def _count(word, tokens, text):
+    """
+    Ocorrências de `word` nas palavras de uma coluna (`text` é ' ' + as
+    palavras separadas por espaço). Palavras de uma letra ficam exatas
+    ("Skunk 1" não deve achar todo número que começa com 1); as outras são prefixo.
+    """
+    return text.count(' ' + word) if len(word) > 1 else tokens.count(word)
+
+
+def match_expression(owner_id, words, columns):
+    """
+    Expressão MATCH: todas as palavras nas `columns` E o termo do dono. Cada
+    palavra vai entre aspas, então a sintaxe do FTS5 (AND, OR, NEAR, *, :)
+    digitada pelo usuário é só texto. Palavras de uma letra são exatas, como em _count().
+    """
+    parts = ' '.join(f'"{word}"*' if len(word) > 1 else f'"{word}"' for word in words)
+    return f'{{{" ".join(columns)}}}:({parts}) AND owner:"u{owner_id}"'
+
+
+def ranked(table, weights, owner_id, words, limit):
+    """
+    Rowids das até `limit` linhas do dono que têm todas as palavras, da mais
+    relevante para a menos relevante pela função bm25() do FTS5 (com o IDF de
+    cada termo na tabela e os `weights` por coluna); no empate, a mais nova.
+    """
+    columns = ', '.join(['0', *(str(weight) for weight in weights.values())])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH %s "
+            f"ORDER BY bm25({table}, {columns}), rowid DESC LIMIT %s",
+            [match_expression(owner_id, words, weights), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def highlight(text, words, size=SNIPPET_WORDS):
+    """
+    Trecho de `text` em volta da primeira palavra encontrada, com as palavras
+    da busca em <mark>. O texto do usuário é escapado.
+    """
+    found = []
+    for match in WORD.finditer(text):
+        token = normalize(match.group())
+        found.append((match.start(), match.end(), any(_count(word, [token], ' ' + token) for word in words)))
+    first = next((index for index, (_, _, hit) in enumerate(found) if hit), 0)
+    window = found[max(first - size // 4, 0):][:size]
+    if not window:
+        return escape(text)
+    start, end = window[0][0], window[-1][1]
+    parts = ['…' if start > 0 else '']
+    position = start
+    for token_start, token_end, hit in window:
+        if hit:
+            parts += [escape(text[position:token_start]), '<mark>', escape(text[token_start:token_end]), '</mark>']
+            position = token_end
+    parts += [escape(text[position:end]), '…' if end < len(text.rstrip()) else '']
+    return mark_safe(''.join(parts))
+
+
+@dataclass
+class SearchResult:
+    query: str = ''
+    plants: list = field(default_factory=list)
+    entries: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.plants or self.entries)
+
+
+def plant_queryset():
+    return Plant.objects.select_related('environment', 'stage').with_age()
+
+
+def entry_queryset():
+    return JournalEntry.objects.select_related('plant').only(
+        'kind', 'recorded_at', 'note', 'plant__owner', 'plant__name', 'plant__strain',
+    )
+
+
+def _load(queryset, ids, owner_of, owner):
+    """
+    Os objetos de `ids`, na ordem dada. Lidos só pela chave primária: com o
+    filtro por dono no SQL (e uma lista IN longa) o SQLite preferiria
+    percorrer o índice do dono. O dono já vem restrito pelo índice de busca
+    e é conferido de novo aqui.
+    """
+    by_pk = queryset.order_by().in_bulk(ids)
+    return [by_pk[pk] for pk in ids if pk in by_pk and owner_of(by_pk[pk]) == owner.pk]
+
+
+def search(owner, query, limit=DEFAULT_LIMIT):
+    """Plantas e entradas do diário de `owner` que contêm todas as palavras de `query`."""
+    words = terms(query)
+    result = SearchResult(query=query)
+    if not words:
+        return result
+    if not is_supported():
+        return _search_icontains(owner, words, limit, result)
+
+    ids = ranked(PLANT_TABLE, PLANT_WEIGHTS, owner.pk, words, limit)
+    if ids:
+        result.plants = _load(plant_queryset(), ids, lambda plant: plant.owner_id, owner)
+
+    ids = ranked(JOURNAL_TABLE, JOURNAL_WEIGHTS, owner.pk, words, limit)
+    if ids:
+        result.entries = _load(entry_queryset(), ids, lambda entry: entry.plant.owner_id, owner)
+        for entry in result.entries:
+            entry.snippet = highlight(entry.note, words)
+    return result
+
+
+def _search_icontains(owner, words, limit, result):
+    plant_filter, entry_filter = Q(), Q()
+    for word in words:
+        plant_filter &= Q(name__icontains=word) | Q(strain__name__icontains=word) | Q(environment__name__icontains=word)
+        entry_filter &= Q(note__icontains=word)
+    result.plants = list(plant_queryset().filter(plant_filter, owner=owner)[:limit])
+    result.entries = list(entry_queryset().filter(entry_filter, plant__owner=owner).order_by('-recorded_at')[:limit])
+    for entry in result.entries:
+        entry.snippet = highlight(entry.note, words)
+    return result
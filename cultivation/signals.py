@@ -0,0 +1,101 @@
+# cultivation/signals.py
+
+"""
+Invalidação do cache de fragmentos (veja cache.py): toda alteração em
+plantas, ambientes, estágios, luzes e variedades incrementa o contador de
+versão do escopo correspondente. Os contadores das luzes e das variedades
+também invalidam os catálogos em memória (catalog.py).
+
+Atualizações em massa (QuerySet.update, bulk_create) não disparam sinais;
+quem as usa chama cache.bump diretamente.
+
+As plantas criadas, movidas de ambiente ou com estágio novo também viram
+eventos ao vivo para as páginas abertas do dono (events.py); de novo, as
+atualizações em massa publicam os seus eventos por conta própria.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, events
+from .models import Environment, JournalEntry, Lighting, Plant, Stage, Strain
+
+OWNED_MODELS = {Plant: 'plant', Environment: 'environment', Stage: 'stage'}
+
+
+def owned_changed(sender, instance, **kwargs):
+    cache.bump(OWNED_MODELS[sender], instance.owner_id)
+
+
+for model in OWNED_MODELS:
+    post_save.connect(owned_changed, sender=model, dispatch_uid=f'fragment_cache_{model.__name__}_save')
+    post_delete.connect(owned_changed, sender=model, dispatch_uid=f'fragment_cache_{model.__name__}_delete')
+
+
+@receiver(post_save, sender=Plant, dispatch_uid='live_events_plant_save')
+def plant_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        events.publish_on_commit(instance.owner_id, events.PLANT_CREATED, {'count': 1})
+    else:
+        loaded = getattr(instance, '_loaded_values', {})
+        if 'environment_id' in loaded and loaded['environment_id'] != instance.environment_id:
+            events.publish_on_commit(instance.owner_id, events.PLANT_MOVED, {
+                'plants': [instance.pk], 'environment': events.related(instance.environment),
+            })
+        if 'stage_id' in loaded and loaded['stage_id'] != instance.stage_id:
+            events.publish_on_commit(instance.owner_id, events.PLANT_STAGE, {
+                'plants': [instance.pk], 'stage': events.related(instance.stage),
+            })
+    # O próximo save() compara com o que acabou de ser gravado
+    instance._loaded_values = {name: getattr(instance, name) for name in Plant.tracked_fields}
+
+
+@receiver(post_save, sender=JournalEntry, dispatch_uid='fragment_cache_journal_entry')
+def journal_entry_added(sender, instance, created, **kwargs):
+    # A entrada nova muda a última atividade mostrada nos cards e no detalhe da planta
+    cache.bump('plant', instance.plant.owner_id)
+
+
+@receiver(post_save, sender=Lighting, dispatch_uid='fragment_cache_lighting_save')
+@receiver(post_delete, sender=Lighting, dispatch_uid='fragment_cache_lighting_delete')
+def lighting_changed(sender, instance, **kwargs):
+    cache.bump(cache.LIGHTING)
+    # De novo após o commit: um processo que recarregou o catálogo de luzes
+    # (catalog.py) antes do commit ainda teria a versão antiga da tabela
+    transaction.on_commit(lambda: cache.bump(cache.LIGHTING))
+
+
+@receiver(post_save, sender=Strain, dispatch_uid='fragment_cache_strain_save')
+@receiver(post_delete, sender=Strain, dispatch_uid='fragment_cache_strain_delete')
+def strain_changed(sender, instance, **kwargs):
+    # Recarrega o catálogo de variedades (e os cards, que mostram o nome vindo dele), como nas luzes
+    cache.bump(cache.STRAIN)
+    transaction.on_commit(lambda: cache.bump(cache.STRAIN))
+
+
+@receiver(m2m_changed, sender=Environment.lighting_system.through, dispatch_uid='fragment_cache_environment_lighting')
+def environment_lighting_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            cache.bump('environment', instance.owner_id)
+        return
+    # Alterado a partir da luz: invalida os donos dos ambientes afetados
+    if action in ('post_add', 'post_remove'):
+        environments = Environment.objects.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        # Depois do clear já não dá para saber quais ambientes usavam a luz
+        environments = Environment.objects.filter(lighting_system=instance)
+    else:
+        return
+    for owner_id in environments.values_list('owner_id', flat=True).distinct():
+        cache.bump('environment', owner_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='fragment_cache_new_owner')
+def owner_created(sender, instance, created, **kwargs):
+    if created:
+        cache.reset_owner(instance.pk)
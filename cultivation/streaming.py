@@ -0,0 +1,40 @@
+# cultivation/streaming.py
+
+"""
+Respostas transmitidas (StreamingHttpResponse) que continuam transmitidas no
+modo ASGI.
+
+Com um gerador síncrono, o handler ASGI do Django junta o conteúdo inteiro
+numa lista antes de enviar o primeiro byte, e a memória volta a crescer com o
+tamanho da resposta. Sob ASGI, streaming_response() troca o gerador por um
+gerador assíncrono que o avança `batch` partes por vez numa thread (ele
+consulta o banco e os catálogos) e envia cada lote assim que fica pronto.
+No WSGI a resposta recebe o gerador síncrono, como sempre.
+"""
+
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+async def aiterate(iterable, batch=1):
+    """Percorre um iterável síncrono de textos numa thread, um lote de `batch` partes (juntas) por vez."""
+    iterator = iter(iterable)
+    next_batch = sync_to_async(lambda: list(islice(iterator, batch)))
+    try:
+        while parts := await next_batch():
+            yield ''.join(parts)
+    finally:
+        # Cliente desconectado no meio: fecha o gerador (e o cursor do banco) na thread dele
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def streaming_response(request, iterable, batch=1, **kwargs):
+    """StreamingHttpResponse do iterável, assíncrona quando a requisição veio pelo ASGI."""
+    if isinstance(request, ASGIRequest):
+        iterable = aiterate(iterable, batch)
+    return StreamingHttpResponse(iterable, **kwargs)
@@ -0,0 +1,200 @@
+# cultivation/telemetry.py
+
+"""
+Ingestão em lote de leituras de sensores (telemetria) dos ambientes.
+
+Os lotes chegam como NDJSON (um objeto JSON por linha) ou CSV com cabeçalho.
+Cada linha precisa de: environment (id), metric, value e recorded_at.
+As linhas válidas são gravadas com bulk_create, uma transação por lote,
+e os agregados horários/diários são atualizados na mesma transação.
+"""
+
+import csv
+import datetime
+import json
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import SensorReading
+from .rollups import update_rollups
+
+DEFAULT_BATCH_SIZE = 5000
+# Limita quantos erros voltam na resposta, para um lote ruim não gerar um JSON gigante
+MAX_REPORTED_ERRORS = 100
+
+# Aceita o código da métrica ou um apelido mais amigável vindo das sondas
+METRIC_ALIASES = {
+    'temp': SensorReading.Metric.TEMPERATURE,
+    'temperature': SensorReading.Metric.TEMPERATURE,
+    'hum': SensorReading.Metric.HUMIDITY,
+    'humidity': SensorReading.Metric.HUMIDITY,
+    'co2': SensorReading.Metric.CO2,
+}
+
+
+class TelemetryError(ValueError):
+    """Linha de telemetria inválida."""
+
+
+@dataclass
+class IngestResult:
+    accepted: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+    # Leituras gravadas por ambiente (para os eventos ao vivo; fora de as_dict)
+    environments: Counter = field(default_factory=Counter)
+
+    def add_error(self, line_number, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    def as_dict(self):
+        return {'accepted': self.accepted, 'rejected': self.rejected, 'errors': self.errors}
+
+
+def _decode(line):
+    return line.decode('utf-8') if isinstance(line, bytes) else line
+
+
+def parse_ndjson(lines):
+    """Gera (número_da_linha, dict) para cada linha NDJSON não vazia."""
+    for line_number, line in enumerate(lines, start=1):
+        try:
+            line = _decode(line).strip()
+        except UnicodeDecodeError:
+            yield line_number, TelemetryError("A linha não está em UTF-8.")
+            continue
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, TelemetryError("JSON inválido.")
+
+
+def parse_csv(lines):
+    """
+    Gera (número_da_linha, dict) para cada linha de um CSV com cabeçalho.
+    Linhas fora de UTF-8 ou que o módulo csv recusa (NUL, campo grande demais...)
+    viram um TelemetryError daquela linha, e a leitura continua na seguinte.
+    """
+    undecodable = set()
+    # Linhas físicas já lidas: depois de um csv.Error o reader.line_num não é confiável
+    read = 0
+
+    def decoded():
+        nonlocal read
+        for read, line in enumerate(lines, start=1):
+            try:
+                yield _decode(line)
+            except UnicodeDecodeError:
+                undecodable.add(read)
+                yield line.decode('utf-8', 'replace')
+
+    reader = csv.DictReader(decoded())
+    last_line = 0
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as exc:
+            row = TelemetryError(f"CSV inválido: {exc}.")
+        # Um registro entre aspas pode ocupar várias linhas físicas
+        if undecodable.intersection(range(last_line + 1, read + 1)):
+            row = TelemetryError("A linha não está em UTF-8.")
+        last_line = read
+        yield read, row
+
+
+def parse_timestamp(value):
+    """Aceita ISO 8601 ou epoch (segundos). Datas sem fuso são tratadas como UTC."""
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+        value = str(value).strip()
+        try:
+            return datetime.datetime.fromtimestamp(float(value), tz=datetime.timezone.utc)
+        except ValueError:
+            pass
+        # parse_datetime devolve None para um formato desconhecido e levanta ValueError
+        # para uma data impossível (mês 13...)
+        parsed = parse_datetime(value)
+    except (ValueError, OverflowError, OSError):
+        # Epoch fora do intervalo (1e20, nan) ou data impossível
+        raise TelemetryError("recorded_at inválido.")
+    if parsed is None:
+        raise TelemetryError("recorded_at inválido.")
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def build_reading(row, environment_ids):
+    """Valida uma linha já decodificada e devolve um SensorReading não salvo."""
+    if isinstance(row, TelemetryError):
+        raise row
+    if not isinstance(row, dict):
+        raise TelemetryError("A linha deve ser um objeto.")
+    try:
+        environment_id = int(row['environment'])
+        metric = str(row['metric']).strip()
+        value = float(row['value'])
+        recorded_at = row['recorded_at']
+    except KeyError as exc:
+        raise TelemetryError(f"Campo obrigatório ausente: {exc.args[0]}.")
+    except (TypeError, ValueError, OverflowError):
+        raise TelemetryError("environment e value devem ser numéricos.")
+    if not math.isfinite(value):
+        raise TelemetryError("value deve ser um número finito.")
+
+    if environment_id not in environment_ids:
+        raise TelemetryError("Ambiente inexistente ou de outro usuário.")
+    metric = METRIC_ALIASES.get(metric.lower(), metric.upper())
+    if metric not in SensorReading.Metric.values:
+        raise TelemetryError("Métrica desconhecida.")
+
+    return SensorReading(
+        environment_id=environment_id,
+        metric=metric,
+        value=value,
+        recorded_at=parse_timestamp(recorded_at),
+    )
+
+
+def _flush(batch, result):
+    with transaction.atomic():
+        SensorReading.objects.bulk_create(batch, batch_size=len(batch))
+        update_rollups(batch)
+    result.accepted += len(batch)
+    result.environments.update(reading.environment_id for reading in batch)
+
+
+def ingest_readings(rows, environment_ids, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Grava as leituras de `rows` (pares (linha, dict) de parse_ndjson/parse_csv).
+
+    `environment_ids` é o conjunto de ambientes que o remetente pode alimentar;
+    ele é carregado uma única vez, em vez de uma consulta por linha.
+    Linhas inválidas são contadas e relatadas, mas não interrompem o lote.
+    """
+    result = IngestResult()
+    batch = []
+    for line_number, row in rows:
+        try:
+            batch.append(build_reading(row, environment_ids))
+        except TelemetryError as exc:
+            result.add_error(line_number, str(exc))
+            continue
+        if len(batch) >= batch_size:
+            _flush(batch, result)
+            batch = []
+    if batch:
+        _flush(batch, result)
+    return result
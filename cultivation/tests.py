@@ -1,3 +1,2209 @@
-from django.test import TestCase
+# cultivation/tests.py
 
-# Create your tests here.
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.messages import constants as message_levels
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count, F, Max
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils.module_loading import import_string
+
+from growplant.sqlite import production_database
+from growplant.testing import RouteBudgetMixin, route_names
+
+from . import (
+    api_urls, asgi_urls, async_views, cache as fragments, events, exports, imports, rollups, search, telemetry,
+    urls, views,
+)
+from .apps import restore_search_triggers
+from .catalog import lighting as lighting_catalog, strains as strain_catalog
+from .forms import EnvironmentForm, PlantForm
+from .management.commands import bench_views
+from .managers import strain_key
+from .pagination import apaginate_keyset, paginate_keyset
+from .models import Environment, JournalEntry, Lighting, Plant, SensorReading, SensorRollup, Stage, Strain
+
+CustomUser = get_user_model()
+
+
+def make_environment(owner, **extra):
+    fields = {'name': 'Estufa', 'height': 200, 'width': 100, 'depth': 100}
+    fields.update(extra)
+    return Environment.objects.create(owner=owner, **fields)
+
+
+def make_strain(name):
+    return Strain.objects.intern(name)
+
+
+class TestTelemetryIngest(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        self.environment = make_environment(self.user)
+        self.foreign_environment = make_environment(self.other)
+        self.url = reverse('cultivation:telemetry_ingest')
+
+    def ndjson(self, rows):
+        return '\n'.join(json.dumps(row) for row in rows)
+
+    def test_ingest_readings_writes_in_batches(self):
+        """ Testa se todas as linhas válidas são gravadas, inclusive o lote parcial final. """
+        rows = [
+            (i, {'environment': self.environment.pk, 'metric': 'TEMP', 'value': 20 + i,
+                 'recorded_at': f'2026-01-01T00:00:{i:02d}Z'})
+            for i in range(25)
+        ]
+        # 3 lotes: SAVEPOINT, INSERT das leituras, upsert dos agregados, RELEASE
+        with self.assertNumQueries(3 * 4):
+            result = telemetry.ingest_readings(rows, {self.environment.pk}, batch_size=10)
+        self.assertEqual(result.accepted, 25)
+        self.assertEqual(SensorReading.objects.count(), 25)
+
+    def test_ndjson_endpoint_rejects_foreign_environment_and_bad_lines(self):
+        """ Testa que ambientes de outro usuário e linhas inválidas são relatados, não gravados. """
+        self.client.force_login(self.user)
+        body = self.ndjson([
+            {'environment': self.environment.pk, 'metric': 'humidity', 'value': 55.5,
+             'recorded_at': '2026-01-01T00:00:00'},
+            {'environment': self.foreign_environment.pk, 'metric': 'TEMP', 'value': 20,
+             'recorded_at': '2026-01-01T00:00:00Z'},
+        ]) + '\n{not json\n'
+        response = self.client.post(self.url, data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertEqual(payload['accepted'], 1)
+        self.assertEqual(payload['rejected'], 2)
+        self.assertEqual([error['line'] for error in payload['errors']], [2, 3])
+        reading = SensorReading.objects.get()
+        self.assertEqual(reading.metric, SensorReading.Metric.HUMIDITY)
+        self.assertEqual(reading.environment, self.environment)
+
+    def test_csv_endpoint(self):
+        """ Testa a ingestão de um lote CSV com cabeçalho e timestamps em epoch. """
+        self.client.force_login(self.user)
+        body = (
+            'environment,metric,value,recorded_at\n'
+            f'{self.environment.pk},CO2,812,1767225600\n'
+            f'{self.environment.pk},TEMP,23.4,2026-01-01T00:00:05+00:00\n'
+        )
+        response = self.client.post(self.url, data=body, content_type='text/csv')
+        self.assertEqual(response.json()['accepted'], 2)
+        self.assertEqual(SensorReading.objects.filter(environment=self.environment).count(), 2)
+
+    def test_malformed_lines_are_rejected_per_line(self):
+        """ Testa datas impossíveis, epochs fora do intervalo, valores não finitos, bytes fora de UTF-8 e CSV inválido. """
+        self.client.force_login(self.user)
+        env = self.environment.pk
+        body = '\n'.join([
+            json.dumps({'environment': env, 'metric': 'TEMP', 'value': 20, 'recorded_at': '2026-13-45T00:00:00'}),
+            json.dumps({'environment': env, 'metric': 'TEMP', 'value': 20, 'recorded_at': 1e20}),
+            json.dumps({'environment': env, 'metric': 'TEMP', 'value': 20, 'recorded_at': '1e20'}),
+            '{"environment": %d, "metric": "TEMP", "value": NaN, "recorded_at": 0}' % env,
+            '{"environment": %d, "metric": "TEMP", "value": "inf", "recorded_at": 0}' % env,
+            json.dumps({'environment': env, 'metric': 'TEMP', 'value': 21, 'recorded_at': 0}),
+        ]).encode() + b'\n\xff\xfe\n'
+        response = self.client.post(self.url, data=body, content_type='application/x-ndjson')
+        payload = response.json()
+        self.assertEqual((payload['accepted'], payload['rejected']), (1, 6))
+        self.assertEqual([error['line'] for error in payload['errors']], [1, 2, 3, 4, 5, 7])
+
+        body = (
+            'environment,metric,value,recorded_at\n'
+            f'{env},TEMP,20,2026-02-30T00:00:00\n'
+        ).encode() + b'\xff,TEMP,20,0\n' + f'{env},TEMP,{"9" * 200_000},0\n{env},TEMP,"2\x000",0\n'.encode() + (
+            f'{env},TEMP,22,0\n'.encode()
+        )
+        response = self.client.post(self.url, data=body, content_type='text/csv')
+        payload = response.json()
+        self.assertEqual((payload['accepted'], payload['rejected']), (1, 4))
+        self.assertEqual([error['line'] for error in payload['errors']], [2, 3, 4, 5])
+        self.assertEqual(SensorReading.objects.count(), 2)
+
+    def test_unsupported_content_type(self):
+        """ Testa que corpos que não são NDJSON/CSV são recusados com 415. """
+        self.client.force_login(self.user)
+        response = self.client.post(self.url, data={'environment': self.environment.pk})
+        self.assertEqual(response.status_code, 415)
+
+
+class TestTelemetryRollups(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.environment = make_environment(self.user)
+        self.start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def ingest(self, values, offset_minutes=0, metric='TEMP'):
+        rows = [
+            (i, {'environment': self.environment.pk, 'metric': metric, 'value': value,
+                 'recorded_at': (self.start + datetime.timedelta(minutes=offset_minutes + 20 * i)).isoformat()})
+            for i, value in enumerate(values)
+        ]
+        telemetry.ingest_readings(rows, {self.environment.pk})
+
+    def test_rollups_are_merged_incrementally(self):
+        """ Testa se lotes sucessivos no mesmo intervalo somam contagem e atualizam mín/máx. """
+        self.ingest([20.0, 22.0, 24.0])       # 00:00, 00:20, 00:40 -> hora 00
+        self.ingest([18.0, 30.0], offset_minutes=50)  # 00:50 (hora 00) e 01:10 (hora 01)
+
+        hour0 = SensorRollup.objects.get(resolution='H', bucket_start=self.start)
+        self.assertEqual((hour0.count, hour0.minimum, hour0.maximum), (4, 18.0, 24.0))
+        self.assertAlmostEqual(hour0.mean, 21.0)
+        day = SensorRollup.objects.get(resolution='D', bucket_start=self.start)
+        self.assertEqual((day.count, day.minimum, day.maximum), (5, 18.0, 30.0))
+
+        # O rebuild a partir das leituras brutas chega ao mesmo resultado
+        rollups.rebuild()
+        self.assertEqual(SensorRollup.objects.get(resolution='D').count, 5)
+
+    def test_rebuild_recomputes_each_day_and_drops_orphans(self):
+        """ Testa se o rebuild recalcula dia a dia e apaga os agregados de dias que não têm mais leituras. """
+        self.ingest([20.0, 22.0])
+        self.ingest([30.0], offset_minutes=36 * 60)  # 02/01 12:00
+        SensorRollup.objects.filter(resolution='D', bucket_start=self.start).update(count=99, total=0)
+        orphan = self.start + datetime.timedelta(days=10)
+        SensorRollup.objects.create(environment=self.environment, metric='TEMP', resolution='D', bucket_start=orphan,
+                                    count=1, total=1, minimum=1, maximum=1)
+        rollups.rebuild([self.environment.pk], chunk_size=1)
+        days = SensorRollup.objects.filter(resolution='D').order_by('bucket_start')
+        self.assertEqual([(day.count, day.total) for day in days], [(2, 42.0), (1, 30.0)])
+        self.assertEqual(SensorRollup.objects.filter(resolution='H').count(), 2)
+
+    def test_rollups_merge_without_upsert_support(self):
+        """ Testa o caminho genérico (sem upsert) de mesclagem dos agregados. """
+        with mock.patch.dict(rollups.UPSERT_FUNCTIONS, clear=True):
+            self.ingest([20.0, 22.0])
+            self.ingest([10.0], offset_minutes=45)
+        day = SensorRollup.objects.get(resolution='D')
+        self.assertEqual((day.count, day.minimum, day.maximum, day.total), (3, 10.0, 22.0, 52.0))
+
+    def test_series_picks_resolution_by_window(self):
+        """ Testa se a consulta escolhe leituras brutas, horas ou dias conforme a janela. """
+        self.ingest([20.0, 22.0, 24.0, 26.0])
+        one_hour = datetime.timedelta(hours=1)
+        self.assertIsNone(rollups.choose_resolution(self.start, self.start + one_hour))
+        self.assertEqual(rollups.choose_resolution(self.start, self.start + 7 * 24 * one_hour), 'H')
+        self.assertEqual(rollups.choose_resolution(self.start, self.start + 365 * 24 * one_hour), 'D')
+
+        resolution, points = rollups.series(self.environment, self.start, self.start + 2 * one_hour)
+        self.assertEqual(resolution, 'H')
+        self.assertEqual([point.count for point in points['TEMP']], [3, 1])
+        self.assertEqual(points['HUM'], [])
+
+    def test_environment_detail_reads_rollups(self):
+        """ Testa se a página de detalhes mostra o resumo da telemetria. """
+        SensorRollup.objects.create(
+            environment=self.environment, metric='TEMP', resolution='H',
+            bucket_start=rollups.bucket_start(datetime.datetime.now(datetime.timezone.utc), 'H'),
+            count=2, total=50.0, minimum=24.0, maximum=26.0,
+        )
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('cultivation:environment_detail', kwargs={'pk': self.environment.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'id="telemetry-series"')
+        self.assertEqual(response.context['telemetry_resolution'], 'H')
+        self.assertEqual(response.context['telemetry_summary'][0][1]['mean'], 25.0)
+
+
+class TestKeysetPagination(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.environment = make_environment(self.user)
+        day = datetime.date(2026, 1, 1)
+        # Vários empates de data e nome, para exercitar o desempate pelo pk
+        Plant.objects.bulk_create([
+            Plant(owner=self.user, environment=self.environment if i % 2 else None,
+                  name=f'Planta {i % 3}', germination_date=day - datetime.timedelta(days=i % 4))
+            for i in range(130)
+        ])
+        self.client.force_login(self.user)
+        self.url = reverse('cultivation:plant_list')
+
+    def test_pages_cover_every_plant_once_grouped_by_environment(self):
+        """ Testa se percorrer os cursores devolve todas as plantas, agrupadas por ambiente (sem ambiente no fim). """
+        seen = []
+        cursor = None
+        while True:
+            response = self.client.get(self.url, {'cursor': cursor} if cursor else {})
+            page = response.context['page_obj']
+            seen.extend(plant.pk for plant in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        expected = list(
+            Plant.objects.order_by(F('environment').desc(nulls_last=True), '-germination_date', 'name', 'pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_plants_are_regrouped_by_environment_in_template(self):
+        """ Testa se cada página mostra um card por ambiente e o card das plantas sem ambiente por último. """
+        Plant.objects.all().delete()
+        other = make_environment(self.user, name='Tenda Nova')
+        day = datetime.date(2026, 1, 1)
+        for environment in (None, self.environment, other, self.environment, None):
+            Plant.objects.create(owner=self.user, environment=environment, germination_date=day)
+        # Só os cards (a barra de ações em massa também lista os ambientes)
+        content = str(self.client.get(self.url).context['fragment_html'])
+        self.assertEqual(content.count('Sem Ambiente Definido'), 1)
+        self.assertEqual(content.count('<h4>'), 3)
+        self.assertLess(content.index('Tenda Nova'), content.index('Estufa'))
+        self.assertLess(content.index('Estufa'), content.index('Sem Ambiente Definido'))
+
+    def test_age_is_annotated_by_the_database(self):
+        """ Testa se a idade vem da anotação do banco, igual à calculada pela propriedade. """
+        today = datetime.date.today()
+        plant = Plant.objects.create(owner=self.user, name='Idade', germination_date=today - datetime.timedelta(days=17))
+        annotated = Plant.objects.with_age().get(pk=plant.pk)
+        self.assertEqual((annotated.age_days, annotated.age_weeks), (17, 2))
+        self.assertEqual(annotated.age_in_weeks, '2 semana(s) e 3 dia(s)')
+        self.assertEqual(annotated.age_in_weeks, Plant.objects.get(pk=plant.pk).age_in_weeks)
+        with mock.patch('datetime.date') as date:
+            # Com a anotação, a idade não chama date.today() para cada planta
+            self.assertEqual(annotated.age_in_days, 17)
+            date.today.assert_not_called()
+
+    def test_page_cost_does_not_depend_on_position(self):
+        """ Testa se a última página custa o mesmo número de consultas que a primeira. """
+        # Sem cache: sessão, usuário, validador do GET condicional e a página (a barra de ações
+        # em massa não lista ambientes nem estágios)
+        cache.clear()
+        with self.assertNumQueries(4) as first:
+            self.client.get(self.url)
+        self.assertIn('LIMIT 61', first.captured_queries[3]['sql'])
+        cursor = self.client.get(self.url).context['page_obj'].next_cursor
+        cursor = self.client.get(self.url, {'cursor': cursor}).context['page_obj'].next_cursor
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'cursor': cursor})
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor_returns_404(self):
+        """ Testa que um cursor adulterado resulta em 404. """
+        self.assertEqual(self.client.get(self.url, {'cursor': 'bm9wZQ'}).status_code, 404)
+
+    def test_environment_and_stage_lists_are_paginated(self):
+        """ Testa a paginação por cursor das listas de ambientes e estágios. """
+        Stage.objects.bulk_create([Stage(owner=self.user, name=f'Estágio {i}', duration=2) for i in range(55)])
+        response = self.client.get(reverse('cultivation:stage_list'))
+        self.assertEqual(len(response.context['stages']), 50)
+        self.assertContains(response, 'Próxima página')
+        response = self.client.get(reverse('cultivation:environment_list'))
+        self.assertFalse(response.context['is_paginated'])
+
+
+class TestOwnerScopedViews(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        self.environment = make_environment(self.user)
+        self.stage = Stage.objects.create(owner=self.user, name='Vegetativo', duration=4)
+        self.plant = Plant.objects.create(owner=self.user, environment=self.environment, stage=self.stage)
+        self.client.force_login(self.user)
+
+    def owned_urls(self):
+        return [
+            reverse(f'cultivation:{name}', kwargs={'pk': obj.pk})
+            for obj, names in (
+                (self.environment, ('environment_detail', 'environment_edit', 'environment_delete')),
+                (self.plant, ('plant_detail', 'plant_edit', 'plant_delete')),
+                (self.stage, ('stage_edit', 'stage_delete')),
+            )
+            for name in names
+        ]
+
+    def test_other_users_objects_return_404(self):
+        """ Testa que objetos de outro usuário respondem 404, tanto em GET quanto em POST. """
+        self.client.force_login(self.other)
+        for url in self.owned_urls():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+                if url.endswith(('/edit/', '/delete/')):
+                    self.assertEqual(self.client.post(url).status_code, 404)
+        self.assertTrue(Plant.objects.filter(pk=self.plant.pk).exists())
+
+    def test_object_is_fetched_once(self):
+        """ Testa que cada view busca o objeto com um único SELECT filtrado pelo dono. """
+        for url in self.owned_urls():
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(reverse('cultivation:plant_detail', kwargs={'pk': self.plant.pk}))
+        # Fora o updated_at lido para a ETag (ConditionalGetMixin)
+        plant_selects = [q['sql'] for q in context.captured_queries
+                         if 'FROM "cultivation_plant"' in q['sql'] and '"cultivation_plant"."name"' in q['sql']]
+        self.assertEqual(len(plant_selects), 1)
+        self.assertIn('"cultivation_plant"."owner_id" = ', plant_selects[0])
+        self.assertIn('"cultivation_stage"', plant_selects[0])
+
+    def test_delete_post_deletes_with_single_lookup(self):
+        """ Testa que o POST de exclusão busca a planta uma única vez e a remove. """
+        url = reverse('cultivation:plant_delete', kwargs={'pk': self.plant.pk})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(url)
+        self.assertRedirects(response, reverse('cultivation:plant_list'), fetch_redirect_response=False)
+        selects = [q['sql'] for q in context.captured_queries
+                   if q['sql'].startswith('SELECT') and 'FROM "cultivation_plant"' in q['sql']]
+        self.assertEqual(len(selects), 1)
+        self.assertFalse(Plant.objects.filter(pk=self.plant.pk).exists())
+
+
+class TestRouteBudgets(RouteBudgetMixin, TestCase):
+    """
+    Regressão de desempenho: cada rota de cultivation.urls tem um orçamento
+    fixo de consultas, medido sobre um volume de dados realista.
+    Um N+1 novo estoura o orçamento, pois o volume faria o número crescer.
+    """
+    # Consultas por rota. Toda requisição autenticada gasta 2 (sessão e usuário).
+    budgets = {
+        'cultivation:environment_list': 2,      # cards do cache de fragmentos (no miss, 3)
+        'cultivation:environment_detail': 5,    # ambiente, ids das luzes, agregados
+        'cultivation:environment_add': 2,       # as luzes do formulário vêm do catálogo em memória
+        'cultivation:environment_edit': 4,      # ambiente e luzes marcadas
+        'cultivation:environment_delete': 3,
+        'cultivation:environment_export': 3,    # um único SELECT transmitido
+        'cultivation:lighting_list': 2,         # catálogo em memória
+        'cultivation:lighting_add': 2,
+        'cultivation:lighting_edit': 3,
+        'cultivation:lighting_delete': 3,
+        'cultivation:plant_list': 3,            # max(updated_at); cards e barra de ações do cache de fragmentos
+                                                # (no miss, +1 da página)
+        'cultivation:plant_detail': 5,          # updated_at da planta (ETag), a planta e a página do diário
+        'cultivation:journal_entry_add': 3,     # a planta (só pk, dono e nome)
+        'cultivation:plant_add': 2,             # ambiente e estágio são buscados sob demanda (LookupSelect)
+        'cultivation:plant_edit': 5,            # a planta, e o ambiente e o estágio escolhidos pelo pk
+        'cultivation:plant_delete': 3,
+        'cultivation:plant_export': 3,          # plantas com ambiente e estágio, lidas em blocos
+        'cultivation:plant_import': 2,
+        'cultivation:plant_search': 2,          # sem ?q= (com a busca, +2 por índice: veja TestSearch)
+        'cultivation:strain_autocomplete': 2,   # catálogo em memória
+        'cultivation:environment_lookup': 3,    # uma página de ambientes
+        'cultivation:stage_lookup': 3,
+        'cultivation:plant_bulk': 4,            # ambiente escolhido e um único UPDATE
+        'cultivation:stage_list': 3,
+        'cultivation:stage_add': 2,
+        'cultivation:stage_edit': 3,
+        'cultivation:stage_delete': 3,
+        'cultivation:telemetry_ingest': 7,      # ambientes do usuário + transação do lote
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        lights = Lighting.objects.bulk_create([
+            Lighting(light_type=light_type, watts=watts)
+            for light_type in ('LED', 'HPS', 'CMH') for watts in (100, 300, 600, 1000)
+        ])
+        environments = Environment.objects.bulk_create([
+            Environment(owner=cls.user, name=f'Tenda {i}', height=200, width=120, depth=120) for i in range(25)
+        ])
+        Through = Environment.lighting_system.through
+        Through.objects.bulk_create([
+            Through(environment_id=env.pk, lighting_id=light.pk)
+            for env in environments for light in lights[:4]
+        ])
+        stages = Stage.objects.bulk_create([
+            Stage(owner=cls.user, name=f'Estágio {i}', duration=i + 1) for i in range(12)
+        ])
+        day = datetime.date(2026, 1, 1)
+        strain = make_strain('Skunk #1')
+        Plant.objects.bulk_create([
+            Plant(owner=cls.user, environment=environments[i % 25] if i % 10 else None, stage=stages[i % 12],
+                  name=f'Planta {i}', strain=strain, germination_date=day - datetime.timedelta(days=i % 90))
+            for i in range(1500)
+        ])
+        now = rollups.bucket_start(datetime.datetime.now(datetime.timezone.utc), 'H')
+        SensorRollup.objects.bulk_create([
+            SensorRollup(environment=environments[0], metric=metric, resolution='H',
+                         bucket_start=now - datetime.timedelta(hours=hour),
+                         count=720, total=720 * 24.0, minimum=20.0, maximum=28.0)
+            for metric in SensorReading.Metric.values for hour in range(7 * 24)
+        ])
+        cls.light = lights[0]
+        cls.environment = environments[0]
+        cls.stage = stages[0]
+        cls.plant = Plant.objects.filter(environment=cls.environment).first()
+        start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        JournalEntry.objects.bulk_create([
+            JournalEntry(plant=cls.plant, kind=JournalEntry.Kind.WATERING, volume_ml=500,
+                         recorded_at=start + datetime.timedelta(hours=i))
+            for i in range(2000)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def url_for(self, name):
+        kwargs = {
+            'environment_detail': self.environment, 'environment_edit': self.environment,
+            'environment_delete': self.environment,
+            'lighting_edit': self.light, 'lighting_delete': self.light,
+            'plant_detail': self.plant, 'plant_edit': self.plant, 'plant_delete': self.plant,
+            'journal_entry_add': self.plant, 'stage_edit': self.stage, 'stage_delete': self.stage,
+        }
+        obj = kwargs.get(name.split(':')[1])
+        return reverse(name, kwargs={'pk': obj.pk} if obj else None)
+
+    def test_every_route_has_a_budget(self):
+        """ Testa se nenhuma rota de cultivation.urls ficou sem orçamento. """
+        self.assertEqual(set(self.budgets), route_names(urls.urlpatterns, urls.app_name))
+
+    def test_routes_stay_within_query_and_time_budget(self):
+        """ Testa o número de consultas e o tempo de resposta de cada rota. """
+        ndjson = json.dumps({'environment': self.environment.pk, 'metric': 'TEMP', 'value': 24,
+                             'recorded_at': '2026-01-01T00:00:00Z'})
+        for name, queries in self.budgets.items():
+            with self.subTest(route=name):
+                if name == 'cultivation:telemetry_ingest':
+                    self.assertRouteWithinBudget(name, self.url_for(name), queries, method='post',
+                                                 data=ndjson, content_type='application/x-ndjson')
+                elif name == 'cultivation:plant_bulk':
+                    pks = list(Plant.objects.filter(owner=self.user).values_list('pk', flat=True)[:200])
+                    self.assertRouteWithinBudget(name, self.url_for(name), queries, method='post', expected_status=302,
+                                                 data={'action': 'move', 'environment': self.environment.pk,
+                                                       'plants': pks})
+                else:
+                    self.assertRouteWithinBudget(name, self.url_for(name), queries)
+
+
+class TestBenchViewsRoutes(TestCase):
+
+    def test_every_route_resolves_to_a_url(self):
+        """ Testa se o benchmark monta a URL de todas as rotas, e falha com uma mensagem clara numa <pk> desconhecida. """
+        call_command('generate_synthetic_data', users=1, environments=1, stages=1, plants=2, seed=1,
+                     stdout=io.StringIO())
+        user = CustomUser.objects.get()
+        Lighting.objects.get_or_create(light_type='LED', watts=100)
+        targets = bench_views.Command._targets(user)
+        for name in route_names(urls.urlpatterns, urls.app_name):
+            with self.subTest(route=name):
+                url, logged_in = bench_views.Command._url(name, targets)
+                self.assertTrue(logged_in)
+                match = resolve(url)
+                self.assertEqual(match.url_name, name.split(':')[1])
+                # O benchmark só faz GET: rotas só de POST mediriam respostas 405
+                if name not in bench_views.SKIPPED_ROUTES:
+                    self.assertIn('get', match.func.view_class.http_method_names)
+        self.assertIn(str(targets['plant'].pk), bench_views.Command._url('cultivation:journal_entry_add', targets)[0])
+        with mock.patch.dict(bench_views.PK_TARGETS, clear=True):
+            with self.assertRaisesMessage(CommandError, 'cultivation:journal_entry_add'):
+                bench_views.Command._url('cultivation:journal_entry_add', targets)
+
+
+class TestGenerateSyntheticData(TestCase):
+
+    def snapshot(self):
+        return list(Plant.objects.order_by('owner__email', 'name').values_list(
+            'owner__email', 'name', 'strain__name', 'germination_date', 'environment__name', 'stage__name', 'is_active'))
+
+    def test_generation_is_deterministic_for_a_seed(self):
+        """ Testa se a mesma semente gera exatamente os mesmos dados, inclusive as luzes dos ambientes. """
+        options = {'users': 3, 'environments': 2, 'stages': 7, 'plants': 40, 'seed': 7,
+                   'batch_size': 50, 'stdout': io.StringIO()}
+        call_command('generate_synthetic_data', **options)
+        first = self.snapshot()
+        lights = sorted(Environment.lighting_system.through.objects.values_list(
+            'environment__owner__email', 'environment__name', 'lighting__watts', 'lighting__light_type'))
+
+        call_command('generate_synthetic_data', clear=True, **options)
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(sorted(Environment.lighting_system.through.objects.values_list(
+            'environment__owner__email', 'environment__name', 'lighting__watts', 'lighting__light_type')), lights)
+
+        self.assertEqual(CustomUser.objects.count(), 3)
+        self.assertEqual(Plant.objects.count(), 120)
+        self.assertEqual(Stage.objects.filter(owner__email='user0@synthetic.growplant.invalid').count(), 7)
+        self.assertEqual(len(lights), 3 * 2 * 2)
+
+
+class TestFragmentCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.environment = make_environment(self.user)
+        self.stage = Stage.objects.create(owner=self.user, name='Vegetativo', duration=4)
+        self.plant = Plant.objects.create(owner=self.user, environment=self.environment, stage=self.stage,
+                                          name='Skunk')
+        self.client.force_login(self.user)
+        self.plant_list = reverse('cultivation:plant_list')
+        self.environment_list = reverse('cultivation:environment_list')
+
+    def test_hit_skips_query_and_card_rendering(self):
+        """ Testa se o acerto não consulta as plantas nem renderiza os cards. """
+        response = self.client.get(self.plant_list)
+        self.assertEqual(response['X-Fragment-Cache'], 'miss')
+        self.assertTemplateUsed(response, 'cultivation/includes/plant_card.html')
+        with self.assertNumQueries(3):  # sessão, usuário e o validador do GET condicional
+            response = self.client.get(self.plant_list)
+        self.assertEqual(response['X-Fragment-Cache'], 'hit')
+        self.assertTemplateNotUsed(response, 'cultivation/includes/plant_card.html')
+        self.assertContains(response, 'Skunk')
+        # Os cards e a barra de ações em massa
+        self.assertEqual(fragments.stats()['hits'], 2)
+        self.assertEqual(fragments.stats()['misses'], 2)
+
+    def test_versions_are_shared_between_processes(self):
+        """ Testa se outro processo (outra instância do backend, no mesmo diretório) vê a invalidação. """
+        # O backend do projeto (os testes rodam com TEST_CACHES, em memória), num diretório temporário
+        config = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.enterContext(tempfile.TemporaryDirectory()),
+        }
+        self.enterContext(override_settings(CACHES={'default': config}))
+        other_process = import_string(config['BACKEND'])(config['LOCATION'], {})
+        self.client.get(self.plant_list)
+        key = fragments.version_key('plant', self.user.pk)
+        before = other_process.get(key)
+        self.assertIsNotNone(before)
+        fragments.bump('plant', self.user.pk)
+        fragments.bump('plant', self.user.pk)
+        self.assertGreater(other_process.get(key), before)
+
+    def test_async_variants_match_the_sync_ones(self):
+        """ Testa se as chaves, os fragmentos e as estatísticas da API assíncrona coincidem com os da síncrona. """
+        scopes = ('plant', 'stage')
+        key = async_to_sync(fragments.afragment_key)('cards', self.user.pk, scopes, 'cursor')
+        self.assertEqual(key, fragments.fragment_key('cards', self.user.pk, scopes, 'cursor'))
+        self.assertIsNone(async_to_sync(fragments.aget_fragment)(key))
+        async_to_sync(fragments.aset_fragment)(key, {'html': 'cards'})
+        self.assertEqual(fragments.get_fragment(key), {'html': 'cards'})
+        self.assertEqual(fragments.stats()['hits'], 1)
+        self.assertEqual(fragments.stats()['misses'], 1)
+
+    def test_changes_invalidate_dependent_fragments(self):
+        """ Testa se cada alteração invalida só as listas que dependem dela. """
+        def status(url):
+            return self.client.get(url)['X-Fragment-Cache']
+
+        status(self.plant_list)
+        status(self.environment_list)
+        self.stage.name = 'Floração'
+        self.stage.save()
+        self.assertEqual(status(self.plant_list), 'miss')
+        self.assertEqual(status(self.environment_list), 'hit')
+
+        self.client.post(reverse('cultivation:plant_edit', kwargs={'pk': self.plant.pk}), {
+            'name': 'Skunk #2', 'strain': 'Skunk', 'germination_date': '2026-01-01',
+            'environment': self.environment.pk, 'stage': self.stage.pk, 'is_active': 'on',
+        })
+        response = self.client.get(self.plant_list)
+        self.assertEqual(response['X-Fragment-Cache'], 'miss')
+        self.assertContains(response, 'Skunk #2')
+
+        self.environment.lighting_system.add(Lighting.objects.create(light_type='LED', watts=300))
+        self.assertEqual(status(self.environment_list), 'miss')
+        self.assertEqual(status(self.plant_list), 'miss')
+        Plant.objects.get(pk=self.plant.pk).delete()
+        self.assertNotContains(self.client.get(self.plant_list), 'Skunk #2')
+
+    def test_other_owners_fragments_are_untouched(self):
+        """ Testa se as alterações de um usuário não invalidam o cache dos outros. """
+        other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        Plant.objects.create(owner=other, name='Alheia')
+        self.client.get(self.plant_list)
+        Plant.objects.create(owner=other, name='Outra')
+        self.assertEqual(self.client.get(self.plant_list)['X-Fragment-Cache'], 'hit')
+
+    def test_new_owner_starts_with_fresh_versions(self):
+        """ Testa se um usuário novo não herda as versões de outro com o mesmo id. """
+        self.client.get(self.plant_list)
+        pk = self.user.pk
+        self.user.delete()
+        reused = CustomUser.objects.create_user(email='new@test.com', password='password123', pk=pk)
+        self.client.force_login(reused)
+        response = self.client.get(self.plant_list)
+        self.assertEqual(response['X-Fragment-Cache'], 'miss')
+        self.assertNotContains(response, 'Skunk')
+
+
+class TestConditionalGet(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.environment = make_environment(self.user)
+        self.stage = Stage.objects.create(owner=self.user, name='Vegetativo', duration=4)
+        self.plant = Plant.objects.create(owner=self.user, environment=self.environment, stage=self.stage,
+                                          name='Skunk')
+        self.client.force_login(self.user)
+        self.urls = [
+            reverse('cultivation:plant_list'),
+            reverse('cultivation:plant_detail', kwargs={'pk': self.plant.pk}),
+        ]
+
+    def test_unchanged_page_answers_304_without_rendering(self):
+        """ Testa se a mesma ETag responde 304 sem consultar a página nem renderizar o template. """
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
+                with self.assertNumQueries(3):  # sessão, usuário e o validador
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertFalse(response.templates)
+
+    def test_changes_produce_a_new_etag(self):
+        """ Testa se editar a planta, renomear o estágio ou mudar o ambiente invalidam a ETag. """
+        def rename(obj, name):
+            obj.name = name
+            obj.save()
+
+        changes = [
+            lambda: rename(self.plant, 'Skunk #2'),
+            lambda: rename(self.stage, 'Floração'),
+            lambda: rename(self.environment, 'Tenda'),
+            lambda: Stage.objects.get(pk=self.stage.pk).delete(),
+        ]
+        for change in changes:
+            etags = [self.client.get(url)['ETag'] for url in self.urls]
+            change()
+            for url, etag in zip(self.urls, etags):
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_age_changes_at_midnight(self):
+        """ Testa se a virada do dia invalida a ETag (a página mostra a idade das plantas). """
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        with mock.patch('cultivation.mixins.date') as date:
+            date.today.return_value = tomorrow
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_pending_messages_are_always_rendered(self):
+        """ Testa se a página depois de um redirect com mensagem não vira 304. """
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        with mock.patch('cultivation.mixins.messages.get_messages', return_value=['Planta salva!']):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_other_owners_and_anonymous_requests(self):
+        """ Testa se a planta de outro usuário segue em 404 e o anônimo é redirecionado ao login. """
+        other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        foreign = Plant.objects.create(owner=other, name='Alheia')
+        url = reverse('cultivation:plant_detail', kwargs={'pk': foreign.pk})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+        self.client.logout()
+        response = self.client.get(self.urls[0], HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 302)
+
+
+class TestAsyncViews(TestCase):
+    """ Listas e detalhes de plantas e ambientes no modo ASGI (async_views.py). """
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        self.environment = make_environment(self.user, name='Tenda Norte')
+        self.stage = Stage.objects.create(owner=self.user, name='Vegetativo', duration=4)
+        self.plants = [
+            Plant.objects.create(owner=self.user, environment=self.environment, stage=self.stage,
+                                 name=f'Planta {index:02d}', strain=make_strain('Skunk'))
+            for index in range(3)
+        ]
+        JournalEntry.objects.create(plant=self.plants[0], note='Primeira rega')
+        self.foreign_environment = make_environment(self.other)
+        self.foreign_plant = Plant.objects.create(owner=self.other, name='Alheia')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+        self.urls = {
+            'environment_list': reverse('cultivation:environment_list'),
+            'environment_detail': reverse('cultivation:environment_detail', kwargs={'pk': self.environment.pk}),
+            'plant_list': reverse('cultivation:plant_list'),
+            'plant_detail': reverse('cultivation:plant_detail', kwargs={'pk': self.plants[0].pk}),
+        }
+
+    @staticmethod
+    def without_csrf(content):
+        # O token do formulário muda a cada renderização, e só o ASGI liga os eventos ao vivo
+        content = re.sub(rb'name="csrfmiddlewaretoken" value="[^"]+"', b'', content)
+        return re.sub(rb'\n<div data-event-stream=[^>]*></div>\n', b'', content)
+
+    def test_asgi_urls_keep_every_route_and_swap_the_read_views(self):
+        """ Testa se o modo ASGI tem as mesmas rotas, com as listas e detalhes nas views assíncronas. """
+        self.assertEqual(route_names(asgi_urls.urlpatterns), route_names(urls.urlpatterns) | {'event_stream'})
+        with self.settings(ROOT_URLCONF='growplant.asgi_urls'):
+            for name, url in self.urls.items():
+                with self.subTest(name=name):
+                    view_class = resolve(url).func.view_class
+                    self.assertIs(view_class, asgi_urls.ASYNC_VIEWS[name])
+                    self.assertTrue(view_class.view_is_async)
+            self.assertFalse(resolve(reverse('cultivation:plant_add')).func.view_class.view_is_async)
+
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    async def test_pages_match_the_sync_views(self):
+        """ Testa se as views assíncronas mostram o mesmo HTML das síncronas, com e sem o cache de fragmentos. """
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                with self.settings(ROOT_URLCONF='growplant.urls'):
+                    expected = await sync_to_async(self.client.get)(url)
+                for _ in range(2):  # a lista é renderizada na primeira e vem do cache na segunda
+                    response = await self.async_client.get(url)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(self.without_csrf(response.content), self.without_csrf(expected.content))
+        self.assertContains(response, 'Primeira rega')
+
+    # assertNumQueries não funciona dentro do loop: estes testes são síncronos e chamam o
+    # cliente assíncrono por async_to_sync (o ORM assíncrono volta para esta mesma thread)
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    def test_fragment_cache_skips_the_page_query(self):
+        """ Testa se a segunda visita à lista usa o cache de fragmentos: só sessão, usuário e validador. """
+        get = async_to_sync(self.async_client.get)
+        url = self.urls['plant_list']
+        response = get(url)
+        self.assertEqual(response['X-Fragment-Cache'], 'miss')
+        with self.assertNumQueries(3):
+            response = get(url)
+        self.assertEqual(response['X-Fragment-Cache'], 'hit')
+        self.assertContains(response, 'Planta 02')
+
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    def test_unchanged_page_answers_304(self):
+        """ Testa se a ETag das views assíncronas responde 304 sem renderizar e muda com a planta. """
+        get = async_to_sync(self.async_client.get)
+        for url in (self.urls['plant_list'], self.urls['plant_detail']):
+            with self.subTest(url=url):
+                response = get(url)
+                self.assertIn('private', response['Cache-Control'])
+                with self.assertNumQueries(3):  # sessão, usuário e o validador
+                    cached = get(url, headers={'if-none-match': response['ETag']})
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(cached.content, b'')
+
+        Plant.objects.filter(pk=self.plants[0].pk).update_with_timestamp(name='Renomeada')
+        response = get(self.urls['plant_detail'], headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renomeada')
+
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    async def test_only_the_owner_sees_the_objects(self):
+        """ Testa se ambientes e plantas de outro usuário dão 404, e cursores inválidos também. """
+        foreign = [
+            reverse('cultivation:environment_detail', kwargs={'pk': self.foreign_environment.pk}),
+            reverse('cultivation:plant_detail', kwargs={'pk': self.foreign_plant.pk}),
+            self.urls['plant_list'] + '?cursor=invalido',
+            self.urls['plant_detail'] + '?cursor=invalido',
+        ]
+        for url in foreign:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 404)
+        response = await self.async_client.get(self.urls['plant_list'])
+        self.assertNotContains(response, 'Alheia')
+
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    async def test_anonymous_user_is_redirected_to_login(self):
+        """ Testa se as views assíncronas mandam o visitante para o login, como LoginRequiredMixin. """
+        await self.async_client.alogout()
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 302)
+                self.assertIn(f'?next={url}', response['Location'])
+
+    async def test_async_keyset_pages_match_the_sync_ones(self):
+        """ Testa se apaginate_keyset percorre a lista nas mesmas páginas que paginate_keyset. """
+        queryset = Plant.objects.filter(owner=self.user)
+        ordering = views.PlantListView.keyset_ordering
+        cursor, pages = None, []
+        while True:
+            page = await apaginate_keyset(queryset, ordering, cursor, 2)
+            expected = await sync_to_async(paginate_keyset)(queryset, ordering, cursor, 2)
+            self.assertEqual(page.object_list, expected.object_list)
+            self.assertEqual(page.next_cursor, expected.next_cursor)
+            pages.append([plant.name for plant in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(pages, [['Planta 00', 'Planta 01'], ['Planta 02']])
+
+
+class TestLiveEvents(TestCase):
+    """ Eventos ao vivo por Server-Sent Events (events.py e async_views.EventStreamView). """
+
+    def setUp(self):
+        cache.clear()
+        events.broker.clear()
+        self.addCleanup(events.broker.clear)
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        self.environment = make_environment(self.user, name='Tenda')
+        self.stage = Stage.objects.create(owner=self.user, name='Floração', duration=8)
+        self.plant = Plant.objects.create(owner=self.user, name='Skunk')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    @contextmanager
+    def published(self):
+        """Os eventos publicados depois do commit, como (dono, tipo, dados)."""
+        published = []
+        record = mock.patch.object(events.broker, 'publish', side_effect=lambda *event: published.append(event))
+        with record, self.captureOnCommitCallbacks(execute=True):
+            yield published
+
+    async def test_broker_fans_out_per_owner_and_replays_after_reconnect(self):
+        """ Testa se o evento chega só às conexões do dono e se o Last-Event-ID recupera os perdidos. """
+        broker = events.Broker()
+        mine, _ = broker.subscribe(1)
+        theirs, _ = broker.subscribe(2)
+        first = broker.publish(1, events.PLANT_CREATED, {'count': 1})
+        self.assertEqual(await mine.get(1), first)
+        self.assertTrue(theirs.queue.empty())
+
+        broker.unsubscribe(1, mine)
+        self.assertEqual(broker.subscriber_count(1), 0)
+        missed = broker.publish(1, events.PLANT_CREATED, {'count': 2})
+        _, backlog = broker.subscribe(1, last_event_id=first.id)
+        self.assertEqual(backlog, [missed])
+        # Outro processo (ou um reinício): não dá para saber o que foi perdido
+        _, backlog = broker.subscribe(1, last_event_id='outro-1')
+        self.assertEqual([event.type for event in backlog], [events.RESET])
+
+    async def test_broker_resets_when_history_or_queue_overflow(self):
+        """ Testa o 'reset' quando os eventos perdidos já saíram do histórico ou a fila encheu. """
+        broker = events.Broker()
+        first = broker.publish(1, events.PLANT_CREATED, {'count': 1})
+        for _ in range(events.HISTORY_SIZE + 1):
+            broker.publish(1, events.PLANT_CREATED, {'count': 1})
+        _, backlog = broker.subscribe(1, last_event_id=first.id)
+        self.assertEqual([event.type for event in backlog], [events.RESET])
+
+        with mock.patch.object(events, 'QUEUE_SIZE', 2):
+            subscription, _ = broker.subscribe(2)
+        for _ in range(3):
+            broker.publish(2, events.PLANT_CREATED, {'count': 1})
+        await asyncio.sleep(0)  # a entrega passa pelo loop (call_soon_threadsafe)
+        self.assertEqual(subscription.queue.qsize(), 2)
+        self.assertTrue(subscription.overflowed)
+
+    async def test_broker_forgets_idle_owners_beyond_the_limit(self):
+        """ Testa se só os donos que publicaram por último (ou conectados) guardam histórico, e o 'reset' dos outros. """
+        broker = events.Broker()
+        broker.subscribe(1)
+        with mock.patch.object(events, 'MAX_OWNERS', 2):
+            first = broker.publish(1, events.PLANT_CREATED, {'count': 1})
+            forgotten = broker.publish(2, events.PLANT_CREATED, {'count': 1})
+            broker.publish(3, events.PLANT_CREATED, {'count': 1})
+            broker.publish(4, events.PLANT_CREATED, {'count': 1})
+        self.assertEqual(list(broker._history), [1, 4])
+        _, backlog = broker.subscribe(1, last_event_id=first.id)
+        self.assertEqual(backlog, [])
+        _, backlog = broker.subscribe(2, last_event_id=forgotten.id)
+        self.assertEqual([event.type for event in backlog], [events.RESET])
+        # Um histórico novo não cobre os eventos apagados
+        broker.publish(2, events.PLANT_CREATED, {'count': 1})
+        _, backlog = broker.subscribe(2, last_event_id=forgotten.id)
+        self.assertEqual([event.type for event in backlog], [events.RESET])
+
+    def test_plant_changes_publish_after_commit(self):
+        """ Testa os eventos de planta criada, movida e com estágio novo, e nada quando só o nome muda. """
+        with self.published() as published:
+            created = Plant.objects.create(owner=self.user, name='Nova')
+        self.assertEqual(published, [(self.user.pk, events.PLANT_CREATED, {'count': 1})])
+
+        plant = Plant.objects.get(pk=self.plant.pk)
+        with self.published() as published:
+            plant.environment = self.environment
+            plant.stage = self.stage
+            plant.save()
+            plant.name = 'Renomeada'
+            plant.save()
+        self.assertEqual(published, [
+            (self.user.pk, events.PLANT_MOVED,
+             {'plants': [plant.pk], 'environment': {'id': self.environment.pk, 'name': 'Tenda'}}),
+            (self.user.pk, events.PLANT_STAGE,
+             {'plants': [plant.pk], 'stage': {'id': self.stage.pk, 'name': 'Floração'}}),
+        ])
+
+        with self.published() as published:
+            Plant.objects.get(pk=created.pk).save()
+        self.assertEqual(published, [])
+
+    def test_bulk_actions_import_and_telemetry_publish(self):
+        """ Testa os eventos das ações em massa, da importação e da telemetria, que não passam pelos sinais. """
+        with self.published() as published:
+            self.client.post(reverse('cultivation:plant_bulk'), {
+                'action': 'move', 'plants': [self.plant.pk], 'environment': self.environment.pk,
+            })
+            self.client.post(reverse('cultivation:plant_bulk'), {'action': 'deactivate', 'plants': [self.plant.pk]})
+            self.client.post(reverse('cultivation:plant_bulk'), {
+                'action': 'clone', 'plants': [self.plant.pk], 'copies': 2,
+            })
+            self.client.post(
+                reverse('cultivation:telemetry_ingest'),
+                '\n'.join(json.dumps({'environment': self.environment.pk, 'metric': 'TEMP', 'value': 20 + i,
+                                       'recorded_at': f'2026-01-01T00:00:0{i}Z'}) for i in range(3)),
+                content_type='application/x-ndjson',
+            )
+            imports.import_plants(
+                [(2, {'name': 'Importada', 'strain': 'Skunk', 'germination_date': '2026-01-01'})], self.user,
+            )
+        self.assertEqual(published, [
+            (self.user.pk, events.PLANT_MOVED,
+             {'plants': [self.plant.pk], 'environment': {'id': self.environment.pk, 'name': 'Tenda'}}),
+            (self.user.pk, events.PLANT_CREATED, {'count': 2}),
+            (self.user.pk, events.TELEMETRY, {'environments': {str(self.environment.pk): 3}}),
+            (self.user.pk, events.PLANT_CREATED, {'count': 1}),
+        ])
+
+    def test_admin_actions_publish(self):
+        """ Testa os eventos das ações em massa do admin, entregues ao dono de cada planta. """
+        foreign = Plant.objects.create(owner=self.other, name='Alheia')
+        admin_user = CustomUser.objects.create_superuser(email='admin@test.com', password='password123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:cultivation_plant_changelist')
+        selected = [self.plant.pk, foreign.pk]
+        with self.published() as published:
+            self.client.post(url, {'action': 'move_to_environment', '_selected_action': selected,
+                                   'environment': self.environment.pk})
+            self.client.post(url, {'action': 'set_stage', '_selected_action': selected, 'stage': self.stage.pk})
+            self.client.post(url, {'action': 'clone', '_selected_action': selected, 'copies': 2})
+        self.assertEqual(published[:2], [
+            (self.user.pk, events.PLANT_MOVED,
+             {'plants': [self.plant.pk], 'environment': {'id': self.environment.pk, 'name': 'Tenda'}}),
+            (self.user.pk, events.PLANT_STAGE,
+             {'plants': [self.plant.pk], 'stage': {'id': self.stage.pk, 'name': 'Floração'}}),
+        ])
+        self.assertCountEqual(published[2:], [
+            (self.user.pk, events.PLANT_CREATED, {'count': 2}),
+            (self.other.pk, events.PLANT_CREATED, {'count': 2}),
+        ])
+
+    def test_pages_link_the_stream_only_under_asgi(self):
+        """ Testa se a lista e o detalhe do ambiente só ligam os eventos no modo ASGI. """
+        pages = [
+            reverse('cultivation:plant_list'),
+            reverse('cultivation:environment_detail', kwargs={'pk': self.environment.pk}),
+        ]
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), 'data-event-stream')
+                with self.settings(ROOT_URLCONF='growplant.asgi_urls'):
+                    response = async_to_sync(self.async_client.get)(url)
+                    self.assertContains(response, f'data-event-stream="{reverse("cultivation:event_stream")}"')
+
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    async def test_stream_sends_owner_events_and_heartbeats(self):
+        """ Testa o fluxo: retry, os eventos do dono, o heartbeat e o cancelamento do registro no fim. """
+        with mock.patch.object(async_views.EventStreamView, 'heartbeat', 0.01):
+            response = await self.async_client.get(reverse('cultivation:event_stream'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertEqual(response['Cache-Control'], 'no-cache')
+            stream = aiter(response.streaming_content)
+            self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+            self.assertEqual(await anext(stream), b': ping\n\n')
+            self.assertEqual(events.broker.subscriber_count(self.user.pk), 1)
+
+            events.broker.publish(self.other.pk, events.PLANT_CREATED, {'count': 5})
+            event = events.broker.publish(self.user.pk, events.PLANT_STAGE, {'plants': [1], 'stage': None})
+            chunk = await anext(stream)
+            while chunk == b': ping\n\n':
+                chunk = await anext(stream)
+            self.assertEqual(chunk, event.encode().encode())
+            self.assertIn(b'event: plant.stage\ndata: {"plants":[1],"stage":null}', chunk)
+
+    async def test_closing_the_stream_unsubscribes(self):
+        """ Testa se a conexão encerrada sai do broker (o handler ASGI fecha o gerador). """
+        stream = async_views.EventStreamView().stream(self.user.pk)
+        await anext(stream)
+        self.assertEqual(events.broker.subscriber_count(self.user.pk), 1)
+        await stream.aclose()
+        self.assertEqual(events.broker.subscriber_count(), 0)
+
+    @override_settings(ROOT_URLCONF='growplant.asgi_urls')
+    async def test_stream_requires_login(self):
+        """ Testa se o visitante é mandado para o login em vez de abrir o fluxo. """
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('cultivation:event_stream'))
+        self.assertEqual(response.status_code, 302)
+
+
+class TestCsvExport(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.environment = make_environment(self.user, name='Tenda Norte')
+        self.stage = Stage.objects.create(owner=self.user, name='Floração', duration=8)
+        Plant.objects.create(owner=self.user, environment=self.environment, stage=self.stage, name='Skunk #1',
+                             germination_date=datetime.date(2026, 1, 2))
+        Plant.objects.create(owner=self.user, name='=HYPERLINK("http://x")', strain=make_strain('-Desconhecida'),
+                             germination_date=datetime.date(2026, 1, 1), is_active=False)
+        other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        Plant.objects.create(owner=other, name='Alheia')
+        self.client.force_login(self.user)
+
+    def read_csv(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(content.startswith('\ufeff'))
+        return response, list(csv.reader(io.StringIO(content[1:]), delimiter=';'))
+
+    def test_export_streams_under_asgi(self):
+        """ Testa se sob ASGI a resposta é assíncrona (o handler não junta o arquivo na memória) e igual à do WSGI. """
+        async def read(url):
+            response = await self.async_client.get(url)
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        self.async_client.force_login(self.user)
+        url = reverse('cultivation:plant_export')
+        response, content = async_to_sync(read)(url)
+        self.assertTrue(response.is_async)
+        self.assertEqual(content, b''.join(self.client.get(url).streaming_content))
+
+    def test_plant_export_streams_owner_rows_for_spreadsheets(self):
+        """ Testa o CSV de plantas: cabeçalho, só as plantas do usuário, nomes relacionados e fórmulas neutralizadas. """
+        response, rows = self.read_csv(reverse('cultivation:plant_export'))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="plantas-\d{4}-\d{2}-\d{2}\.csv"$')
+        header, first, second = rows
+        self.assertEqual(header[:3], ['id', 'nome', 'variedade'])
+        record = dict(zip(header, first))
+        self.assertEqual(record['nome'], 'Skunk #1')
+        self.assertEqual(record['data_germinacao'], '2026-01-02')
+        self.assertEqual((record['ambiente'], record['estagio'], record['ativa']), ('Tenda Norte', 'Floração', 'sim'))
+        record = dict(zip(header, second))
+        self.assertEqual(record['nome'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(record['variedade'], "'-Desconhecida")
+        self.assertEqual((record['ambiente'], record['estagio'], record['ativa']), ('', '', 'não'))
+
+    def test_export_memory_does_not_grow_with_rows(self):
+        """ Testa, em pequena escala e sempre, se a exportação guarda um bloco de plantas por vez, não todas. """
+        Plant.objects.bulk_create([Plant(owner=self.user, name=f'Muda {i}') for i in range(3000)])
+
+        def peak(consume):
+            tracemalloc.start()
+            try:
+                consume()
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        def export():
+            for _line in exports.stream_csv(exports.plant_queryset(self.user), exports.PLANT_COLUMNS, chunk_size=100):
+                pass
+
+        # Carregar as 3000 plantas de uma vez é a referência do que a exportação não pode fazer
+        self.assertLess(peak(export), peak(lambda: list(exports.plant_queryset(self.user))) / 3)
+
+    def test_environment_export(self):
+        """ Testa o CSV de ambientes. """
+        _, rows = self.read_csv(reverse('cultivation:environment_export'))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(dict(zip(*rows))['nome'], 'Tenda Norte')
+
+    def test_export_requires_login(self):
+        """ Testa se o anônimo é redirecionado ao login. """
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('cultivation:plant_export')).status_code, 302)
+
+
+@skipUnless(connection.vendor == 'sqlite' and os.path.exists('/proc/self/statm'), "insere as linhas com SQL do SQLite")
+@skipUnless(os.environ.get('GROWPLANT_EXPORT_TEST_ROWS'), "lento: defina GROWPLANT_EXPORT_TEST_ROWS (ex.: 500000)")
+class TestCsvExportMemory(TestCase):
+    """
+    A exportação transmite as linhas: a memória do processo não cresce com o
+    número de plantas. Medida pelo RSS (o tracemalloc deixaria a exportação
+    dezenas de vezes mais lenta).
+
+    Só roda com GROWPLANT_EXPORT_TEST_ROWS: com poucas linhas o teto não
+    distingue transmitir de carregar tudo, e com 500 mil leva mais de um minuto.
+    """
+    ROWS = int(os.environ.get('GROWPLANT_EXPORT_TEST_ROWS') or 0)
+    # Carregar as 500 mil plantas numa lista passaria de 500 MB
+    MAX_GROWTH = 32 * 1024 * 1024
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        environment = make_environment(cls.user)
+        stage = Stage.objects.create(owner=cls.user, name='Vegetativo', duration=4)
+        strain = make_strain('Skunk #1')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < %s)
+                INSERT INTO cultivation_plant (owner_id, environment_id, stage_id, name, strain_id, germination_date,
+                                               is_active, created_at, updated_at, last_entry_kind)
+                SELECT %s, CASE WHEN i %% 3 THEN %s END, %s, 'Planta ' || i, %s,
+                       date('2026-01-01', '-' || (i %% 400) || ' days'), i %% 4 > 0,
+                       '2026-01-01 00:00:00', '2026-01-01 00:00:00', ''
+                FROM seq
+                """,
+                [cls.ROWS, cls.user.pk, environment.pk, stage.pk, strain.pk],
+            )
+
+    def setUp(self):
+        self.rows = 0
+        self.baseline = self.peak = None
+
+    @staticmethod
+    def rss():
+        with open('/proc/self/statm') as handle:
+            return int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+    def measure(self, chunk):
+        """Conta as linhas de mais um pedaço da resposta e acompanha o pico do RSS."""
+        self.rows += chunk.count(b'\n')
+        if self.rows == 5 * exports.CHUNK_SIZE:
+            # Depois dos primeiros blocos: cursor aberto, caches aquecidos
+            self.baseline = self.peak = self.rss()
+        elif self.baseline is not None and self.rows % exports.CHUNK_SIZE == 0:
+            self.peak = max(self.peak, self.rss())
+
+    def test_memory_stays_flat_while_exporting(self):
+        """ Testa se o RSS não cresce enquanto as linhas são transmitidas. """
+        self.client.force_login(self.user)
+        for chunk in self.client.get(reverse('cultivation:plant_export')).streaming_content:
+            self.measure(chunk)
+        self.assertEqual(self.rows, self.ROWS + 1)
+        self.assertLess(self.peak - self.baseline, self.MAX_GROWTH)
+
+    def test_memory_stays_flat_while_exporting_under_asgi(self):
+        """ Testa o mesmo pelo handler ASGI, que juntaria um gerador síncrono inteiro antes de enviar. """
+        async def export():
+            response = await self.async_client.get(reverse('cultivation:plant_export'))
+            async for chunk in response.streaming_content:
+                self.measure(chunk)
+
+        self.async_client.force_login(self.user)
+        async_to_sync(export)()
+        self.assertEqual(self.rows, self.ROWS + 1)
+        self.assertLess(self.peak - self.baseline, self.MAX_GROWTH)
+
+
+class TestPlantImport(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.environment = make_environment(self.user, name='Tenda Norte')
+        self.stage = Stage.objects.create(owner=self.user, name='Floração', duration=8)
+        other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        make_environment(other, name='Tenda Sul')
+        self.client.force_login(self.user)
+        self.url = reverse('cultivation:plant_import')
+
+    def upload(self, *lines, header='nome;variedade;data_germinacao;ambiente;estagio;ativa'):
+        content = '\n'.join((header,) + lines).encode('utf-8')
+        return self.client.post(self.url, {'file': SimpleUploadedFile('plantas.csv', content, 'text/csv')})
+
+    def test_valid_rows_are_inserted_in_batches(self):
+        """ Testa a importação: nomes resolvidos sem diferenciar maiúsculas e uma consulta por lote, não por linha. """
+        rows = [f'Planta {i};Skunk;2026-01-{i % 28 + 1:02d};tenda norte;Floração;sim' for i in range(450)]
+        data = '\n'.join(['nome;variedade;data_germinacao;ambiente;estagio;ativa'] + rows).encode()
+        skunk = make_strain('Skunk')
+        strain_catalog.all()
+        with CaptureQueriesContext(connection) as queries:
+            result = imports.import_plants(imports.open_csv(io.BytesIO(data)), self.user, batch_size=200)
+        self.assertEqual((result.created, result.rejected), (450, 0))
+        selects = [q for q in queries.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 2)  # ambientes e estágios do usuário; a variedade vem do catálogo
+        plant = Plant.objects.get(name='Planta 3')
+        self.assertEqual((plant.owner, plant.environment, plant.stage), (self.user, self.environment, self.stage))
+        self.assertEqual(plant.strain, skunk)
+        self.assertEqual(plant.germination_date, datetime.date(2026, 1, 4))
+
+    def test_export_file_can_be_imported_back(self):
+        """ Testa se o CSV da exportação (com BOM e colunas extras) é aceito como está. """
+        Plant.objects.create(owner=self.user, environment=self.environment, name='Skunk #1',
+                             strain=make_strain('Skunk'), germination_date=datetime.date(2026, 1, 2), is_active=False)
+        exported = b''.join(self.client.get(reverse('cultivation:plant_export')).streaming_content)
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('plantas.csv', exported, 'text/csv')})
+        self.assertRedirects(response, reverse('cultivation:plant_list'), fetch_redirect_response=False)
+        copies = Plant.objects.filter(name='Skunk #1')
+        self.assertEqual(copies.count(), 2)
+        self.assertEqual({(p.environment_id, p.is_active) for p in copies}, {(self.environment.pk, False)})
+
+    def test_any_invalid_row_rolls_back_and_reports_errors(self):
+        """ Testa se uma linha inválida impede a gravação e os erros voltam com o número da linha. """
+        make_environment(self.user, name='Duplicado')
+        make_environment(self.user, name='duplicado')
+        response = self.upload(
+            'Válida;Skunk;2026-01-01;;;',
+            'Data ruim;Skunk;01-31-2026x;;;',
+            'Sem ambiente;Skunk;2026-01-01;Tenda Sul;;',
+            'Ambíguo;Skunk;2026-01-01;Duplicado;;',
+            ';Skunk;2026-01-01;;;talvez',
+            f'{"x" * 101};Skunk;2026-01-01;;;',
+        )
+        self.assertEqual(response.status_code, 400)
+        result = response.context['result']
+        self.assertEqual((result.valid, result.rejected, result.created), (1, 5, 0))
+        errors = {error['line']: error['error'] for error in result.errors}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6, 7])
+        self.assertIn('Data de Germinação', errors[3])
+        self.assertIn("Ambiente 'Tenda Sul' não encontrado", errors[4])
+        self.assertIn('ambíguo', errors[5])
+        self.assertIn('Ativa', errors[6])
+        self.assertIn('Nome da Planta', errors[6])
+        self.assertIn('100', errors[7])
+        self.assertContains(response, 'Nenhuma planta foi', status_code=400)
+        self.assertFalse(Plant.objects.exists())
+
+    def test_missing_columns_and_encoding_are_form_errors(self):
+        """ Testa se arquivo sem colunas obrigatórias ou fora do UTF-8 vira erro no formulário. """
+        response = self.upload('Skunk', header='nome')
+        self.assertFormError(response.context['form'], 'file',
+                             'Coluna(s) obrigatória(s) ausente(s): variedade, data_germinacao.')
+        response = self.client.post(self.url, {'file': SimpleUploadedFile(
+            'plantas.csv', 'nome;variedade;data_germinacao\nFloração;x;2026-01-01'.encode('latin-1'))})
+        self.assertFormError(response.context['form'], 'file', 'O arquivo precisa estar em UTF-8.')
+
+    def test_malformed_csv_is_a_form_error(self):
+        """ Testa se um campo acima do limite do módulo csv vira erro no formulário, sem gravar nada. """
+        response = self.upload('Nova;Nova variedade;2026-01-01;;;', f'Longa;{"x" * 140_000};2026-01-01;;;')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('O arquivo não é um CSV válido', response.context['form'].errors['file'][0])
+        self.assertFalse(Plant.objects.exists())
+        self.assertFalse(Strain.objects.filter(name='Nova variedade').exists())
+        # O mesmo no cabeçalho
+        response = self.upload('Nova;Skunk;2026-01-01;;;', header=f'nome;variedade;data_germinacao;{"x" * 140_000}')
+        self.assertIn('O arquivo não é um CSV válido', response.context['form'].errors['file'][0])
+
+    def test_import_invalidates_plant_list_cache(self):
+        """ Testa se o bulk_create, que não dispara sinais, invalida o cache da lista de plantas. """
+        self.client.get(reverse('cultivation:plant_list'))
+        self.upload('Nova;Skunk;2026-01-01;;;')
+        response = self.client.get(reverse('cultivation:plant_list'))
+        self.assertEqual(response['X-Fragment-Cache'], 'miss')
+        self.assertContains(response, 'Nova')
+
+
+class TestBulkPlantActions(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.veg = make_environment(self.user, name='Vega')
+        self.flower = make_environment(self.user, name='Floração')
+        self.stage = Stage.objects.create(owner=self.user, name='Floração', duration=8)
+        skunk = make_strain('Skunk')
+        self.plants = Plant.objects.bulk_create([
+            Plant(owner=self.user, environment=self.veg, name=f'Clone {i}', strain=skunk) for i in range(5)
+        ])
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        self.foreign = Plant.objects.create(owner=self.other, name='Alheia')
+        self.client.force_login(self.user)
+        self.url = reverse('cultivation:plant_bulk')
+
+    def post(self, action, plants, **extra):
+        return self.client.post(self.url, {'action': action, 'plants': [p.pk for p in plants], **extra})
+
+    def test_move_is_a_single_owner_scoped_update(self):
+        """ Testa se mover as plantas é um único UPDATE restrito ao dono, que mantém o updated_at. """
+        before = Plant.objects.get(pk=self.plants[0].pk).updated_at
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post('move', self.plants[:3] + [self.foreign], environment=self.flower.pk)
+        self.assertRedirects(response, reverse('cultivation:plant_list'), fetch_redirect_response=False)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "cultivation_plant"')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"owner_id" = ', updates[0])
+        self.assertEqual(Plant.objects.filter(environment=self.flower).count(), 3)
+        self.assertGreater(Plant.objects.get(pk=self.plants[0].pk).updated_at, before)
+        self.assertIsNone(Plant.objects.get(pk=self.foreign.pk).environment)
+        self.assertEqual([str(m) for m in response.wsgi_request._messages], ['3 planta(s) atualizada(s).'])
+
+    def test_stage_and_active_flags(self):
+        """ Testa as ações de estágio e de ativa/inativa. """
+        self.post('stage', self.plants[:2], stage=self.stage.pk)
+        self.post('deactivate', self.plants[1:4])
+        self.assertEqual(Plant.objects.filter(stage=self.stage).count(), 2)
+        self.assertEqual(Plant.objects.filter(owner=self.user, is_active=False).count(), 3)
+        self.post('activate', self.plants)
+        self.assertFalse(Plant.objects.filter(owner=self.user, is_active=False).exists())
+
+    def test_clone_creates_numbered_copies(self):
+        """ Testa se a clonagem cria as cópias com bulk_create, no mesmo ambiente e numeradas. """
+        with CaptureQueriesContext(connection) as queries:
+            self.post('clone', [self.plants[0], self.foreign], copies=3)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "cultivation_plant"')]
+        self.assertEqual(len(inserts), 1)
+        copies = Plant.objects.filter(name__startswith='Clone 0 (cópia')
+        self.assertEqual(sorted(copies.values_list('name', flat=True)),
+                         ['Clone 0 (cópia 1)', 'Clone 0 (cópia 2)', 'Clone 0 (cópia 3)'])
+        self.assertEqual({(p.owner_id, p.environment_id) for p in copies}, {(self.user.pk, self.veg.pk)})
+        self.assertFalse(Plant.objects.filter(owner=self.other, name__contains='cópia').exists())
+
+    def test_invalid_requests_change_nothing(self):
+        """ Testa seleção vazia, ambiente de outro usuário e clonagem sem número de cópias. """
+        foreign_environment = make_environment(self.other)
+        cases = [
+            ('move', [], {'environment': self.flower.pk}),
+            ('move', self.plants, {'environment': foreign_environment.pk}),
+            # Destino em branco não tira as plantas do ambiente nem limpa o estágio
+            ('move', self.plants, {}),
+            ('stage', self.plants, {}),
+            ('', self.plants, {'environment': self.flower.pk}),
+            ('clone', self.plants, {}),
+        ]
+        for action, plants, extra in cases:
+            with self.subTest(action=action, extra=extra):
+                response = self.post(action, plants, **extra)
+                self.assertEqual(response.status_code, 302)
+                self.assertTrue(all(m.level == message_levels.ERROR for m in response.wsgi_request._messages))
+        self.assertEqual(Plant.objects.filter(environment=self.veg).count(), 5)
+        self.assertEqual(Plant.objects.count(), 6)
+
+    def test_clearing_environment_and_stage_are_explicit_actions(self):
+        """ Testa as ações de tirar do ambiente e de limpar o estágio, mesmo com um destino no formulário. """
+        self.post('stage', self.plants[:2], stage=self.stage.pk)
+        self.post('clear_environment', self.plants[:3], environment=self.flower.pk)
+        self.post('clear_stage', self.plants[:1])
+        self.assertEqual(Plant.objects.filter(owner=self.user, environment__isnull=True).count(), 3)
+        self.assertFalse(Plant.objects.filter(environment=self.flower).exists())
+        self.assertEqual(Plant.objects.filter(stage=self.stage).count(), 1)
+
+    def test_list_shows_selection_and_is_invalidated(self):
+        """ Testa a barra de ações e os checkboxes na lista, e a invalidação do cache após a ação. """
+        plant_list = reverse('cultivation:plant_list')
+        response = self.client.get(plant_list)
+        self.assertContains(response, 'id="plant-bulk-form"')
+        self.assertContains(response, 'form="plant-bulk-form"', count=5)
+        # As opções de ambiente vêm da busca paginada, não da página
+        self.assertContains(response, f'data-lookup-url="{reverse("cultivation:environment_lookup")}"')
+        self.assertNotContains(response, f'<option value="{self.flower.pk}">')
+        self.post('move', self.plants, environment=self.flower.pk, next=f'{plant_list}?cursor=x')
+        self.assertEqual(self.client.get(plant_list)['X-Fragment-Cache'], 'miss')
+
+    def test_admin_actions_respect_the_target_owner(self):
+        """ Testa as ações do admin: só as plantas do dono do ambiente são movidas. """
+        admin_user = CustomUser.objects.create_superuser(email='admin@test.com', password='password123')
+        self.client.force_login(admin_user)
+        url = reverse('admin:cultivation_plant_changelist')
+        selected = [p.pk for p in self.plants[:2]] + [self.foreign.pk]
+        response = self.client.post(url, {'action': 'move_to_environment', '_selected_action': selected,
+                                          'environment': self.flower.pk})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Plant.objects.filter(environment=self.flower).count(), 2)
+        self.client.post(url, {'action': 'clone', '_selected_action': selected, 'copies': 2})
+        self.assertEqual(Plant.objects.filter(name__contains='(cópia').count(), 6)
+        self.client.post(url, {'action': 'deactivate', '_selected_action': selected})
+        self.assertEqual(Plant.objects.filter(pk__in=selected, is_active=False).count(), 3)
+        response = self.client.post(url, {'action': 'set_stage', '_selected_action': selected}, follow=True)
+        self.assertContains(response, "Escolha o estágio no campo ao lado da ação.")
+
+
+class TestJournal(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.plant = Plant.objects.create(owner=self.user, name='Skunk')
+        self.client.force_login(self.user)
+        self.detail = reverse('cultivation:plant_detail', kwargs={'pk': self.plant.pk})
+        self.start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def add(self, hours, kind=JournalEntry.Kind.NOTE, **fields):
+        return JournalEntry.objects.create(plant=self.plant, kind=kind, note='ok',
+                                           recorded_at=self.start + datetime.timedelta(hours=hours), **fields)
+
+    def test_latest_entry_is_denormalized_on_the_plant(self):
+        """ Testa se a entrada mais recente fica copiada na planta, e uma retroativa não a substitui. """
+        self.add(10, JournalEntry.Kind.WATERING, volume_ml=500)
+        self.add(2, JournalEntry.Kind.MEASUREMENT, height_cm=30)
+        self.plant.refresh_from_db()
+        self.assertEqual(self.plant.last_activity_at, self.start + datetime.timedelta(hours=10))
+        self.assertEqual(self.plant.get_last_entry_kind_display(), 'Rega')
+
+    def test_entries_are_append_only(self):
+        """ Testa se uma entrada gravada não pode ser alterada nem excluída, mas some com a planta. """
+        entry = self.add(1)
+        entry.note = 'editada'
+        with self.assertRaises(JournalEntry.AppendOnly):
+            entry.save()
+        with self.assertRaises(JournalEntry.AppendOnly):
+            entry.delete()
+        self.plant.delete()
+        self.assertFalse(JournalEntry.objects.exists())
+
+    def test_add_view_appends_to_own_plants_only(self):
+        """ Testa o formulário do diário: grava na planta do usuário, recusa entrada vazia e planta alheia. """
+        url = reverse('cultivation:journal_entry_add', kwargs={'pk': self.plant.pk})
+        data = {'kind': 'WATR', 'recorded_at': '2026-01-02T08:30', 'volume_ml': 750}
+        response = self.client.post(url, data)
+        self.assertRedirects(response, self.detail, fetch_redirect_response=False)
+        entry = JournalEntry.objects.get()
+        self.assertEqual((entry.plant, entry.volume_ml), (self.plant, 750))
+
+        response = self.client.post(url, {'kind': 'NOTE', 'recorded_at': '2026-01-02T09:00'})
+        self.assertContains(response, 'Escreva uma anotação ou preencha ao menos uma medida.')
+        foreign = Plant.objects.create(owner=CustomUser.objects.create_user(email='o@test.com', password='x'))
+        url = reverse('cultivation:journal_entry_add', kwargs={'pk': foreign.pk})
+        self.assertEqual(self.client.post(url, data).status_code, 404)
+        self.assertEqual(JournalEntry.objects.count(), 1)
+
+    def test_timeline_is_keyset_paginated_newest_first(self):
+        """ Testa se o diário no detalhe é paginado por cursor, das mais novas para as mais antigas. """
+        JournalEntry.objects.bulk_create([
+            JournalEntry(plant=self.plant, note=f'entrada {i}', recorded_at=self.start + datetime.timedelta(hours=i // 2))
+            for i in range(45)
+        ])
+        seen = []
+        cursor = None
+        costs = []
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.detail, {'cursor': cursor} if cursor else {})
+            costs.append(len(queries))
+            page = response.context['journal_page']
+            seen.extend(entry.pk for entry in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        expected = list(JournalEntry.objects.order_by('-recorded_at', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(costs), 3)
+        self.assertEqual(len(set(costs)), 1)
+        self.assertEqual(self.client.get(self.detail, {'cursor': 'x'}).status_code, 404)
+
+    def test_new_entry_refreshes_cards_and_detail(self):
+        """ Testa se uma entrada nova invalida o cache dos cards e a ETag do detalhe. """
+        plant_list = reverse('cultivation:plant_list')
+        self.client.get(plant_list)
+        etag = self.client.get(self.detail)['ETag']
+        self.add(5, JournalEntry.Kind.FEEDING, ec=1.2)
+        response = self.client.get(plant_list)
+        self.assertEqual(response['X-Fragment-Cache'], 'miss')
+        self.assertContains(response, 'Última atividade: Nutrição em 01/01/2026')
+        self.assertEqual(self.client.get(self.detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@skipUnless(connection.vendor == 'sqlite', "o índice de busca é uma tabela FTS5 do SQLite")
+class TestSearch(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        self.tent = make_environment(self.user, name='Tenda Norte')
+        self.client.force_login(self.user)
+        self.url = reverse('cultivation:plant_search')
+
+    def names(self, query, owner=None):
+        return [plant.name for plant in search.search(owner or self.user, query).plants]
+
+    def test_matches_word_prefixes_without_case_or_accents(self):
+        """ Testa se cada palavra casa pelo começo, sem diferenciar maiúsculas e acentos, em todas as colunas. """
+        Plant.objects.create(owner=self.user, name='Floração #1', strain=make_strain('White Widow'),
+                             environment=self.tent)
+        Plant.objects.create(owner=self.user, name='Muda', strain=make_strain('Skunk'), environment=self.tent)
+        self.assertEqual(self.names('FLORACAO'), ['Floração #1'])
+        self.assertEqual(self.names('wid flor'), ['Floração #1'])
+        self.assertEqual(sorted(self.names('tenda nor')), ['Floração #1', 'Muda'])
+        self.assertEqual(self.names('skunk widow'), [])
+        # Palavras longas passam do maior prefixo indexado e são conferidas inteiras
+        self.assertEqual(self.names('floracaox'), [])
+
+    def test_results_are_scoped_to_the_owner(self):
+        """ Testa se a busca nunca devolve plantas nem anotações de outro usuário. """
+        foreign = Plant.objects.create(owner=self.other, name='Skunk', strain=make_strain('Skunk'))
+        JournalEntry.objects.create(plant=foreign, note='Skunk regada')
+        Plant.objects.create(owner=self.user, name='Skunk', strain=make_strain('Skunk'))
+        result = search.search(self.user, 'skunk')
+        self.assertEqual([plant.owner_id for plant in result.plants], [self.user.pk])
+        self.assertEqual(result.entries, [])
+        self.assertEqual(self.names('skunk', owner=self.other), ['Skunk'])
+
+    def test_name_matches_rank_above_environment_matches(self):
+        """ Testa a ordem por bm25: o nome pesa mais que a variedade, que pesa mais que o ambiente. """
+        by_environment = make_environment(self.user, name='Haze')
+        Plant.objects.create(owner=self.user, name='A', strain=make_strain('Skunk'), environment=by_environment)
+        Plant.objects.create(owner=self.user, name='Haze', strain=make_strain('Skunk'))
+        Plant.objects.create(owner=self.user, name='B', strain=make_strain('Amnesia Haze'))
+        self.assertEqual(self.names('haze'), ['Haze', 'B', 'A'])
+
+    def test_best_match_wins_over_newer_rows(self):
+        """ Testa se o bm25 ordena todas as linhas que casam, não só as mais novas. """
+        Plant.objects.create(owner=self.user, name='Haze', strain=make_strain('Skunk'))
+        by_environment = make_environment(self.user, name='Haze')
+        Plant.objects.bulk_create([
+            Plant(owner=self.user, name=f'Muda {i}', environment=by_environment) for i in range(300)
+        ])
+        names = self.names('haze')
+        self.assertEqual(names[0], 'Haze')
+        self.assertEqual(len(names), search.DEFAULT_LIMIT)
+
+    def test_index_follows_bulk_writes_renames_and_deletes(self):
+        """ Testa se os triggers mantêm o índice em bulk_create, update(), renomeação e exclusões. """
+        skunk = make_strain('Skunk')
+        Plant.objects.bulk_create([Plant(owner=self.user, name=f'Clone {i}', strain=skunk) for i in range(3)])
+        self.assertEqual(len(self.names('clone')), 3)
+        Plant.objects.filter(owner=self.user).update(environment=self.tent)
+        self.assertEqual(len(self.names('norte')), 3)
+        self.tent.name = 'Estufa Sul'
+        self.tent.save()
+        self.assertEqual(self.names('norte'), [])
+        self.assertEqual(len(self.names('sul clone')), 3)
+        self.tent.delete()
+        self.assertEqual(self.names('sul'), [])
+        Plant.objects.filter(name='Clone 0').delete()
+        self.assertEqual(sorted(self.names('clone')), ['Clone 1', 'Clone 2'])
+
+    def test_journal_notes_are_searchable_and_escaped(self):
+        """ Testa se as anotações do diário entram na busca, com as palavras marcadas e o texto escapado. """
+        plant = Plant.objects.create(owner=self.user, name='Skunk')
+        JournalEntry.objects.create(plant=plant, note='Folhas <b>amareladas</b> depois da rega')
+        JournalEntry.objects.create(plant=plant, kind=JournalEntry.Kind.WATERING, volume_ml=500)
+        entry = search.search(self.user, 'amarel').entries[0]
+        self.assertEqual(str(entry.snippet), 'Folhas &lt;b&gt;<mark>amareladas</mark>&lt;/b&gt; depois da rega')
+        plant.delete()
+        self.assertEqual(search.search(self.user, 'amarel').entries, [])
+
+    def test_query_syntax_is_plain_text(self):
+        """ Testa se operadores e aspas do FTS5 digitados pelo usuário não quebram a busca. """
+        Plant.objects.create(owner=self.user, name='Skunk OR Haze')
+        for query in ('skunk OR', '"skunk', 'NEAR(skunk', 'owner:u1', '* ^ -', ''):
+            with self.subTest(query=query):
+                search.search(self.user, query)
+        self.assertEqual(self.names('"skunk" OR'), ['Skunk OR Haze'])
+
+    def test_rebuild_command_restores_the_index_in_chunks(self):
+        """ Testa se o comando refaz o índice em blocos, inclusive removendo linhas órfãs. """
+        Plant.objects.bulk_create([Plant(owner=self.user, name=f'Planta {i}') for i in range(7)])
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {search.PLANT_TABLE}")
+            cursor.execute(f"INSERT INTO {search.PLANT_TABLE}(rowid, owner, name) VALUES (999999, %s, 'Fantasma')",
+                           [f'u{self.user.pk}'])
+        self.assertEqual(self.names('planta'), [])
+        out = io.StringIO()
+        call_command('rebuild_search_index', chunk_size=3, stdout=out)
+        self.assertIn(f'{search.PLANT_TABLE}: 7 linha(s)', out.getvalue())
+        self.assertEqual(len(self.names('planta')), 7)
+        self.assertEqual(self.names('fantasma'), [])
+
+    def test_triggers_are_restored_after_migrate(self):
+        """ Testa se o post_migrate recria os triggers que uma reconstrução de tabela apagaria. """
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER cultivation_plant_search_ai")
+        restore_search_triggers(using='default')
+        Plant.objects.create(owner=self.user, name='Skunk')
+        self.assertEqual(self.names('skunk'), ['Skunk'])
+
+    def test_search_page(self):
+        """ Testa a página de busca: cards das plantas, trechos do diário e o número de consultas. """
+        plant = Plant.objects.create(owner=self.user, name='Skunk', environment=self.tent)
+        JournalEntry.objects.create(plant=plant, note='Primeira rega da skunk')
+        with self.assertNumQueries(6):  # sessão, usuário, índice e objetos das plantas e do diário
+            response = self.client.get(self.url, {'q': 'skunk'})
+        self.assertContains(response, 'Primeira rega da <mark>skunk</mark>')
+        self.assertContains(response, reverse('cultivation:plant_detail', kwargs={'pk': plant.pk}))
+        self.assertContains(self.client.get(self.url, {'q': 'nada'}), 'Nada encontrado')
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, {'q': 'skunk'}).status_code, 302)
+
+
+class TestLightingCatalog(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        lighting_catalog.clear()
+        self.led = Lighting.objects.create(light_type='LED', watts=300)
+        self.hps = Lighting.objects.create(light_type='HPS', watts=600)
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+
+    def test_catalog_loads_once_until_lighting_changes(self):
+        """ Testa se o catálogo só volta ao banco depois que uma luz muda. """
+        with self.assertNumQueries(1):
+            self.assertEqual(lighting_catalog.all(), [self.hps, self.led])
+        with self.assertNumQueries(0):
+            lighting_catalog.all()
+            self.assertEqual(lighting_catalog.watts([self.led.pk, self.hps.pk]), 900)
+        self.led.watts = 400
+        self.led.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(lighting_catalog.get(self.led.pk).watts, 400)
+
+    def test_other_process_version_stamp_invalidates(self):
+        """ Testa se a versão compartilhada no cache invalida o catálogo (como faria outro processo). """
+        lighting_catalog.all()
+        Lighting.objects.filter(pk=self.led.pk).update(watts=1000)  # sem sinais
+        self.assertEqual(lighting_catalog.get(self.led.pk).watts, 300)
+        fragments.bump(fragments.LIGHTING)
+        self.assertEqual(lighting_catalog.get(self.led.pk).watts, 1000)
+
+    def test_environment_form_uses_catalog(self):
+        """ Testa se o formulário de ambiente renderiza e valida as luzes sem consultar o banco. """
+        lighting_catalog.all()
+        data = {'name': 'Tenda', 'height': 100, 'width': 100, 'depth': 100, 'light_exposure_hours': 18,
+                'lighting_system': [self.led.pk]}
+        with self.assertNumQueries(0):
+            form = EnvironmentForm(data)
+            html = str(form['lighting_system'])
+            self.assertTrue(form.is_valid())
+        self.assertIn('LED - 300W', html)
+        self.assertEqual(form.cleaned_data['lighting_system'], [self.led])
+        form.instance.owner = self.user
+        environment = form.save()
+        self.assertEqual(list(environment.lighting_system.all()), [self.led])
+        self.assertFalse(EnvironmentForm({**data, 'lighting_system': [9999]}).is_valid())
+        self.assertFalse(EnvironmentForm({**data, 'lighting_system': ['x']}).is_valid())
+
+    def test_environment_detail_shows_lights_and_total_watts(self):
+        """ Testa se o detalhe do ambiente lista as luzes do catálogo e a potência total. """
+        environment = make_environment(self.user)
+        environment.lighting_system.set([self.led, self.hps])
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('cultivation:environment_detail', kwargs={'pk': environment.pk}))
+        self.assertEqual(response.context['lights'], [self.hps, self.led])
+        self.assertContains(response, 'Potência total: 900W')
+
+
+class TestStrains(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        strain_catalog.clear()
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.widow = make_strain('White Widow')
+        self.maker = make_strain('Widow Maker')
+        self.dream = make_strain('Blue Dream')
+        self.client.force_login(self.user)
+
+    def test_intern_ignores_case_accents_and_spaces(self):
+        """ Testa se nomes que diferem só em maiúsculas, acentos ou espaços viram a mesma variedade. """
+        self.assertEqual(make_strain('  white   WIDOW '), self.widow)
+        basil = make_strain('Manjericão')
+        self.assertEqual(make_strain('manjericao'), basil)
+        self.assertEqual(Strain.objects.count(), 4)
+        self.assertEqual(Strain.objects.get(pk=basil.pk).name, 'Manjericão')
+
+    def test_catalog_completes_word_prefixes_and_reloads_on_change(self):
+        """ Testa o autocompletar: prefixo de qualquer palavra, começo do nome primeiro, e recarga após mudança. """
+        with self.assertNumQueries(1):
+            self.assertEqual(strain_catalog.complete('WID'), [self.maker, self.widow])
+        with self.assertNumQueries(0):
+            self.assertEqual(strain_catalog.complete('dre'), [self.dream])
+            self.assertEqual(strain_catalog.complete('  '), [])
+            self.assertEqual(strain_catalog.complete('widow m'), [self.maker])
+            self.assertEqual(strain_catalog.find('white widow'), self.widow)
+        gelato = make_strain('Gelato')
+        self.assertEqual(strain_catalog.complete('gel'), [gelato])
+
+    def test_catalog_version_is_checked_once_per_list_export_and_import(self):
+        """ Testa se a lista, a exportação e a importação conferem a versão das variedades uma vez, não por planta. """
+        strains = [self.widow, self.maker, self.dream]
+        Plant.objects.bulk_create([
+            Plant(owner=self.user, name=f'Planta {i}', strain=strains[i % 3]) for i in range(30)
+        ])
+        rows = [(i + 2, {'name': f'Importada {i}', 'strain': strains[i % 3].name, 'germination_date': '2026-01-01'})
+                for i in range(30)]
+
+        def strain_checks(run):
+            with mock.patch.object(fragments, 'get_versions', wraps=fragments.get_versions) as get_versions:
+                run()
+            return sum(1 for call in get_versions.call_args_list if call.args[1] == (fragments.STRAIN,))
+
+        self.assertEqual(strain_checks(lambda: self.client.get(reverse('cultivation:plant_list'))), 1)
+        self.assertEqual(strain_checks(
+            lambda: b''.join(self.client.get(reverse('cultivation:plant_export')).streaming_content)
+        ), 1)
+        self.assertEqual(strain_checks(lambda: imports.import_plants(rows, self.user)), 1)
+        self.assertEqual(Plant.objects.filter(name__startswith='Importada', strain=self.widow).count(), 10)
+
+    def test_admin_rejects_a_name_with_an_existing_key(self):
+        """ Testa se o admin mostra um erro no formulário, e não um 500, para um nome que já existe com outra grafia. """
+        self.client.force_login(CustomUser.objects.create_superuser(email='admin@test.com', password='password123'))
+        response = self.client.post(reverse('admin:cultivation_strain_add'), {'name': ' white  WÍDOW '})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Já existe a variedade &quot;White Widow&quot; com esse nome.')
+        response = self.client.post(reverse('admin:cultivation_strain_change', args=[self.maker.pk]),
+                                    {'name': 'blue dream'})
+        self.assertEqual(response.status_code, 200)
+        # Renomear a própria variedade (só a grafia) continua permitido
+        response = self.client.post(reverse('admin:cultivation_strain_change', args=[self.maker.pk]),
+                                    {'name': 'WIDOW MAKER'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Strain.objects.count(), 3)
+
+    def test_catalog_miss_reads_the_strain_from_the_database(self):
+        """ Testa uma variedade criada em outro processo, cuja versão este processo ainda não viu. """
+        strain_catalog.all()
+        # bulk_create não dispara o sinal que incrementa a versão do catálogo
+        runtz, = Strain.objects.bulk_create([Strain(name='Runtz', key='runtz')])
+        plant = Plant.objects.create(owner=self.user, name='Nova', strain=runtz)
+        with self.assertNumQueries(1):
+            self.assertEqual(plant.strain_name, 'Runtz')
+        # O catálogo se recarrega uma vez e passa a ter a variedade
+        self.assertEqual(strain_catalog.find('runtz'), runtz)
+        with self.assertNumQueries(0):
+            self.assertEqual(plant.strain_name, 'Runtz')
+
+    def test_autocomplete_endpoint(self):
+        """ Testa o JSON de sugestões e o login obrigatório. """
+        url = reverse('cultivation:strain_autocomplete')
+        Plant.objects.create(owner=self.user, name='Planta', strain=self.dream)
+        response = self.client.get(url, {'q': 'blue'})
+        self.assertEqual(response.json(), {'results': [{'id': self.dream.pk, 'name': 'Blue Dream'}]})
+        self.assertEqual(self.client.get(url).json(), {'results': []})
+        self.client.logout()
+        self.assertEqual(self.client.get(url, {'q': 'blue'}).status_code, 302)
+
+    def test_autocomplete_only_suggests_the_users_own_strains(self):
+        """ Testa se um nome digitado por um usuário não aparece nas sugestões de outro. """
+        ana = CustomUser.objects.create_user(email='ana@test.com', password='password123')
+        Plant.objects.create(owner=ana, name='Planta', strain=make_strain('Segredo da Ana'))
+        url = reverse('cultivation:strain_autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'segr'}).json(), {'results': []})
+        # Passa a aparecer quando o próprio usuário tem uma planta dessa variedade
+        mine = Plant.objects.create(owner=self.user, name='Minha', strain=Strain.objects.intern('segredo da ana'))
+        self.assertEqual([row['name'] for row in self.client.get(url, {'q': 'segr'}).json()['results']],
+                         ['Segredo da Ana'])
+        mine.delete()
+        self.assertEqual(self.client.get(url, {'q': 'segr'}).json(), {'results': []})
+        self.client.force_login(ana)
+        self.assertEqual(len(self.client.get(url, {'q': 'segr'}).json()['results']), 1)
+
+    def test_plant_form_reuses_known_names_and_interns_new_ones(self):
+        """ Testa o campo do formulário: nome conhecido vira o pk existente, nome novo entra no catálogo. """
+        data = {'name': 'Planta', 'strain': ' white  widow ', 'germination_date': '2026-01-01'}
+        form = PlantForm(data, user=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.instance.owner = self.user
+        plant = form.save()
+        self.assertEqual(plant.strain_id, self.widow.pk)
+        self.assertIn('value="White Widow"', str(PlantForm(instance=plant, user=self.user)['strain']))
+
+        form = PlantForm({**data, 'strain': 'Gelato'}, instance=plant, user=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().strain.name, 'Gelato')
+        self.assertEqual(Strain.objects.filter(name='Gelato').count(), 1)
+
+        form = PlantForm({**data, 'strain': ''}, instance=plant, user=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().strain_name, 'Variedade Desconhecida')
+
+    def test_rename_reaches_cards_and_search(self):
+        """ Testa se renomear a variedade muda o nome nos cards e no índice de busca. """
+        Plant.objects.create(owner=self.user, name='Planta', strain=self.dream)
+        self.assertContains(self.client.get(reverse('cultivation:plant_list')), 'Blue Dream')
+        self.dream.name = 'Blueberry Dream'
+        self.dream.save()
+        self.assertContains(self.client.get(reverse('cultivation:plant_list')), 'Blueberry Dream')
+        if search.is_supported():
+            self.assertEqual([plant.name for plant in search.search(self.user, 'blueberry').plants], ['Planta'])
+
+    def test_import_interns_each_new_name_once(self):
+        """ Testa se a importação cria cada variedade nova uma vez só, sem duplicar as grafias. """
+        data = 'nome;variedade;data_germinacao\nA;Gelato;2026-01-01\nB;GELATO;2026-01-01\nC;;2026-01-01'
+        result = imports.import_plants(imports.open_csv(io.BytesIO(data.encode())), self.user)
+        self.assertEqual(result.created, 3)
+        self.assertEqual(Strain.objects.filter(key='gelato').count(), 1)
+        strains = dict(Plant.objects.values_list('name', 'strain__name'))
+        self.assertEqual(strains, {'A': 'Gelato', 'B': 'Gelato', 'C': None})
+
+    def test_unknown_strain_round_trips_as_no_strain(self):
+        """ Testa se uma planta sem variedade sai com a célula vazia e "Variedade Desconhecida" não vira variedade. """
+        Plant.objects.create(owner=self.user, name='Sem variedade', germination_date=datetime.date(2026, 1, 1))
+        exported = b''.join(self.client.get(reverse('cultivation:plant_export')).streaming_content).decode('utf-8-sig')
+        self.assertIn('Sem variedade;;2026-01-01', exported)
+        # Arquivos exportados antes da correção trazem o texto
+        data = 'nome;variedade;data_germinacao\nAntiga;variedade  desconhecida;2026-01-01'
+        result = imports.import_plants(imports.open_csv(io.BytesIO(data.encode())), self.user)
+        self.assertEqual(result.created, 1)
+        self.assertIsNone(Plant.objects.get(name='Antiga').strain_id)
+        form = PlantForm({'name': 'Planta', 'strain': 'Variedade Desconhecida', 'germination_date': '2026-01-01'},
+                         user=self.user)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertIsNone(form.cleaned_data['strain'])
+        self.assertFalse(Strain.objects.filter(key=strain_key('Variedade Desconhecida')).exists())
+
+
+class TestChoiceLookups(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        self.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        Environment.objects.bulk_create([
+            Environment(owner=self.user, name=f'Tenda {i:03d}', height=200, width=100, depth=100) for i in range(45)
+        ])
+        self.foreign = make_environment(self.other, name='Tenda Alheia')
+        self.stage = Stage.objects.create(owner=self.user, name='Floração', duration=8)
+        self.url = reverse('cultivation:environment_lookup')
+        self.client.force_login(self.user)
+
+    def test_lookup_pages_through_owner_environments_by_name(self):
+        """ Testa a busca paginada: só os ambientes do usuário, filtrados pelo nome e na ordem do nome. """
+        names, params = [], {}
+        while True:
+            data = self.client.get(self.url, params).json()
+            names.extend(row['name'] for row in data['results'])
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        self.assertEqual(names, [f'Tenda {i:03d}' for i in range(45)])
+        data = self.client.get(self.url, {'q': 'da 04'}).json()
+        self.assertEqual([row['name'] for row in data['results']], [f'Tenda 04{i}' for i in range(5)])
+        self.assertEqual(self.client.get(self.url, {'q': 'alheia'}).json(), {'results': [], 'next': None})
+        response = self.client.get(reverse('cultivation:stage_lookup'), {'q': 'flor'})
+        self.assertEqual(response.json()['results'], [{'id': self.stage.pk, 'name': 'Floração'}])
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'}).status_code, 400)
+
+    def test_plant_form_renders_only_the_chosen_options(self):
+        """ Testa se o formulário renderiza só a opção escolhida, buscada pelo pk, e não a lista inteira. """
+        environment = Environment.objects.get(owner=self.user, name='Tenda 007')
+        plant = Plant.objects.create(owner=self.user, name='Planta', environment=environment, stage=self.stage)
+        form = PlantForm(instance=plant, user=self.user)
+        with self.assertNumQueries(1):
+            html = str(form['environment'])
+        self.assertEqual(html.count('<option'), 2)  # a vazia e a escolhida
+        self.assertIn(f'<option value="{environment.pk}" selected>Tenda 007</option>', html)
+        self.assertIn(f'data-lookup-url="{self.url}"', html)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(PlantForm(user=self.user)['stage']).count('<option'), 1)
+
+    def test_plant_form_validates_the_choice_with_one_lookup(self):
+        """ Testa se o POST valida o ambiente com uma consulta pelo pk, recusando o de outro usuário. """
+        environment = Environment.objects.get(owner=self.user, name='Tenda 010')
+        data = {'name': 'Planta', 'strain': '', 'germination_date': '2026-01-01', 'stage': self.stage.pk}
+        form = PlantForm({**data, 'environment': environment.pk}, user=self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(form.fields['environment'].clean(str(environment.pk)), environment)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['environment'], environment)
+        form = PlantForm({**data, 'environment': self.foreign.pk}, user=self.user)
+        self.assertFalse(form.is_valid())
+        self.assertIn('environment', form.errors)
+
+
+class TestApi(RouteBudgetMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        cls.other = CustomUser.objects.create_user(email='other@test.com', password='password123')
+        cls.environment = make_environment(cls.user)
+        cls.stage = Stage.objects.create(owner=cls.user, name='Vegetativo', duration=4)
+        cls.strain = make_strain('Skunk #1')
+        day = datetime.date(2026, 1, 1)
+        Plant.objects.bulk_create([
+            Plant(owner=cls.user, environment=cls.environment, stage=cls.stage, name=f'Planta {i}',
+                  strain=cls.strain if i % 2 else None, germination_date=day - datetime.timedelta(days=i % 7))
+            for i in range(250)
+        ])
+        cls.secret = make_strain('Segredo da Ana')
+        cls.foreign_plant = Plant.objects.create(owner=cls.other, name='Alheia', strain=cls.secret)
+        cls.light = Lighting.objects.create(light_type='LED', watts=300)
+
+    def setUp(self):
+        cache.clear()
+        lighting_catalog.clear()
+        strain_catalog.clear()
+        self.client.force_login(self.user)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, json.loads(body)
+
+    def test_lists_stream_under_asgi(self):
+        """ Testa se sob ASGI a lista é transmitida de forma assíncrona, com o mesmo JSON. """
+        async def read(url):
+            response = await self.async_client.get(url, {'limit': 50})
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        self.async_client.force_login(self.user)
+        response, body = async_to_sync(read)(reverse('api:plant_list'))
+        self.assertTrue(response.is_async)
+        self.assertEqual(json.loads(body), self.get_json(reverse('api:plant_list'), limit=50)[1])
+
+    def test_requires_authentication(self):
+        """ Testa se a API responde 401 em JSON para quem não está logado. """
+        self.client.logout()
+        response = self.client.get(reverse('api:plant_list'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('detail', response.json())
+
+    def test_cursor_pages_cover_only_owner_plants(self):
+        """ Testa se os cursores percorrem todas as plantas do usuário, e só elas. """
+        seen = []
+        params = {'limit': 100}
+        while True:
+            response, data = self.get_json(reverse('api:plant_list'), **params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in data['results'])
+            if not data['next']:
+                break
+            params['cursor'] = data['next']
+        expected = list(Plant.objects.filter(owner=self.user).order_by('-germination_date', 'name', 'pk')
+                        .values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertNotIn(self.foreign_plant.pk, seen)
+
+    def test_sparse_fields_select_only_requested_columns(self):
+        """ Testa se ?fields= limita as colunas do SELECT e as chaves da resposta. """
+        with CaptureQueriesContext(connection) as queries:
+            response, data = self.get_json(reverse('api:plant_list'), fields='name,stage_id', limit=5)
+        self.assertEqual(set(data['results'][0]), {'name', 'stage_id'})
+        select = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"strain_id"', select)
+        self.assertNotIn('"created_at"', select)
+        response, data = self.get_json(reverse('api:plant_list'), fields='password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_detail_is_owner_scoped(self):
+        """ Testa o detalhe de uma planta e o 404 para a planta de outro usuário. """
+        plant = Plant.objects.filter(owner=self.user).first()
+        response, data = self.get_json(reverse('api:plant_detail', kwargs={'pk': plant.pk}), fields='id,name')
+        self.assertEqual(data, {'id': plant.pk, 'name': plant.name})
+        response = self.client.get(reverse('api:plant_detail', kwargs={'pk': self.foreign_plant.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_etag_answers_304_without_queries_until_data_changes(self):
+        """ Testa o If-None-Match: 304 sem consultar as plantas, e ETag nova depois de uma alteração. """
+        url = reverse('api:plant_list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2):  # só sessão e usuário
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.stage.delete()  # zera stage_id das plantas sem post_save nelas
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalid_cursor_and_limit(self):
+        """ Testa as respostas 400 para cursor e limit inválidos. """
+        self.assertEqual(self.client.get(reverse('api:plant_list'), {'cursor': 'bm9wZQ'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api:plant_list'), {'limit': 0}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api:plant_list'), {'limit': 'x'}).status_code, 400)
+
+    def test_lighting_catalog_and_other_resources(self):
+        """ Testa as listas de luzes e variedades (da memória), ambientes e estágios. """
+        response, data = self.get_json(reverse('api:lighting_list'))
+        self.assertEqual(data['results'], [{'id': self.light.pk, 'light_type': 'LED', 'watts': 300, 'label': 'LED - 300W'}])
+        response, data = self.get_json(reverse('api:strain_list'))
+        # Só as variedades das plantas do usuário: os nomes digitados pelos outros não aparecem
+        self.assertEqual(data['results'], [{'id': self.strain.pk, 'name': 'Skunk #1'}])
+        self.assertEqual(self.client.get(reverse('api:strain_detail', kwargs={'pk': 9999})).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api:strain_detail', kwargs={'pk': self.secret.pk})).status_code, 404)
+        response, data = self.get_json(reverse('api:environment_list'), fields='id,name')
+        self.assertEqual(data['results'], [{'id': self.environment.pk, 'name': 'Estufa'}])
+        response, data = self.get_json(reverse('api:stage_list'), fields='name')
+        self.assertEqual(data['results'], [{'name': 'Vegetativo'}])
+
+    def test_routes_stay_within_query_and_time_budget(self):
+        """ Testa o número de consultas e o tempo de resposta de cada rota da API. """
+        plant = Plant.objects.filter(owner=self.user).first()
+        budgets = {
+            'api:plant_list': (3, {}),          # sessão, usuário e a página
+            'api:plant_detail': (3, {'pk': plant.pk}),
+            'api:environment_list': (3, {}),
+            'api:environment_detail': (3, {'pk': self.environment.pk}),
+            'api:stage_list': (3, {}),
+            'api:stage_detail': (3, {'pk': self.stage.pk}),
+            'api:lighting_list': (2, {}),       # catálogo em memória
+            'api:lighting_detail': (2, {'pk': self.light.pk}),
+            'api:strain_list': (2, {}),         # catálogo em memória
+            'api:strain_detail': (2, {'pk': self.strain.pk}),
+        }
+        self.assertEqual(set(budgets), route_names(api_urls.urlpatterns, api_urls.app_name))
+        for name, (queries, kwargs) in budgets.items():
+            with self.subTest(route=name):
+                self.assertRouteWithinBudget(name, reverse(name, kwargs=kwargs), queries)
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN é específico do SQLite")
+class TestQueryPlans(TestCase):
+    """
+    Cada consulta das páginas mais acessadas precisa usar um índice: nenhuma
+    varredura completa de tabela e, nas listas, nenhuma ordenação em memória.
+    """
+    # Linha de plano sem índice: "SCAN tabela" (com índice seria "SCAN tabela USING ... INDEX")
+    FULL_SCAN = re.compile(r'^SCAN \S+$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='grower@test.com', password='password123')
+        cls.environment = make_environment(cls.user)
+        cls.stage = Stage.objects.create(owner=cls.user, name='Vegetativo', duration=4)
+        day = datetime.date(2026, 1, 1)
+        Plant.objects.bulk_create([
+            Plant(owner=cls.user, environment=cls.environment if i % 3 else None, stage=cls.stage,
+                  name=f'Planta {i}', germination_date=day - datetime.timedelta(days=i % 9), is_active=i % 4 > 0)
+            for i in range(200)
+        ])
+        cls.plant = Plant.objects.filter(owner=cls.user).first()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def capture_selects(self, url):
+        selects = []
+
+        def wrapper(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                selects.append((sql, params))
+            return execute(sql, params, many, context)
+
+        # Sem o cache de fragmentos, para que as listas executem a consulta da página
+        cache.clear()
+        with connection.execute_wrapper(wrapper):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return selects
+
+    def assertUsesIndexes(self, sql, params, allow_sort=False):
+        plan = self.plan(sql, params)
+        scans = [line for line in plan if self.FULL_SCAN.match(line)]
+        self.assertFalse(scans, f"Varredura completa em {scans}:\n{sql}")
+        if not allow_sort:
+            self.assertFalse(
+                [line for line in plan if 'TEMP B-TREE' in line], f"Ordenação em memória:\n{plan}\n{sql}"
+            )
+
+    def test_list_pages_read_in_index_order(self):
+        """ Testa se as listas (inclusive páginas seguintes do cursor) usam índice para filtrar e ordenar. """
+        plant_list = reverse('cultivation:plant_list')
+        cursor = self.client.get(plant_list).context['page_obj'].next_cursor
+        urls = [
+            plant_list, f'{plant_list}?cursor={cursor}',
+            reverse('cultivation:environment_list'), reverse('cultivation:stage_list'),
+        ]
+        for url in urls:
+            for sql, params in self.capture_selects(url):
+                with self.subTest(url=url, sql=sql[:80]):
+                    self.assertUsesIndexes(sql, params)
+
+    def test_detail_pages_use_indexes(self):
+        """ Testa as consultas das páginas de detalhe (a ordenação das poucas luzes de um ambiente é tolerada). """
+        urls = [
+            reverse('cultivation:environment_detail', kwargs={'pk': self.environment.pk}),
+            reverse('cultivation:plant_detail', kwargs={'pk': self.plant.pk}),
+        ]
+        for url in urls:
+            for sql, params in self.capture_selects(url):
+                with self.subTest(url=url, sql=sql[:80]):
+                    self.assertUsesIndexes(sql, params, allow_sort=True)
+
+    def test_owner_scoped_filters_use_composite_indexes(self):
+        """ Testa se os filtros por ambiente e por situação usam os índices compostos do proprietário. """
+        cases = [
+            ('plant_owner_germination_idx', Plant.objects.filter(owner=self.user)),
+            ('plant_owner_env_list_idx',
+             Plant.objects.filter(owner=self.user, environment=self.environment).order_by()),
+            # Contagem de plantas por ambiente
+            ('plant_owner_env_list_idx',
+             Plant.objects.filter(owner=self.user).values('environment').annotate(total=Count('pk')).order_by()),
+            # is_active=False vira "NOT is_active", que não é igualdade indexável: sem ela o planner
+            # escolhe à vontade entre os índices que começam pelo owner
+            ('plant_owner_active_idx', Plant.objects.filter(owner=self.user, is_active__in=[False]).order_by()),
+            ('environment_owner_active_idx', Environment.objects.filter(owner=self.user, is_active=True)),
+            # Variedades usadas pelo usuário (StrainCatalog.used_by), sem ordenar em memória para o DISTINCT
+            ('plant_owner_strain_idx',
+             Plant.objects.filter(owner=self.user, strain__isnull=False)
+             .order_by().values_list('strain_id', flat=True).distinct()),
+        ]
+        for index, queryset in cases:
+            with self.subTest(index=index):
+                sql, params = queryset.query.sql_with_params()
+                self.assertIn(index, ' '.join(self.plan(sql, params)))
+                self.assertUsesIndexes(sql, params)
+
+    def test_choice_lookups_read_in_index_order(self):
+        """ Testa se a busca de ambientes e estágios (inclusive com cursor) segue o índice (owner, name). """
+        Environment.objects.bulk_create([
+            Environment(owner=self.user, name=f'Tenda {i}', height=200, width=100, depth=100) for i in range(30)
+        ])
+        for name in ('cultivation:environment_lookup', 'cultivation:stage_lookup'):
+            url = reverse(name)
+            cursor = self.client.get(url).json()['next']
+            for params in ({}, {'q': 'tenda'}, {'cursor': cursor} if cursor else {}):
+                with self.subTest(url=url, params=params):
+                    with CaptureQueriesContext(connection) as queries:
+                        self.client.get(url, params)
+                    sql = queries[-1]['sql']
+                    self.assertUsesIndexes(sql, ())
+
+    def test_journal_timeline_reads_in_index_order(self):
+        """ Testa se as páginas do diário (inclusive com cursor) saem do índice, sem ordenação em memória. """
+        start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        JournalEntry.objects.bulk_create([
+            JournalEntry(plant=self.plant, note='ok', recorded_at=start + datetime.timedelta(hours=i % 50))
+            for i in range(200)
+        ])
+        page = paginate_keyset(self.plant.journal_entries.all(), ('-recorded_at', '-pk'), None, 20)
+        for cursor in (None, page.next_cursor):
+            with CaptureQueriesContext(connection) as queries:
+                paginate_keyset(self.plant.journal_entries.all(), ('-recorded_at', '-pk'), cursor, 20)
+            sql = queries[0]['sql']
+            self.assertIn('journal_plant_timeline_idx', ' '.join(self.plan(sql, ())))
+            self.assertUsesIndexes(sql, ())
+
+    def test_search_loads_results_by_primary_key(self):
+        """ Testa se as plantas achadas pela busca são lidas pela chave primária, não pelo índice do dono. """
+        url = reverse('cultivation:plant_search') + '?q=planta'
+        selects = [(sql, params) for sql, params in self.capture_selects(url) if 'cultivation_plant"."id" IN' in sql]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('INTEGER PRIMARY KEY', ' '.join(self.plan(*selects[0])))
+        self.assertUsesIndexes(*selects[0])
+
+    def test_conditional_get_validator_is_an_index_seek(self):
+        """ Testa se o max(updated_at) do GET condicional é lido só do índice (owner, updated_at). """
+        with CaptureQueriesContext(connection) as queries:
+            Plant.objects.filter(owner=self.user).aggregate(Max('updated_at'))
+        plan = ' '.join(self.plan(queries[0]['sql'], ()))
+        self.assertIn('COVERING INDEX plant_owner_updated_idx', plan)
+
+
+class TestSqliteProductionProfile(SimpleTestCase):
+    # A conexão testada é criada à parte, num arquivo temporário
+    databases = {'default'}
+
+    def test_production_connection_applies_pragmas_and_immediate_transactions(self):
+        """ Testa se o perfil de produção liga WAL, os PRAGMAs e BEGIN IMMEDIATE no backend do Django. """
+        with tempfile.TemporaryDirectory() as directory:
+            handler = ConnectionHandler({'default': production_database(os.path.join(directory, 'prod.sqlite3'))})
+            production = handler['default']
+            try:
+                with production.cursor() as cursor:
+                    values = {}
+                    for pragma in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size'):
+                        cursor.execute(f'PRAGMA {pragma}')
+                        values[pragma] = cursor.fetchone()[0]
+                self.assertEqual(values['journal_mode'], 'wal')
+                self.assertEqual(values['synchronous'], 1)  # NORMAL
+                self.assertEqual(values['busy_timeout'], 5000)
+                # O timeout do connect() é a mesma espera, em segundos
+                self.assertEqual(production.settings_dict['OPTIONS']['timeout'] * 1000, values['busy_timeout'])
+                self.assertEqual(values['cache_size'], -64000)
+                self.assertGreater(values['mmap_size'], 0)
+                self.assertEqual(production.transaction_mode, 'IMMEDIATE')
+                self.assertIsNone(production.settings_dict['CONN_MAX_AGE'])
+            finally:
+                production.close()
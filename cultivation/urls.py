@@ -16,6 +16,8 @@ urlpatterns = [
     path('<int:pk>/edit/', views.EnvironmentUpdateView.as_view(), name='environment_edit'),
     # DELETE: Página para confirmar a exclusão de um ambiente
     path('<int:pk>/delete/', views.EnvironmentDeleteView.as_view(), name='environment_delete'),
+    # Exportação dos ambientes em CSV
+    path('export.csv', views.EnvironmentExportView.as_view(), name='environment_export'),
 
     # Lista de Fontes de Luz disponíveis (catálogo)
     path('lighting/', views.LightingListView.as_view(), name='lighting_list'),
@@ -29,9 +31,22 @@ urlpatterns = [
     # --- NOVAS URLs PARA PLANT (PLANTAS) ---
     path('plants/', views.PlantListView.as_view(), name='plant_list'),
     path('plants/<int:pk>/', views.PlantDetailView.as_view(), name='plant_detail'),
+    # Busca nas plantas (nome, variedade, ambiente) e nas anotações do diário
+    path('plants/search/', views.PlantSearchView.as_view(), name='plant_search'),
+    # Busca paginada (JSON) de ambientes e estágios para os campos de escolha do formulário de planta
+    path('lookup/environments/', views.EnvironmentLookupView.as_view(), name='environment_lookup'),
+    path('lookup/stages/', views.StageLookupView.as_view(), name='stage_lookup'),
+    # Sugestões de variedades (JSON) para o formulário de planta
+    path('strains/autocomplete/', views.StrainAutocompleteView.as_view(), name='strain_autocomplete'),
     path('plants/add/', views.PlantCreateView.as_view(), name='plant_add'),
+    path('plants/import/', views.PlantImportView.as_view(), name='plant_import'),
+    # Ações em massa nas plantas marcadas na lista
+    path('plants/bulk/', views.PlantBulkView.as_view(), name='plant_bulk'),
     path('plants/<int:pk>/edit/', views.PlantUpdateView.as_view(), name='plant_edit'),
     path('plants/<int:pk>/delete/', views.PlantDeleteView.as_view(), name='plant_delete'),
+    # Diário da planta: só acrescenta entradas (a leitura fica no detalhe da planta)
+    path('plants/<int:pk>/journal/add/', views.JournalEntryCreateView.as_view(), name='journal_entry_add'),
+    path('plants/export.csv', views.PlantExportView.as_view(), name='plant_export'),
 
     # --- NOVAS URLs PARA STAGE (ESTÁGIOS) ---
     path('stages/', views.StageListView.as_view(), name='stage_list'),
@@ -39,4 +54,7 @@ urlpatterns = [
     path('stages/<int:pk>/edit/', views.StageUpdateView.as_view(), name='stage_edit'),
     path('stages/<int:pk>/delete/', views.StageDeleteView.as_view(), name='stage_delete'),
 
+    # --- TELEMETRIA (LEITURAS DE SENSORES) ---
+    path('telemetry/ingest/', views.TelemetryIngestView.as_view(), name='telemetry_ingest'),
+
 ]
\ No newline at end of file
@@ -1,33 +1,91 @@
-from django.shortcuts import render, get_object_or_404
-from django.urls import reverse_lazy
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+import csv
+import datetime
+
+from django.shortcuts import redirect, render, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse, reverse_lazy
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.utils.safestring import mark_safe
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView, TemplateView
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db.models import Max
 
-from .models import Environment, Lighting, Plant, Stage
-from .forms import EnvironmentForm, LightingForm, PlantForm, StageForm
+from .models import Environment, JournalEntry, Lighting, Plant, SensorReading, Stage
+from .forms import (
+    EnvironmentForm, JournalEntryForm, LightingForm, PlantBulkForm, PlantForm, PlantImportForm, StageForm,
+)
+from . import cache, events, exports, imports, rollups, search, telemetry
+from .catalog import lighting as lighting_catalog, strains as strain_catalog
+from .mixins import ConditionalGetMixin, FragmentCachedListMixin, OwnerScopedObjectMixin
+from .pagination import InvalidCursor, KeysetPaginationMixin, paginate_keyset
+from .streaming import streaming_response
 
 
 # --- Views para Environments (Ambientes) ---
 
-class EnvironmentListView(LoginRequiredMixin, ListView):
+class EnvironmentListView(LoginRequiredMixin, FragmentCachedListMixin, KeysetPaginationMixin, ListView):
     model = Environment
     template_name = 'cultivation/environment_list.html'
     context_object_name = 'environments'
+    paginate_by = 30
+    fragment_name = 'environment_cards'
+    fragment_template = 'cultivation/includes/environment_cards.html'
+    fragment_scopes = ('environment',)
 
     def get_queryset(self):
         # Filtra os ambientes para mostrar apenas os do usuário logado
         return Environment.objects.filter(owner=self.request.user)
 
 
-class EnvironmentDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class EnvironmentDetailView(LoginRequiredMixin, OwnerScopedObjectMixin, DetailView):
     model = Environment
     template_name = 'cultivation/environment_detail.html'
+    # Janelas (em dias) oferecidas no painel de telemetria
+    telemetry_windows = (1, 7, 30, 365)
 
-    def test_func(self):
-        # Garante que o usuário só pode ver detalhes dos seus próprios ambientes
-        environment = self.get_object()
-        return self.request.user == environment.owner
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(environment_detail_context(self.object, self.request.GET.get('days')))
+        return context
+
+
+def environment_detail_context(environment, days, windows=EnvironmentDetailView.telemetry_windows):
+    """Luzes e painel de telemetria do detalhe do ambiente (compartilhado com async_views)."""
+    # Só os ids das luzes saem do banco; nomes e potências vêm do catálogo em memória
+    lights = lighting_catalog.for_environment(environment)
+    try:
+        days = int(days or 7)
+    except ValueError:
+        days = 7
+    if days not in windows:
+        days = 7
+
+    # Os gráficos leem os agregados (no máximo algumas centenas de linhas), nunca as leituras brutas
+    end = timezone.now()
+    resolution, points = rollups.series(environment, end - datetime.timedelta(days=days), end)
+    return {
+        'lights': lights,
+        'total_watts': lighting_catalog.watts(light.pk for light in lights),
+        'telemetry_days': days,
+        'telemetry_windows': windows,
+        'telemetry_resolution': resolution,
+        'telemetry_summary': [
+            (label, rollups.summarize(points[metric]))
+            for metric, label in SensorReading.Metric.choices
+        ],
+        'telemetry_series': {
+            metric: [[point.bucket_start.isoformat(), point.minimum, point.mean, point.maximum]
+                     for point in metric_points]
+            for metric, metric_points in points.items()
+        },
+    }
 
 
 class EnvironmentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
@@ -54,16 +112,16 @@ class EnvironmentCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView)
         return context
 
 
-class EnvironmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, UpdateView):
+class EnvironmentUpdateView(LoginRequiredMixin, OwnerScopedObjectMixin, SuccessMessageMixin, UpdateView):
     model = Environment
     form_class = EnvironmentForm
     template_name = 'cultivation/environment_form.html'
     success_url = reverse_lazy('cultivation:environment_list')
     success_message = "Ambiente '%(name)s' atualizado com sucesso!"
 
-    def test_func(self):
-        environment = self.get_object()
-        return self.request.user == environment.owner
+    def get_queryset(self):
+        # O formulário marca as luzes atuais do ambiente
+        return super().get_queryset().prefetch_related('lighting_system')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -71,16 +129,12 @@ class EnvironmentUpdateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMess
         return context
 
 
-class EnvironmentDeleteView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, DeleteView):
+class EnvironmentDeleteView(LoginRequiredMixin, OwnerScopedObjectMixin, SuccessMessageMixin, DeleteView):
     model = Environment
     template_name = 'cultivation/environment_confirm_delete.html'
     success_url = reverse_lazy('cultivation:environment_list')
     success_message = "Ambiente excluído com sucesso!"
 
-    def test_func(self):
-        environment = self.get_object()
-        return self.request.user == environment.owner
-
 
 # --- View para Lighting (Fontes de Luz) ---
 
@@ -89,10 +143,9 @@ class LightingListView(LoginRequiredMixin, ListView):
     template_name = 'cultivation/lighting_list.html'
     context_object_name = 'lights'
 
-class LightingListView(LoginRequiredMixin, ListView):
-    model = Lighting
-    template_name = 'cultivation/lighting_list.html'
-    context_object_name = 'lights'
+    def get_queryset(self):
+        # A lista vem do catálogo em memória, sem consultar o banco
+        return lighting_catalog.all()
 
 class LightingCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     model = Lighting
@@ -115,57 +168,149 @@ class LightingDeleteView(LoginRequiredMixin, SuccessMessageMixin, DeleteView):
     success_message = "Fonte de luz excluída com sucesso!"
 
 
-class PlantListView(LoginRequiredMixin, ListView):
+class PlantListView(LoginRequiredMixin, ConditionalGetMixin, FragmentCachedListMixin, KeysetPaginationMixin, ListView):
     model = Plant
     template_name = 'cultivation/plant_list.html'
     context_object_name = 'plants'
+    paginate_by = 60
+    # Os cards mostram o nome do ambiente, do estágio e da variedade de cada planta
+    fragment_name = 'plant_cards'
+    fragment_template = 'cultivation/includes/plant_cards.html'
+    fragment_scopes = ('plant', 'environment', 'stage', cache.STRAIN)
+    # Agrupada por ambiente (mais novos primeiro, plantas sem ambiente no fim) e, dentro de
+    # cada ambiente, na ordem de Plant.Meta.ordering; o pk desempata o cursor.
+    # É a ordem do índice plant_owner_env_list_idx, e o template só precisa de um
+    # {% regroup %} sobre a página para montar os cards de cada ambiente.
+    keyset_ordering = ('-environment_id', '-germination_date', 'name', 'pk')
+
+    def get_validator_parts(self):
+        # Uma busca no índice plant_owner_updated_idx
+        return (Plant.objects.filter(owner=self.request.user).aggregate(last=Max('updated_at'))['last'],)
+
+    def get_fragment_key_parts(self):
+        # Os cards mostram a idade das plantas, que muda à meia-noite
+        return (datetime.date.today(),)
 
     def get_queryset(self):
-        # Busca todas as plantas do usuário de uma só vez, otimizando a consulta
-        return Plant.objects.filter(owner=self.request.user).select_related('environment')
+        # Cada página é uma única consulta limitada, já trazendo o ambiente e o estágio
+        # de cada planta (o card mostra plant.stage.name) e a idade calculada pelo banco
+        return (
+            Plant.objects.filter(owner=self.request.user)
+            .select_related('environment', 'stage')
+            .with_age()
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        all_plants = context['plants']
+        context['bulk_form_html'] = self.get_bulk_form_html()
+        return context
 
-        # --- LÓGICA DE AGRUPAMENTO ATUALIZADA ---
+    def get_bulk_form_html(self):
+        return plant_bulk_form_html(self.request.user)
 
-        # Dicionário para plantas COM ambiente
-        plants_by_environment = {}
-        # Lista para plantas SEM ambiente
-        plants_without_environment = []
 
-        for plant in all_plants:
-            if plant.environment:
-                # Se o ambiente desta planta ainda não é uma chave no dicionário,
-                # crie a chave com uma lista vazia.
-                if plant.environment not in plants_by_environment:
-                    plants_by_environment[plant.environment] = []
+def plant_bulk_form_html(user):
+    """HTML da barra de ações em massa da lista de plantas, do cache de fragmentos."""
+    # A barra de ações não traz as opções de ambiente e estágio (LookupSelect): o HTML
+    # guardado no cache de fragmentos não muda com eles
+    key = cache.fragment_key('plant_bulk_form', user.pk, ())
+    html = cache.get_fragment(key)
+    if html is None:
+        html = str(render_to_string('cultivation/includes/plant_bulk_form.html', {
+            'form': PlantBulkForm(user=user),
+        }))
+        cache.set_fragment(key, html)
+    return mark_safe(html)
 
-                # Adiciona a planta à lista do seu ambiente.
-                plants_by_environment[plant.environment].append(plant)
-            else:
-                plants_without_environment.append(plant)
 
-        # A lógica acima automaticamente garante que apenas ambientes
-        # que têm pelo menos uma planta se tornarão chaves no dicionário.
-        # Ambientes vazios nunca serão adicionados.
+class PlantDetailView(LoginRequiredMixin, ConditionalGetMixin, OwnerScopedObjectMixin, DetailView):
+    model = Plant
+    template_name = 'cultivation/plant_detail.html'
 
-        # --- FIM DA LÓGICA ---
+    def get_validator_parts(self):
+        # Só o updated_at, sem carregar a planta; se ela não é do usuário (ou não existe)
+        # não há ETag e a view segue normalmente até o 404
+        updated_at = (Plant.objects.filter(owner=self.request.user, pk=self.kwargs['pk'])
+                      .order_by().values_list('updated_at', flat=True).first())
+        return None if updated_at is None else (updated_at,)
 
-        context['plants_by_environment'] = plants_by_environment
-        context['plants_without_environment'] = plants_without_environment
+    # Diário da planta: mais novas primeiro, paginado por cursor sobre o índice journal_plant_timeline_idx
+    journal_ordering = ('-recorded_at', '-pk')
+    journal_page_size = 20
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('environment', 'stage').with_age()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        try:
+            context['journal_page'] = paginate_keyset(
+                self.object.journal_entries.all(), self.journal_ordering, self.request.GET.get('cursor'),
+                self.journal_page_size,
+            )
+        except InvalidCursor as exc:
+            raise Http404(str(exc))
+        context['journal_form'] = JournalEntryForm()
         return context
 
 
-class PlantDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
-    model = Plant
-    template_name = 'cultivation/plant_detail.html'
+class PlantSearchView(LoginRequiredMixin, TemplateView):
+    """Busca nas plantas e no diário do usuário pelo índice de texto (veja search.py)."""
+    template_name = 'cultivation/plant_search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        context['result'] = search.search(self.request.user, query)
+        return context
+
+
+class StrainAutocompleteView(LoginRequiredMixin, View):
+    """
+    Sugestões de variedades para o campo do PlantForm, servidas do catálogo em memória.
+    Só as variedades que o próprio usuário já usa: os nomes dos outros são deles.
+    """
+    limit = 10
+
+    def get(self, request):
+        matches = strain_catalog.complete(
+            request.GET.get('q', ''), limit=self.limit, only=strain_catalog.used_by(request.user.pk),
+        )
+        return JsonResponse({'results': [{'id': strain.pk, 'name': strain.name} for strain in matches]})
+
+
+class OwnerLookupView(LoginRequiredMixin, View):
+    """
+    Busca paginada, em JSON, dos objetos do usuário pelo nome, para os campos
+    com LookupSelect (forms.py): {"results": [{"id", "name"}], "next": cursor}.
+    Cada página é uma consulta limitada, lida na ordem do índice (owner, name).
+    """
+    model = None
+    ordering = ('name', 'pk')
+    page_size = 20
+
+    def get(self, request):
+        queryset = self.model.objects.filter(owner=request.user).values('pk', 'name')
+        query = request.GET.get('q', '').strip()
+        if query:
+            queryset = queryset.filter(name__icontains=query)
+        try:
+            page = paginate_keyset(queryset, self.ordering, request.GET.get('cursor'), self.page_size)
+        except InvalidCursor as exc:
+            return JsonResponse({'detail': str(exc)}, status=400)
+        return JsonResponse({
+            'results': [{'id': row['pk'], 'name': row['name']} for row in page],
+            'next': page.next_cursor,
+        })
+
+
+class EnvironmentLookupView(OwnerLookupView):
+    model = Environment
 
-    def test_func(self):
-        plant = self.get_object()
-        return self.request.user == plant.owner
+
+class StageLookupView(OwnerLookupView):
+    model = Stage
 
 
 class PlantCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
@@ -175,6 +320,10 @@ class PlantCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
     success_url = reverse_lazy('cultivation:plant_list')
     success_message = "Planta '%(name)s - %(strain)s' cadastrada com sucesso!"
 
+    def get_success_message(self, cleaned_data):
+        # cleaned_data['strain'] é a Strain (ou None): a mensagem mostra o nome, como o card
+        return self.success_message % dict(cleaned_data, strain=self.object.strain_name)
+
     def get_form_kwargs(self):
         # Passa o usuário logado para o __init__ do formulário
         kwargs = super().get_form_kwargs()
@@ -191,40 +340,150 @@ class PlantCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
         return context
 
 
-class PlantUpdateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, UpdateView):
+class PlantImportView(LoginRequiredMixin, FormView):
+    """
+    Cadastra plantas em massa a partir de um CSV (veja imports.py). Com
+    alguma linha inválida nada é gravado, e a página lista os erros por linha.
+    """
+    form_class = PlantImportForm
+    template_name = 'cultivation/plant_import.html'
+    success_url = reverse_lazy('cultivation:plant_list')
+
+    def form_valid(self, form):
+        try:
+            result = imports.import_plants(imports.open_csv(form.cleaned_data['file']), self.request.user)
+        except (imports.PlantImportError, UnicodeDecodeError, csv.Error) as exc:
+            if isinstance(exc, UnicodeDecodeError):
+                message = "O arquivo precisa estar em UTF-8."
+            elif isinstance(exc, csv.Error):
+                message = f"O arquivo não é um CSV válido ({exc})."
+            else:
+                message = str(exc)
+            form.add_error('file', message)
+            return self.form_invalid(form)
+        if result.rejected:
+            return self.render_to_response(self.get_context_data(form=form, result=result), status=400)
+        messages.success(self.request, f"{result.created} planta(s) importada(s) com sucesso!")
+        return super().form_valid(form)
+
+
+class PlantBulkView(LoginRequiredMixin, View):
+    """
+    Ações em massa nas plantas marcadas na lista. Cada ação é um único
+    UPDATE restrito ao dono (ou um bulk_create, na clonagem), nunca um
+    save() por planta.
+    """
+    http_method_names = ['post']
+    # Ação -> (evento ao vivo, campo alterado), para as páginas abertas do dono (events.py)
+    live_events = {
+        'move': (events.PLANT_MOVED, 'environment'),
+        'clear_environment': (events.PLANT_MOVED, 'environment'),
+        'stage': (events.PLANT_STAGE, 'stage'),
+        'clear_stage': (events.PLANT_STAGE, 'stage'),
+    }
+
+    def post(self, request):
+        form = PlantBulkForm(request.POST, user=request.user)
+        if not form.is_valid():
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, error)
+            return self.redirect_back()
+
+        data = form.cleaned_data
+        plants = Plant.objects.filter(owner=request.user, pk__in=data['plants'])
+        action = data['action']
+        if action == 'clone':
+            count = len(plants.clone(data['copies']))
+            message = f"{count} cópia(s) criada(s)."
+            event = (events.PLANT_CREATED, {'count': count})
+        else:
+            values = {
+                'move': {'environment': data['environment']},
+                'clear_environment': {'environment': None},
+                'stage': {'stage': data['stage']},
+                'clear_stage': {'stage': None},
+                'activate': {'is_active': True},
+                'deactivate': {'is_active': False},
+            }[action]
+            count = plants.update_with_timestamp(**values)
+            message = f"{count} planta(s) atualizada(s)."
+            event = None
+            if action in self.live_events:
+                kind, field = self.live_events[action]
+                event = (kind, {'plants': data['plants'], field: events.related(values[field])})
+        if count:
+            # update() e bulk_create não disparam os sinais do cache de fragmentos nem os eventos ao vivo
+            cache.bump('plant', request.user.pk)
+            if event:
+                events.publish_on_commit(request.user.pk, *event)
+        messages.success(request, message)
+        return self.redirect_back()
+
+    def redirect_back(self):
+        # Volta para a mesma página da lista
+        url = self.request.POST.get('next')
+        if url and url_has_allowed_host_and_scheme(url, allowed_hosts={self.request.get_host()}):
+            return redirect(url)
+        return redirect('cultivation:plant_list')
+
+
+class JournalEntryCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
+    """Acrescenta uma entrada ao diário de uma planta do usuário (o diário não tem edição)."""
+    model = JournalEntry
+    form_class = JournalEntryForm
+    template_name = 'cultivation/journal_entry_form.html'
+    success_message = "Entrada registrada no diário!"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            self.plant = get_object_or_404(Plant.objects.only('pk', 'owner_id', 'name'), pk=kwargs['pk'],
+                                           owner=request.user)
+        return super().dispatch(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        form.instance.plant = self.plant
+        return super().form_valid(form)
+
+    def get_success_url(self):
+        return reverse('cultivation:plant_detail', kwargs={'pk': self.plant.pk})
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['plant'] = self.plant
+        return context
+
+
+class PlantUpdateView(LoginRequiredMixin, OwnerScopedObjectMixin, SuccessMessageMixin, UpdateView):
     model = Plant
     form_class = PlantForm
     template_name = 'cultivation/plant_form.html'
     success_url = reverse_lazy('cultivation:plant_list')
     success_message = "Planta '%(name)s - %(strain)s' atualizada com sucesso!"
 
+    def get_success_message(self, cleaned_data):
+        # cleaned_data['strain'] é a Strain (ou None): a mensagem mostra o nome, como o card
+        return self.success_message % dict(cleaned_data, strain=self.object.strain_name)
+
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['user'] = self.request.user
         return kwargs
 
-    def test_func(self):
-        plant = self.get_object()
-        return self.request.user == plant.owner
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['page_title'] = 'Editar Planta'
         return context
 
 
-class PlantDeleteView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, DeleteView):
+class PlantDeleteView(LoginRequiredMixin, OwnerScopedObjectMixin, SuccessMessageMixin, DeleteView):
     model = Plant
     template_name = 'cultivation/plant_confirm_delete.html'
     success_url = reverse_lazy('cultivation:plant_list')
     success_message = "Planta excluída com sucesso!"
 
-    def test_func(self):
-        plant = self.get_object()
-        return self.request.user == plant.owner
 
-
-class StageListView(LoginRequiredMixin, ListView):
+class StageListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Stage
     template_name = 'cultivation/stage_list.html'
     context_object_name = 'stages'
@@ -245,22 +504,88 @@ class StageCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
         return super().form_valid(form)
 
 
-class StageUpdateView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, UpdateView):
+class StageUpdateView(LoginRequiredMixin, OwnerScopedObjectMixin, SuccessMessageMixin, UpdateView):
     model = Stage
     form_class = StageForm
     template_name = 'cultivation/stage_form.html'
     success_url = reverse_lazy('cultivation:stage_list')
     success_message = "Estágio '%(name)s' atualizado com sucesso!"
 
-    def test_func(self):
-        return self.request.user == self.get_object().owner
-
 
-class StageDeleteView(LoginRequiredMixin, UserPassesTestMixin, SuccessMessageMixin, DeleteView):
+class StageDeleteView(LoginRequiredMixin, OwnerScopedObjectMixin, SuccessMessageMixin, DeleteView):
     model = Stage
     template_name = 'cultivation/stage_confirm_delete.html'
     success_url = reverse_lazy('cultivation:stage_list')
     success_message = "Estágio excluído com sucesso!"
 
-    def test_func(self):
-        return self.request.user == self.get_object().owner
\ No newline at end of file
+
+# --- View para telemetria (leituras de sensores) ---
+
+@method_decorator(csrf_exempt, name='dispatch')
+class TelemetryIngestView(LoginRequiredMixin, View):
+    """
+    Recebe lotes de leituras em NDJSON ou CSV e grava tudo com bulk_create.
+
+    O CSRF é dispensado porque o corpo precisa ser application/x-ndjson ou text/csv,
+    tipos que um formulário de outro site não consegue enviar sem preflight.
+    """
+    http_method_names = ['post']
+    parsers = {
+        'application/x-ndjson': telemetry.parse_ndjson,
+        'application/jsonl': telemetry.parse_ndjson,
+        'text/csv': telemetry.parse_csv,
+    }
+
+    def post(self, request, *args, **kwargs):
+        parser = self.parsers.get(request.content_type)
+        if parser is None:
+            return JsonResponse(
+                {'error': 'Use Content-Type application/x-ndjson ou text/csv.'}, status=415
+            )
+        # Um único SELECT resolve todos os ambientes que o usuário pode alimentar
+        environment_ids = set(
+            Environment.objects.filter(owner=request.user).values_list('pk', flat=True)
+        )
+        result = telemetry.ingest_readings(parser(request), environment_ids)
+        if result.environments:
+            events.publish_on_commit(request.user.pk, events.TELEMETRY, {
+                'environments': {str(pk): count for pk, count in result.environments.items()},
+            })
+        return JsonResponse(result.as_dict(), status=200 if result.accepted or not result.rejected else 400)
+
+
+# --- Exportação (CSV) ---
+
+class CsvExportView(LoginRequiredMixin, View):
+    """Baixa um CSV transmitido linha a linha (veja exports.py) com os registros do usuário em `model`."""
+    model = None
+    columns = ()
+    filename_prefix = None
+
+    def get_queryset(self):
+        # Só os registros do usuário, na ordem do pk; as subclasses acrescentam o que as colunas leem
+        return self.model._default_manager.filter(owner=self.request.user).order_by('pk')
+
+    def get(self, request):
+        # Sob ASGI, um bloco do iterator() por vez numa thread (veja streaming.py)
+        response = streaming_response(
+            request, exports.stream_csv(self.get_queryset(), self.columns), batch=exports.CHUNK_SIZE,
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(self.filename_prefix)}"'
+        return response
+
+
+class PlantExportView(CsvExportView):
+    model = Plant
+    columns = exports.PLANT_COLUMNS
+    filename_prefix = 'plantas'
+
+    def get_queryset(self):
+        return exports.plant_queryset(self.request.user)
+
+
+class EnvironmentExportView(CsvExportView):
+    model = Environment
+    columns = exports.ENVIRONMENT_COLUMNS
+    filename_prefix = 'ambientes'
@@ -3,6 +3,11 @@ ASGI config for growplant project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Modo ASGI: as listas e os detalhes de plantas e ambientes são servidos pelas
+views assíncronas (GROWPLANT_SERVER=asgi, veja settings.py). Por exemplo:
+
+    GROWPLANT_DB_PROFILE=production uvicorn growplant.asgi:application --workers 4
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +17,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'growplant.settings')
+os.environ.setdefault('GROWPLANT_SERVER', 'asgi')
 
 application = get_asgi_application()
@@ -0,0 +1,14 @@
+"""
+URLs do modo ASGI (veja growplant/asgi.py): as de growplant/urls.py, com o
+cultivo servido por cultivation/asgi_urls.py.
+"""
+
+from django.urls import include, path
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('cultivation/', include('cultivation.asgi_urls'))
+    if getattr(pattern, 'namespace', None) == 'cultivation' else pattern
+    for pattern in wsgi_urlpatterns
+]
@@ -75,6 +75,14 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'growplant.wsgi.application'
+ASGI_APPLICATION = 'growplant.asgi.application'
+
+# Modo de implantação: growplant/asgi.py define GROWPLANT_SERVER=asgi, e as listas e
+# os detalhes de plantas e ambientes passam a usar as views assíncronas
+# (cultivation/async_views.py), nos mesmos endereços
+GROWPLANT_SERVER = os.environ.get('GROWPLANT_SERVER', 'wsgi')
+if GROWPLANT_SERVER == 'asgi':
+    ROOT_URLCONF = 'growplant.asgi_urls'
 
 
 # Database
@@ -87,6 +95,34 @@ DATABASES = {
     }
 }
 
+# GROWPLANT_DB_PROFILE=production liga WAL, PRAGMAs, conexões persistentes e
+# transações IMMEDIATE (veja growplant/sqlite.py)
+if os.environ.get('GROWPLANT_DB_PROFILE') == 'production':
+    from .sqlite import production_database
+    DATABASES['default'] = production_database(DATABASES['default']['NAME'])
+    if GROWPLANT_SERVER == 'asgi':
+        # No ASGI cada requisição roda o código síncrono numa thread nova: uma conexão
+        # persistente por thread nunca seria reaproveitada, só acumularia arquivos abertos
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+
+
+# Cache
+# Guarda os fragmentos das listas e os contadores de versão que os invalidam
+# (cultivation/cache.py). Todos os processos do servidor (--workers do gunicorn ou
+# do uvicorn) precisam ver as mesmas versões, então o cache fica em arquivos, num
+# diretório que eles compartilham. Com mais de uma máquina, use Redis ou Memcached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('GROWPLANT_CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+# Os testes usam um cache próprio, em memória (veja growplant/testing.py)
+TEST_RUNNER = 'growplant.testing.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
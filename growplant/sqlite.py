@@ -0,0 +1,60 @@
+# growplant/sqlite.py
+
+"""
+Perfil de produção do SQLite.
+
+Aplicado em settings.py quando GROWPLANT_DB_PROFILE=production:
+
+- WAL: leitores nunca esperam por escritores (e vice-versa);
+- synchronous=NORMAL: seguro com WAL, sem fsync a cada commit;
+- mmap_size/cache_size: páginas quentes servidas da memória;
+- busy_timeout: quem encontra o banco travado espera em vez de falhar;
+- transações BEGIN IMMEDIATE: o escritor reserva a trava de escrita logo no
+  início da transação, então as escritas concorrentes entram em fila no
+  busy_timeout em vez de darem "database is locked" ao tentar promover uma
+  trava de leitura no meio da transação;
+- conexões persistentes (CONN_MAX_AGE=None), para não pagar a abertura do
+  arquivo e os PRAGMAs a cada requisição.
+"""
+
+# Espera por uma trava antes de "database is locked". O timeout do connect() do
+# sqlite3 e o PRAGMA busy_timeout ajustam a mesma espera: os dois usam este valor
+BUSY_TIMEOUT = 5  # segundos
+
+# (pragma, valor), executados em toda conexão nova
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', BUSY_TIMEOUT * 1000),  # ms
+    ('cache_size', -64000),             # negativo = KiB (64 MiB)
+    ('mmap_size', 256 * 1024 * 1024),   # bytes
+    ('temp_store', 'MEMORY'),
+)
+
+TRANSACTION_MODE = 'IMMEDIATE'
+
+
+def init_command(pragmas=SQLITE_PRAGMAS):
+    """PRAGMAs no formato de OPTIONS['init_command'] (comandos separados por ';')."""
+    return ';'.join(f'PRAGMA {name}={value}' for name, value in pragmas)
+
+
+def apply_pragmas(connection, pragmas=SQLITE_PRAGMAS):
+    """Aplica os PRAGMAs a uma conexão sqlite3 crua (usado pelo benchmark)."""
+    for name, value in pragmas:
+        connection.execute(f'PRAGMA {name}={value}')
+
+
+def production_database(name):
+    """Entrada de DATABASES com o perfil de produção para o arquivo `name`."""
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': init_command(),
+            'transaction_mode': TRANSACTION_MODE,
+            'timeout': BUSY_TIMEOUT,  # segundos, para o connect() do sqlite3
+        },
+    }
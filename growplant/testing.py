@@ -0,0 +1,104 @@
+# growplant/testing.py
+
+"""
+Utilitários de teste compartilhados entre os apps.
+"""
+
+import json
+import os
+import time
+
+from django.db import connection
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver
+
+# Tempo máximo (segundos) para uma rota responder nos testes de regressão.
+# Pode ser ajustado por máquina com GROWPLANT_ROUTE_TIME_BUDGET.
+ROUTE_TIME_BUDGET = float(os.environ.get('GROWPLANT_ROUTE_TIME_BUDGET', '0.5'))
+
+# O cache dos testes: em memória, separado do diretório que o servidor usa
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'growplant-tests'},
+}
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Roda os testes com TEST_CACHES: o cache 'default' do projeto fica num
+    diretório compartilhado com o servidor (settings.CACHES), e os cache.clear()
+    dos testes apagariam os fragmentos, as versões e os limites dele.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._test_caches = override_settings(CACHES=TEST_CACHES)
+        self._test_caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_caches.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def route_names(urlpatterns, namespace=None):
+    """Nomes (com namespace) de todas as rotas nomeadas de um urlpatterns."""
+    names = set()
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns, pattern.namespace or namespace)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(f'{namespace}:{pattern.name}' if namespace else pattern.name)
+    return names
+
+
+class RouteBudgetMixin:
+    """
+    Mixin para TestCase que confere, para cada rota, um orçamento fixo de
+    consultas SQL e um teto de tempo de resposta.
+
+    Os tempos medidos ficam em `route_timings`; se GROWPLANT_ROUTE_TIMINGS
+    apontar para um arquivo, eles são gravados lá em JSON ao final da classe.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.route_timings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.environ.get('GROWPLANT_ROUTE_TIMINGS')
+        if path:
+            timings = {}
+            if os.path.exists(path):
+                with open(path) as handle:
+                    timings = json.load(handle)
+            timings.update(cls.route_timings)
+            with open(path, 'w') as handle:
+                json.dump(timings, handle, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    def assertRouteWithinBudget(self, name, url, queries, method='get', expected_status=200, warmup=True,
+                                **request_kwargs):
+        if warmup:
+            # Aquece a rota (templates compilados, caches de URL) antes de medir
+            getattr(self.client, method)(url, **request_kwargs)
+
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(url, **request_kwargs)
+            if response.streaming:
+                # Respostas transmitidas só consultam o banco enquanto são lidas
+                response.streamed_content = b''.join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        self.route_timings[name] = round(elapsed * 1000, 2)
+
+        self.assertEqual(response.status_code, expected_status, f"{name}: status inesperado")
+        executed = len(context.captured_queries)
+        self.assertEqual(
+            executed, queries,
+            f"{name}: {executed} consultas executadas, orçamento de {queries}.\n"
+            + '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+        self.assertLess(elapsed, ROUTE_TIME_BUDGET, f"{name}: {elapsed:.3f}s acima do teto de {ROUTE_TIME_BUDGET}s")
+        return response
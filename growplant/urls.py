@@ -8,4 +8,6 @@ urlpatterns = [
     path('', home_view, name='home'),
 
     path('cultivation/', include('cultivation.urls')),
+    # API JSON (somente leitura) para automações e clientes móveis
+    path('api/v1/', include('cultivation.api_urls')),
 ]
\ No newline at end of file
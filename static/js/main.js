@@ -12,4 +12,227 @@ document.addEventListener('DOMContentLoaded', function() {
             new bootstrap.Alert(alert).close();
         }, 2000);
     });
-});
\ No newline at end of file
+});
+
+// Autocompletar dos campos com data-autocomplete-url (ex.: a variedade no formulário de planta):
+// as sugestões vêm do servidor em JSON e aparecem numa <datalist> ligada ao campo
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('input[data-autocomplete-url]').forEach(function(input) {
+        const datalist = document.createElement('datalist');
+        datalist.id = input.id + '-sugestoes';
+        input.setAttribute('list', datalist.id);
+        input.after(datalist);
+
+        let timer = null;
+        let controller = null;
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            // Espera o usuário parar de digitar antes de consultar
+            timer = setTimeout(function() {
+                const query = input.value.trim();
+                if (!query) {
+                    datalist.replaceChildren();
+                    return;
+                }
+                // Uma resposta atrasada não pode sobrescrever a da consulta mais nova
+                if (controller) {
+                    controller.abort();
+                }
+                controller = new AbortController();
+                const url = input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(query);
+                fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+                    .then(function(response) { return response.ok ? response.json() : {results: []}; })
+                    .then(function(data) {
+                        datalist.replaceChildren(...data.results.map(function(item) {
+                            const option = document.createElement('option');
+                            option.value = item.name;
+                            return option;
+                        }));
+                    })
+                    .catch(function() {});
+            }, 150);
+        });
+    });
+});
+
+
+// Campos de escolha com data-lookup-url (ambiente e estágio da planta): o select só traz a
+// opção escolhida, e as outras são buscadas pelo nome no servidor, uma página por vez
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('select[data-lookup-url]').forEach(function(select) {
+        const wrapper = document.createElement('div');
+        wrapper.className = 'position-relative';
+        const input = document.createElement('input');
+        input.type = 'search';
+        input.id = select.id + '-busca';
+        input.className = 'form-control';
+        input.placeholder = 'Buscar pelo nome...';
+        input.autocomplete = 'off';
+        const menu = document.createElement('div');
+        menu.className = 'list-group position-absolute w-100 shadow-sm d-none';
+        menu.style.zIndex = 1000;
+        menu.style.maxHeight = '16rem';
+        menu.style.overflowY = 'auto';
+        wrapper.append(input, menu);
+        select.after(wrapper);
+        select.classList.add('d-none');
+        document.querySelectorAll('label[for="' + select.id + '"]').forEach(function(label) {
+            label.htmlFor = input.id;
+        });
+
+        function showSelected() {
+            const option = select.options[select.selectedIndex];
+            input.value = option && option.value ? option.text : '';
+        }
+
+        function choose(value, text) {
+            let option = Array.from(select.options).find(function(item) { return item.value === value; });
+            if (!option) {
+                option = new Option(text, value);
+                select.add(option);
+            }
+            select.value = value;
+            menu.classList.add('d-none');
+            showSelected();
+        }
+
+        function menuItem(text, onChoose, extraClass) {
+            const button = document.createElement('button');
+            button.type = 'button';
+            button.className = 'list-group-item list-group-item-action ' + (extraClass || '');
+            button.textContent = text;
+            // mousedown (e não click): o campo de busca não perde o foco antes da escolha
+            button.addEventListener('mousedown', function(event) {
+                event.preventDefault();
+                onChoose();
+            });
+            return button;
+        }
+
+        let controller = null;
+        let query = '';
+        function load(cursor) {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const params = new URLSearchParams({q: query});
+            if (cursor) {
+                params.set('cursor', cursor);
+            }
+            const options = {signal: controller.signal, headers: {'Accept': 'application/json'}};
+            fetch(select.dataset.lookupUrl + '?' + params, options)
+                .then(function(response) { return response.ok ? response.json() : {results: [], next: null}; })
+                .then(function(data) {
+                    if (cursor) {
+                        // Próxima página: tira o botão "mais resultados" e acrescenta no fim
+                        menu.querySelectorAll('[data-more]').forEach(function(button) { button.remove(); });
+                    } else {
+                        menu.replaceChildren();
+                        const empty = select.querySelector('option[value=""]');
+                        if (empty) {
+                            menu.append(menuItem(empty.text, function() { choose('', empty.text); }, 'text-muted'));
+                        }
+                    }
+                    data.results.forEach(function(item) {
+                        menu.append(menuItem(item.name, function() { choose(String(item.id), item.name); }));
+                    });
+                    if (data.next) {
+                        const more = menuItem('Mais resultados...', function() { load(data.next); }, 'text-primary');
+                        more.dataset.more = '1';
+                        menu.append(more);
+                    }
+                    menu.classList.remove('d-none');
+                })
+                .catch(function() {});
+        }
+
+        let timer = null;
+        showSelected();
+        input.addEventListener('focus', function() {
+            // Ao entrar no campo, a primeira página de todos; o nome escolhido fica selecionado para ser trocado
+            input.select();
+            query = '';
+            load(null);
+        });
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(function() {
+                query = input.value.trim();
+                load(null);
+            }, 150);
+        });
+        input.addEventListener('blur', function() {
+            // Sem escolher uma opção, o campo volta a mostrar a que está valendo
+            menu.classList.add('d-none');
+            showSelected();
+        });
+    });
+});
+
+
+// Atualizações ao vivo (só no modo ASGI, onde a página traz data-event-stream): os eventos das
+// plantas e ambientes do usuário chegam por Server-Sent Events. O estágio é trocado direto nos
+// cards; o resto (plantas novas ou movidas, leituras dos sensores) reorganizaria a página, então
+// vira um aviso com o botão de recarregar. O EventSource reconecta sozinho, mandando o Last-Event-ID
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.querySelector('[data-event-stream]');
+    if (!container || !window.EventSource) {
+        return;
+    }
+    const totals = {moved: 0, created: 0, readings: 0};
+    const pending = {};
+    let notice = null;
+
+    function announce(key, text) {
+        pending[key] = text;
+        if (!notice) {
+            // Criado só agora: os alertas que já estão na página fecham sozinhos depois de 2 segundos
+            notice = document.createElement('div');
+            notice.className = 'alert alert-info d-flex justify-content-between align-items-center';
+            notice.setAttribute('role', 'status');
+            const reload = document.createElement('a');
+            reload.className = 'btn btn-sm btn-primary';
+            reload.href = window.location.href;
+            reload.textContent = 'Atualizar';
+            notice.append(document.createElement('span'), reload);
+            container.append(notice);
+        }
+        notice.firstChild.textContent = Object.values(pending).join(' ');
+    }
+
+    const handlers = {
+        'plant.stage': function(data) {
+            data.plants.forEach(function(id) {
+                document.querySelectorAll('[data-plant-id="' + id + '"] [data-plant-stage]').forEach(function(badge) {
+                    badge.textContent = data.stage ? data.stage.name : 'Sem estágio';
+                });
+            });
+        },
+        'plant.moved': function(data) {
+            totals.moved += data.plants.length;
+            announce('moved', totals.moved + ' planta(s) mudaram de ambiente.');
+        },
+        'plant.created': function(data) {
+            totals.created += data.count;
+            announce('created', totals.created + ' planta(s) nova(s).');
+        },
+        'telemetry': function(data) {
+            const count = data.environments[container.dataset.environmentId];
+            if (count) {
+                totals.readings += count;
+                announce('telemetry', totals.readings + ' leitura(s) nova(s) dos sensores.');
+            }
+        },
+        'reset': function() {
+            announce('reset', 'Esta página pode estar desatualizada.');
+        },
+    };
+
+    const source = new EventSource(container.dataset.eventStream);
+    container.dataset.events.split(' ').forEach(function(type) {
+        source.addEventListener(type, function(event) {
+            handlers[type](JSON.parse(event.data));
+        });
+    });
+});
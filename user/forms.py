@@ -1,5 +1,7 @@
 from django.contrib.auth.forms import UserCreationForm, PasswordResetForm, SetPasswordForm
+from django.template import loader
 from .models import CustomUser
+from .mail import enqueue_email
 from django import forms
 
 class CustomUserCreationForm(UserCreationForm):
@@ -39,6 +41,20 @@ class CustomPasswordResetForm(PasswordResetForm):
         widget=forms.EmailInput(attrs={'autocomplete': 'email', 'placeholder': 'Digite o e-mail da sua conta'})
     )
 
+    def send_mail(self, subject_template_name, email_template_name, context, from_email, to_email,
+                  html_email_template_name=None):
+        # Em vez de falar com o SMTP durante a requisição, coloca a mensagem na fila de saída
+        subject = loader.render_to_string(subject_template_name, context)
+        subject = ''.join(subject.splitlines())
+        body = loader.render_to_string(email_template_name, context)
+        html_body = ''
+        if html_email_template_name is not None:
+            html_body = loader.render_to_string(html_email_template_name, context)
+        enqueue_email(
+            subject, body, to_email, dedup_key=f'password_reset:{to_email}',
+            from_email=from_email, html_body=html_body,
+        )
+
 class CustomSetPasswordForm(SetPasswordForm):
     # O SetPasswordForm usa 'new_password1' e 'new_password2'
     new_password1 = forms.CharField(
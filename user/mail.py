@@ -0,0 +1,132 @@
+# user/mail.py
+
+"""
+Fila de saída de e-mails.
+
+As views chamam `enqueue_email`, que só grava uma linha no banco, e a
+requisição responde imediatamente. O worker (`send_queued_emails`, via
+manage.py send_queued_mail) envia as mensagens em lotes, reutilizando uma
+única conexão SMTP, com novas tentativas e backoff exponencial.
+"""
+
+import datetime
+import logging
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+# Tempo em que um lote fica reservado para o worker que o pegou
+CLAIM_SECONDS = 5 * 60
+
+
+def enqueue_email(subject, body, to_email, dedup_key='', from_email=None, html_body=''):
+    """
+    Coloca uma mensagem na fila e devolve o OutboundEmail.
+    Sem `from_email`, o envio usa o DEFAULT_FROM_EMAIL; `html_body` vai como
+    alternativa em HTML ao texto.
+    Se já houver uma mensagem pendente com a mesma `dedup_key`, ela é devolvida
+    e nada novo é enfileirado.
+    """
+    if dedup_key:
+        pending = OutboundEmail.objects.filter(dedup_key=dedup_key, status=OutboundEmail.Status.PENDING).first()
+        if pending is not None:
+            return pending
+    try:
+        with transaction.atomic():
+            return OutboundEmail.objects.create(
+                subject=subject, body=body, to_email=to_email, dedup_key=dedup_key,
+                from_email=from_email or '', html_body=html_body,
+            )
+    except IntegrityError:
+        # Outra requisição enfileirou a mesma mensagem entre a consulta e o INSERT
+        return OutboundEmail.objects.get(dedup_key=dedup_key, status=OutboundEmail.Status.PENDING)
+
+
+def backoff(attempts):
+    """Espera antes da próxima tentativa: 30s, 60s, 120s... até 1h."""
+    return datetime.timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def _claim_batch(batch_size):
+    """Reserva um lote de mensagens vencidas, empurrando a próxima tentativa para frente."""
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboundEmail.Status.PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        OutboundEmail.objects.filter(pk__in=ids).update(
+            next_attempt_at=now + datetime.timedelta(seconds=CLAIM_SECONDS)
+        )
+    return list(OutboundEmail.objects.filter(pk__in=ids).order_by('pk'))
+
+
+def _build_message(message):
+    email = EmailMultiAlternatives(
+        message.subject, message.body, message.from_email or None, [message.to_email]
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, 'text/html')
+    return email
+
+
+def _record_failure(message, error):
+    message.attempts += 1
+    message.last_error = str(error)
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = OutboundEmail.Status.FAILED
+        logger.error("Desistindo do e-mail %s para %s: %s", message.pk, message.to_email, error)
+    else:
+        message.next_attempt_at = timezone.now() + backoff(message.attempts)
+
+
+def send_queued_emails(batch_size=100, connection=None):
+    """
+    Envia um lote de mensagens pendentes pela mesma conexão de e-mail.
+    Devolve (enviadas, com_falha).
+    """
+    batch = _claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = connection or get_connection()
+    sent = failed = 0
+    try:
+        connection.open()
+    except Exception as exc:
+        # Sem conexão, o lote inteiro volta para a fila com backoff
+        for message in batch:
+            _record_failure(message, exc)
+        OutboundEmail.objects.bulk_update(batch, ['attempts', 'last_error', 'status', 'next_attempt_at'])
+        return 0, len(batch)
+
+    try:
+        for message in batch:
+            try:
+                connection.send_messages([_build_message(message)])
+            except Exception as exc:
+                _record_failure(message, exc)
+                failed += 1
+            else:
+                message.attempts += 1
+                message.status = OutboundEmail.Status.SENT
+                message.sent_at = timezone.now()
+                message.last_error = ''
+                sent += 1
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.bulk_update(
+        batch, ['attempts', 'last_error', 'status', 'next_attempt_at', 'sent_at']
+    )
+    return sent, failed
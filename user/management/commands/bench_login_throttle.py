@@ -0,0 +1,72 @@
+# user/management/commands/bench_login_throttle.py
+
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from user import ratelimit
+
+BENCH_EMAIL = 'bench-login@growplant.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula um ataque de credential stuffing contra o login e compara o tempo de CPU "
+        "gasto com e sem o limitador de tentativas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=300, help="Tentativas de login do ataque.")
+        parser.add_argument('--ips', type=int, default=3, help="IPs de origem do ataque.")
+        parser.add_argument('--emails', type=int, default=10, help="E-mails testados pelo atacante.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        User.objects.filter(email=BENCH_EMAIL).delete()
+        # Um usuário real, para que cada tentativa sem limitador pague o PBKDF2 completo
+        user = User.objects.create_user(email=BENCH_EMAIL, password='senha-correta-123')
+        emails = [BENCH_EMAIL] + [f'victim{i}@growplant.invalid' for i in range(options['emails'] - 1)]
+
+        setup_test_environment()
+        # Cada 429 geraria um aviso em django.request
+        request_logger = logging.getLogger('django.request')
+        previous_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            results = {}
+            for label, enabled in (('sem limitador', False), ('com limitador', True)):
+                ratelimit.get_store().clear()
+                with override_settings(GROWPLANT_RATE_LIMITS_ENABLED=enabled):
+                    results[label] = self._attack(emails, options)
+        finally:
+            request_logger.setLevel(previous_level)
+            teardown_test_environment()
+            user.delete()
+
+        self.stdout.write(f"{'modo':<16} {'cpu (s)':>10} {'parede (s)':>11} {'recusadas':>10}")
+        for label, (cpu, wall, rejected) in results.items():
+            self.stdout.write(f"{label:<16} {cpu:>10.3f} {wall:>11.3f} {rejected:>10}")
+        without, with_limiter = results['sem limitador'][0], results['com limitador'][0]
+        self.stdout.write(self.style.SUCCESS(
+            f"CPU economizada: {without - with_limiter:.3f}s ({(1 - with_limiter / without) * 100:.0f}%)"
+        ))
+
+    @staticmethod
+    def _attack(emails, options):
+        client = Client()
+        url = reverse('login')
+        rejected = 0
+        cpu_started, wall_started = time.process_time(), time.perf_counter()
+        for attempt in range(options['attempts']):
+            response = client.post(
+                url,
+                {'email': emails[attempt % len(emails)], 'password': f'chute-{attempt}'},
+                REMOTE_ADDR=f'203.0.113.{attempt % options["ips"] + 1}',
+            )
+            rejected += response.status_code == 429
+        return time.process_time() - cpu_started, time.perf_counter() - wall_started, rejected
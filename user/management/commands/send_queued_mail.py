@@ -0,0 +1,29 @@
+# user/management/commands/send_queued_mail.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.mail import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Envia os e-mails da fila de saída em lotes, reutilizando uma única conexão por lote."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Continua rodando e esvazia a fila continuamente.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Espera (s) quando a fila está vazia.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_emails(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"{sent} enviados, {failed} com falha.")
+            if not options['loop']:
+                # Sem --loop, esvazia o que estiver vencido agora e sai
+                if sent or failed:
+                    continue
+                break
+            if not (sent or failed):
+                time.sleep(options['interval'])
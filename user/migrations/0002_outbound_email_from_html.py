@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboundemail',
+            name='from_email',
+            field=models.CharField(blank=True, max_length=254, verbose_name='remetente'),
+        ),
+        migrations.AddField(
+            model_name='outboundemail',
+            name='html_body',
+            field=models.TextField(blank=True, verbose_name='mensagem em HTML'),
+        ),
+    ]
@@ -2,6 +2,7 @@
 
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 # Importe o nosso novo gerenciador
@@ -19,4 +20,50 @@ class CustomUser(AbstractUser):
     objects = CustomUserManager()
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+
+class OutboundEmail(models.Model):
+    """
+    E-mail na fila de saída. As views apenas gravam a mensagem aqui; o envio
+    pelo SMTP é feito pelo worker (manage.py send_queued_mail), fora da requisição.
+    """
+    class Status(models.TextChoices):
+        PENDING = 'P', _('Pendente')
+        SENT = 'S', _('Enviado')
+        FAILED = 'F', _('Falhou')
+
+    to_email = models.EmailField(_('destinatário'))
+    subject = models.CharField(_('assunto'), max_length=255)
+    body = models.TextField(_('mensagem'))
+    # Alternativa em HTML, enviada junto do texto quando preenchida
+    html_body = models.TextField(_('mensagem em HTML'), blank=True)
+    # Vazio usa o DEFAULT_FROM_EMAIL no momento do envio
+    from_email = models.CharField(_('remetente'), max_length=254, blank=True)
+    status = models.CharField(_('situação'), max_length=1, choices=Status.choices, default=Status.PENDING)
+    # Mensagens pendentes com a mesma chave são deduplicadas (ex.: vários cliques em "reenviar")
+    dedup_key = models.CharField(_('chave de deduplicação'), max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(_('tentativas'), default=0)
+    next_attempt_at = models.DateTimeField(_('próxima tentativa'), default=timezone.now)
+    last_error = models.TextField(_('último erro'), blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to_email} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = _('e-mail na fila')
+        verbose_name_plural = _('fila de e-mails')
+        indexes = [
+            # O worker busca as pendentes vencidas, na ordem da próxima tentativa
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='P') & ~models.Q(dedup_key=''),
+                name='unique_pending_dedup_key',
+            ),
+        ]
+
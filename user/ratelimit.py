@@ -0,0 +1,168 @@
+# user/ratelimit.py
+
+"""
+Limite de requisições por janela deslizante, por IP e por e-mail.
+
+Protege as views que calculam hashes de senha (PBKDF2) contra rajadas de
+tentativas: a requisição acima do limite é recusada com 429 antes de
+qualquer consulta ao banco ou cálculo de hash.
+
+A janela deslizante é aproximada por dois contadores (janela atual e
+anterior, ponderada pela fração que ainda cai dentro da janela), então cada
+chave ocupa só alguns inteiros, seja no armazenamento local do processo,
+seja em um cache compartilhado do Django (GROWPLANT_RATE_LIMIT_CACHE).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.shortcuts import render
+
+# escopo -> {tipo de chave: (máximo de requisições, janela em segundos)}
+DEFAULT_RATE_LIMITS = {
+    'login': {'ip': (20, 60), 'email': (5, 300)},
+    'signup': {'ip': (10, 3600)},
+    'password_reset': {'ip': (10, 3600), 'email': (3, 3600)},
+    'password_reset_confirm': {'ip': (10, 3600)},
+}
+
+
+class LocalStore:
+    """
+    Armazenamento no próprio processo: {chave: [índice_da_janela, atual, anterior]},
+    na ordem do último acesso. Acima de max_keys sai a chave parada há mais tempo,
+    nunca as que continuam recebendo tentativas.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._counters = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window_index, window):
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or counter[0] < window_index - 1:
+                counter = [window_index, 0, 0]
+            elif counter[0] == window_index - 1:
+                counter = [window_index, 0, counter[1]]
+            counter[1] += 1
+            self._counters[key] = counter
+            self._counters.move_to_end(key)
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+            return counter[1], counter[2]
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class CacheStore:
+    """
+    Armazenamento em um cache do Django, compartilhado entre processos (ex.: Redis/Memcached).
+
+    As chaves levam uma geração (rl:<geração>:...): clear() só troca a geração, e os
+    contadores antigos expiram sozinhos, sem apagar o resto do alias.
+    """
+    generation_key = 'rl:generation'
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def _generation(self):
+        generation = self.cache.get(self.generation_key)
+        if generation is None:
+            # Um valor novo se a geração for despejada: os contadores antigos não voltam
+            self.cache.add(self.generation_key, time.time_ns(), timeout=None)
+            generation = self.cache.get(self.generation_key)
+        return generation
+
+    def hit(self, key, window_index, window):
+        prefix = f'rl:{self._generation()}:{key}'
+        current_key = f'{prefix}:{window_index}'
+        self.cache.add(current_key, 0, timeout=2 * window)
+        current = self.cache.incr(current_key)
+        previous = self.cache.get(f'{prefix}:{window_index - 1}', 0)
+        return current, previous
+
+    def clear(self):
+        self.cache.set(self.generation_key, time.time_ns(), timeout=None)
+
+
+_local_store = LocalStore()
+
+
+def get_store():
+    alias = getattr(settings, 'GROWPLANT_RATE_LIMIT_CACHE', None)
+    return CacheStore(alias) if alias else _local_store
+
+
+def get_limits(scope):
+    return getattr(settings, 'GROWPLANT_RATE_LIMITS', DEFAULT_RATE_LIMITS).get(scope, {})
+
+
+def hit(store, key, limit, window, now=None):
+    """
+    Registra uma requisição para `key` e diz se ela passou do limite.
+    Devolve (permitido, segundos_para_tentar_de_novo).
+    """
+    now = time.time() if now is None else now
+    window_index = int(now // window)
+    current, previous = store.hit(key, window_index, window)
+    elapsed_fraction = (now % window) / window
+    estimated = current + previous * (1 - elapsed_fraction)
+    if estimated > limit:
+        return False, int(window - now % window) + 1
+    return True, 0
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_keys(request):
+    """Chaves disponíveis para limitar uma requisição."""
+    keys = {'ip': client_ip(request)}
+    email = request.POST.get('email', '').strip().lower()
+    if email:
+        keys['email'] = email
+    return keys
+
+
+def check_request(request, scope, store=None):
+    """Aplica todos os limites do escopo. Devolve (permitido, segundos_para_tentar_de_novo)."""
+    store = store or get_store()
+    keys = request_keys(request)
+    for kind, (limit, window) in get_limits(scope).items():
+        value = keys.get(kind)
+        if not value:
+            continue
+        allowed, retry_after = hit(store, f'{scope}:{kind}:{value}', limit, window)
+        if not allowed:
+            return False, retry_after
+    return True, 0
+
+
+def rate_limited(scope):
+    """
+    Decorator para views: limita os POSTs do escopo antes de a view rodar
+    (e, portanto, antes de qualquer check_password ou set_password).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method == 'POST' and getattr(settings, 'GROWPLANT_RATE_LIMITS_ENABLED', True):
+                allowed, retry_after = check_request(request, scope)
+                if not allowed:
+                    response = render(request, 'registration/too_many_attempts.html',
+                                      {'retry_after': retry_after}, status=429)
+                    response['Retry-After'] = str(retry_after)
+                    return response
+            return view(request, *args, **kwargs)
+        return wrapped
+    return decorator
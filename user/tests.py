@@ -1,14 +1,30 @@
 # user/tests.py
 
+import io
+import os
 import re
-from django.test import TestCase
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.core import mail
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
+from django.core.management import call_command
+from django.utils import timezone
+
+from growplant.testing import RouteBudgetMixin, route_names
 
+from . import urls
+from . import mail as mail_queue
+from . import ratelimit
+from .forms import CustomPasswordResetForm
+from .mail import enqueue_email, send_queued_emails
+from .models import OutboundEmail
 from .tokens import account_activation_token
 
 # Pega o nosso modelo de usuário personalizado
@@ -60,12 +76,13 @@ class TestSignupView(TestCase):
     def setUp(self):
         """ Garante que a caixa de e-mails de teste esteja limpa antes de cada teste. """
         mail.outbox = []
+        ratelimit.get_store().clear()
 
     def test_signup_page_loads_correctly(self):
         """ Testa se a página de signup carrega corretamente (GET). """
         response = self.client.get(reverse('signup'))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'registration\\signup.html')
+        self.assertTemplateUsed(response, 'registration/signup.html')
 
     def test_successful_signup_creates_inactive_user_and_sends_email(self):
         """ Testa se um registro bem-sucedido cria um usuário inativo e envia e-mail. """
@@ -74,12 +91,15 @@ class TestSignupView(TestCase):
             'password1': 'testpassword123',
             'password2': 'testpassword123',
         }
-        response = self.client.post(reverse('signup'), data=form_data)
+        # O signup redireciona para o login, com o aviso de que o e-mail de confirmação foi enviado
+        response = self.client.post(reverse('signup'), data=form_data, follow=True)
         self.assertEqual(CustomUser.objects.count(), 1)
         user = CustomUser.objects.first()
         self.assertFalse(user.is_active)
+        send_queued_emails()  # o envio agora acontece no worker da fila
         self.assertEqual(len(mail.outbox), 1)
-        self.assertIn(b'Por favor, confirme seu endere', response.content)
+        self.assertRedirects(response, reverse('login'))
+        self.assertContains(response, 'Um email de confirmação foi enviado para seu email.')
 
     def test_signup_with_existing_active_user_fails(self):
         """ Testa se o registro falha se o e-mail já existir para um usuário ATIVO. """
@@ -91,6 +111,7 @@ class TestSignupView(TestCase):
         }
         response = self.client.post(reverse('signup'), data=form_data)
         self.assertEqual(CustomUser.objects.count(), 1)
+        send_queued_emails()  # o envio agora acontece no worker da fila
         self.assertEqual(len(mail.outbox), 0)
         self.assertFalse(response.context['form'].is_valid())
 
@@ -170,12 +191,13 @@ class TestResendActivationView(TestCase):
         """ Testa o carregamento da página de reenvio (GET). """
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'registration\\resend_activation.html')
+        self.assertTemplateUsed(response, 'registration/resend_activation.html')
         self.assertContains(response, self.inactive_user.email)
 
     def test_resend_email_successfully(self):
         """ Testa se o POST reenvia o e-mail com sucesso. """
         response = self.client.post(self.url, follow=True)
+        send_queued_emails()  # o envio agora acontece no worker da fila
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].subject, 'Ative sua conta Growplant.')
         self.assertRedirects(response, self.url)
@@ -193,6 +215,7 @@ class TestLoginLogoutViews(TestCase):
 
     def setUp(self):
         """ Cria dois usuários: um ativo e um inativo. """
+        ratelimit.get_store().clear()
         self.active_user_pass = 'testpassword'
         self.active_user = CustomUser.objects.create_user(
             email='active@user.com', password=self.active_user_pass, is_active=True)
@@ -204,7 +227,7 @@ class TestLoginLogoutViews(TestCase):
         """ Testa se a página de login carrega corretamente (GET). """
         response = self.client.get(reverse('login'))
         self.assertEqual(response.status_code, 200)
-        self.assertTemplateUsed(response, 'registration\\login.html')
+        self.assertTemplateUsed(response, 'registration/login.html')
 
     def test_successful_login(self):
         """ Testa o login bem-sucedido de um usuário ativo. """
@@ -243,11 +266,13 @@ class TestLoginLogoutViews(TestCase):
 class TestPasswordResetViews(TestCase):
 
     def setUp(self):
+        ratelimit.get_store().clear()
         self.user = CustomUser.objects.create_user(email='reset@test.com', password='oldpassword123', is_active=True)
 
     def test_password_reset_request_sends_email_for_existing_user(self):
         """ Testa se o pedido de redefinição envia e-mail para um usuário válido. """
         response = self.client.post(reverse('password_reset'), {'email': self.user.email})
+        send_queued_emails()  # o envio agora acontece no worker da fila
         self.assertEqual(len(mail.outbox), 1)
         self.assertEqual(mail.outbox[0].to[0], self.user.email)
         self.assertRedirects(response, reverse('password_reset_done'))
@@ -255,6 +280,7 @@ class TestPasswordResetViews(TestCase):
     def test_password_reset_request_does_not_send_email_for_nonexistent_user(self):
         """ Testa que nenhum e-mail é enviado se o e-mail não existir (segurança). """
         response = self.client.post(reverse('password_reset'), {'email': 'nonexistent@email.com'})
+        send_queued_emails()  # o envio agora acontece no worker da fila
         self.assertEqual(len(mail.outbox), 0)
         self.assertRedirects(response, reverse('password_reset_done'))
 
@@ -262,6 +288,7 @@ class TestPasswordResetViews(TestCase):
         """ Testa o fluxo de confirmação e conclusão da redefinição de senha. """
         # Etapa 1: Solicitar o reset e garantir que o e-mail foi enviado
         response = self.client.post(reverse('password_reset'), {'email': self.user.email})
+        send_queued_emails()  # o envio agora acontece no worker da fila
         self.assertEqual(len(mail.outbox), 1)
         email_body = mail.outbox[0].body
 
@@ -275,16 +302,18 @@ class TestPasswordResetViews(TestCase):
         # Construir a URL com os dados extraídos
         url = reverse('password_reset_confirm', kwargs={'uidb64': uidb64, 'token': token})
 
-        # Etapa 3: Acessar a página de confirmação (GET)
-        response_get = self.client.get(url)
+        # Etapa 3: Acessar a página de confirmação (GET). O Django guarda o token na sessão e
+        # redireciona para a URL de definição da senha, sem o token
+        response_get = self.client.get(url, follow=True)
         self.assertEqual(response_get.status_code, 200,
                          "A página de confirmação de reset não carregou corretamente.")
-        self.assertTemplateUsed(response_get, 'password_reset_confirm.html')
+        self.assertTemplateUsed(response_get, 'registration/password_reset_confirm.html')
         self.assertTrue(response_get.context['validlink'])
+        set_password_url = response_get.redirect_chain[-1][0]
 
         # Etapa 4: Enviar a nova senha (POST)
         new_password = 'newStrongPassword123'
-        response_post = self.client.post(url, {
+        response_post = self.client.post(set_password_url, {
             'new_password1': new_password,
             'new_password2': new_password,
         })
@@ -293,4 +322,281 @@ class TestPasswordResetViews(TestCase):
         # Etapa 5: Verificar se a senha realmente mudou
         self.user.refresh_from_db()
         self.assertTrue(self.user.check_password(new_password))
-        self.assertFalse(self.user.check_password('oldpassword123'))
\ No newline at end of file
+        self.assertFalse(self.user.check_password('oldpassword123'))
+
+
+class TestOutboundEmailQueue(TestCase):
+
+    def setUp(self):
+        self.inactive_user = CustomUser.objects.create_user(email='queue@test.com', password='password123',
+                                                            is_active=False)
+        self.resend_url = reverse('resend_activation', kwargs={
+            'emailb64': urlsafe_base64_encode(force_bytes(self.inactive_user.email))})
+
+    def test_signup_enqueues_without_sending(self):
+        """ Testa que o signup só grava na fila; o SMTP não é tocado durante a requisição. """
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages') as send:
+            self.client.post(reverse('signup'), data={
+                'email': 'new@test.com', 'password1': 'testpassword123', 'password2': 'testpassword123'})
+        send.assert_not_called()
+        queued = OutboundEmail.objects.get(to_email='new@test.com')
+        self.assertEqual(queued.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['new@test.com'])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboundEmail.Status.SENT)
+
+    def test_repeated_resend_clicks_are_deduplicated(self):
+        """ Testa que vários cliques em "reenviar" geram um único e-mail pendente. """
+        for _ in range(3):
+            self.client.post(self.resend_url)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING).count(), 1)
+        send_queued_emails()
+        self.assertEqual(len(mail.outbox), 1)
+        # Depois de enviado, um novo clique volta a enfileirar
+        self.client.post(self.resend_url)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.Status.PENDING).count(), 1)
+
+    def test_batch_reuses_one_connection(self):
+        """ Testa que o lote inteiro é enviado por uma única conexão. """
+        for i in range(5):
+            enqueue_email('Assunto', 'Corpo', f'user{i}@test.com')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as open_connection:
+            self.assertEqual(send_queued_emails(batch_size=10), (5, 0))
+        open_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_failures_are_retried_with_backoff_then_abandoned(self):
+        """ Testa o backoff exponencial e a desistência após o número máximo de tentativas. """
+        queued = enqueue_email('Assunto', 'Corpo', 'fail@test.com')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=OSError('SMTP fora do ar')):
+            for attempt in range(1, mail_queue.MAX_ATTEMPTS + 1):
+                OutboundEmail.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now())
+                self.assertEqual(send_queued_emails(), (0, 1))
+                queued.refresh_from_db()
+                self.assertEqual(queued.attempts, attempt)
+                if attempt < mail_queue.MAX_ATTEMPTS:
+                    self.assertEqual(queued.status, OutboundEmail.Status.PENDING)
+                    self.assertGreater(queued.next_attempt_at, timezone.now() + mail_queue.backoff(attempt)
+                                       - timedelta(seconds=5))
+        self.assertEqual(queued.status, OutboundEmail.Status.FAILED)
+        self.assertIn('SMTP fora do ar', queued.last_error)
+        # Mensagens com falha ou ainda em espera não são pegas de novo
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+    def test_password_reset_keeps_sender_and_html_alternative(self):
+        """ Testa que o reset de senha enfileira o remetente e a versão em HTML pedidos. """
+        form = CustomPasswordResetForm(data={'email': 'queue@test.com'})
+        self.inactive_user.is_active = True
+        self.inactive_user.save()
+        self.assertTrue(form.is_valid())
+        form.save(
+            domain_override='testserver', from_email='suporte@growplant.test',
+            html_email_template_name='registration/password_reset_email.html',
+        )
+        queued = OutboundEmail.objects.get(to_email='queue@test.com')
+        self.assertEqual(queued.from_email, 'suporte@growplant.test')
+        self.assertTrue(queued.html_body)
+
+        send_queued_emails()
+        sent = mail.outbox[0]
+        self.assertEqual(sent.from_email, 'suporte@growplant.test')
+        self.assertEqual(sent.alternatives[0][1], 'text/html')
+
+    def test_worker_command_with_file_backend(self):
+        """ Testa o comando do worker com o backend de arquivos. """
+        enqueue_email('Assunto', 'Corpo do e-mail', 'file@test.com')
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend', EMAIL_FILE_PATH=directory):
+            call_command('send_queued_mail', stdout=io.StringIO())
+            files = os.listdir(directory)
+            self.assertEqual(len(files), 1)
+            with open(os.path.join(directory, files[0])) as handle:
+                self.assertIn('file@test.com', handle.read())
+
+
+class TestRateLimit(TestCase):
+
+    def setUp(self):
+        ratelimit.get_store().clear()
+        self.user = CustomUser.objects.create_user(email='limited@test.com', password='password123')
+
+    def test_sliding_window_counts_previous_window(self):
+        """ Testa se a janela anterior ainda pesa no início da janela seguinte. """
+        store = ratelimit.LocalStore()
+        for _ in range(3):
+            self.assertTrue(ratelimit.hit(store, 'k', limit=3, window=60, now=110)[0])
+        allowed, retry_after = ratelimit.hit(store, 'k', limit=3, window=60, now=110)
+        self.assertFalse(allowed)
+        self.assertEqual(retry_after, 11)
+        # 3 requisições da janela anterior ainda pesam 3 * (1 - 5/60) no início da próxima
+        self.assertFalse(ratelimit.hit(store, 'k', limit=3, window=60, now=125)[0])
+        # Duas janelas depois, o contador recomeça do zero
+        self.assertTrue(ratelimit.hit(store, 'k', limit=3, window=60, now=245)[0])
+
+    def test_local_store_prunes_stale_keys(self):
+        """ Testa se o armazenamento local não cresce além de max_keys. """
+        store = ratelimit.LocalStore(max_keys=10)
+        for index in range(50):
+            ratelimit.hit(store, f'key{index}', limit=5, window=60, now=index * 120)
+        self.assertLessEqual(len(store._counters), 10)
+
+    def test_local_store_eviction_keeps_active_limits(self):
+        """ Testa se trocar de e-mail a cada tentativa não zera o limite da chave atacada. """
+        store = ratelimit.LocalStore(max_keys=10)
+        for _ in range(3):
+            ratelimit.hit(store, 'login:email:alvo@test.com', limit=3, window=300, now=10)
+        for index in range(100):
+            ratelimit.hit(store, f'login:email:rotativo{index}@test.com', limit=3, window=300, now=10)
+            if index % 5 == 0:
+                self.assertFalse(ratelimit.hit(store, 'login:email:alvo@test.com', limit=3, window=300, now=10)[0])
+        self.assertLessEqual(len(store._counters), 10)
+
+    def test_login_over_limit_returns_429_without_hashing(self):
+        """ Testa se o login acima do limite por e-mail é recusado antes do check_password. """
+        limit, _ = ratelimit.DEFAULT_RATE_LIMITS['login']['email']
+        data = {'email': self.user.email, 'password': 'wrong'}
+        for _ in range(limit):
+            self.assertEqual(self.client.post(reverse('login'), data).status_code, 200)
+        with mock.patch.object(CustomUser, 'check_password') as check_password, \
+                self.assertNumQueries(0):
+            response = self.client.post(reverse('login'), data)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertTemplateUsed(response, 'registration/too_many_attempts.html')
+        check_password.assert_not_called()
+
+    def test_email_limit_is_case_insensitive(self):
+        """ Testa se variar maiúsculas no e-mail não contorna o limite. """
+        limit, _ = ratelimit.DEFAULT_RATE_LIMITS['login']['email']
+        for index in range(limit):
+            self.client.post(reverse('login'), {'email': self.user.email.upper() if index % 2 else self.user.email,
+                                                'password': 'wrong'})
+        response = self.client.post(reverse('login'), {'email': 'LIMITED@test.com', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 429)
+
+    def test_ip_limit_blocks_many_emails_from_one_address(self):
+        """ Testa o limite por IP quando o atacante troca de e-mail a cada tentativa. """
+        limit, _ = ratelimit.DEFAULT_RATE_LIMITS['login']['ip']
+        for index in range(limit):
+            self.client.post(reverse('login'), {'email': f'victim{index}@test.com', 'password': 'x'})
+        response = self.client.post(reverse('login'), {'email': 'other@test.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        # Outro IP continua podendo entrar
+        response = self.client.post(reverse('login'), {'email': self.user.email, 'password': 'password123'},
+                                    REMOTE_ADDR='198.51.100.7')
+        self.assertRedirects(response, reverse('home'))
+
+    def test_get_requests_are_not_limited(self):
+        """ Testa que só os POSTs contam para o limite. """
+        for _ in range(50):
+            self.assertEqual(self.client.get(reverse('login')).status_code, 200)
+
+    def test_password_reset_is_limited_per_email(self):
+        """ Testa se pedidos repetidos de redefinição para o mesmo e-mail são recusados. """
+        limit, _ = ratelimit.DEFAULT_RATE_LIMITS['password_reset']['email']
+        for _ in range(limit):
+            self.client.post(reverse('password_reset'), {'email': self.user.email})
+        response = self.client.post(reverse('password_reset'), {'email': self.user.email})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(OutboundEmail.objects.count(), 1)  # as anteriores foram deduplicadas na fila
+
+    @override_settings(GROWPLANT_RATE_LIMITS_ENABLED=False)
+    def test_limits_can_be_disabled(self):
+        """ Testa se GROWPLANT_RATE_LIMITS_ENABLED=False desliga o limitador. """
+        for _ in range(10):
+            response = self.client.post(reverse('login'), {'email': self.user.email, 'password': 'wrong'})
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        GROWPLANT_RATE_LIMIT_CACHE='ratelimit',
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'ratelimit': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'},
+        },
+    )
+    def test_cache_store_shares_counters(self):
+        """ Testa o limitador sobre um cache do Django, compartilhável entre processos. """
+        store = ratelimit.get_store()
+        self.assertIsInstance(store, ratelimit.CacheStore)
+        store.clear()
+        results = [ratelimit.hit(store, 'shared', limit=2, window=60, now=30)[0] for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        # Uma segunda instância vê os mesmos contadores
+        self.assertFalse(ratelimit.hit(ratelimit.CacheStore('ratelimit'), 'shared', 2, 60, now=31)[0])
+
+        # clear() zera só os contadores, não o resto do alias
+        store.cache.set('other:key', 'kept')
+        store.clear()
+        self.assertTrue(ratelimit.hit(store, 'shared', limit=2, window=60, now=32)[0])
+        self.assertEqual(store.cache.get('other:key'), 'kept')
+
+
+class TestRouteBudgets(RouteBudgetMixin, TestCase):
+    """
+    Regressão de desempenho: cada rota de user.urls tem um orçamento fixo
+    de consultas SQL e um teto de tempo de resposta.
+    """
+    # nome da rota -> (consultas, status esperado, requer login)
+    budgets = {
+        'signup': (0, 200, False),
+        'activate': (2, 302, False),               # busca e ativa o usuário
+        'login': (0, 200, False),
+        'logout': (4, 302, True),                 # sessão, usuário, exclusão e nova sessão
+        'resend_activation': (1, 200, False),
+        'profile_display': (2, 200, True),
+        'profile_edit': (2, 200, True),
+        'password_change': (2, 200, True),
+        'password_change_done': (2, 200, True),
+        'password_reset': (0, 200, False),
+        'password_reset_done': (0, 200, False),
+        'password_reset_confirm': (5, 302, False),  # usuário + grava o token na sessão
+        'password_reset_complete': (0, 200, False),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='active@test.com', password='password123')
+        cls.inactive_user = CustomUser.objects.create_user(
+            email='inactive@test.com', password='password123', is_active=False)
+        cls.pending_user = CustomUser.objects.create_user(
+            email='pending@test.com', password='password123', is_active=False)
+        # Volume de fundo: as rotas não podem depender do número de usuários
+        CustomUser.objects.bulk_create([
+            CustomUser(email=f'user{i}@test.com', password='!') for i in range(500)
+        ])
+
+    def url_for(self, name):
+        if name == 'activate':
+            return reverse(name, kwargs={
+                'uidb64': urlsafe_base64_encode(force_bytes(self.inactive_user.pk)),
+                'token': account_activation_token.make_token(self.inactive_user),
+            })
+        if name == 'resend_activation':
+            return reverse(name, kwargs={'emailb64': urlsafe_base64_encode(force_bytes(self.pending_user.email))})
+        if name == 'password_reset_confirm':
+            return reverse(name, kwargs={
+                'uidb64': urlsafe_base64_encode(force_bytes(self.user.pk)),
+                'token': default_token_generator.make_token(self.user),
+            })
+        return reverse(name)
+
+    def test_every_route_has_a_budget(self):
+        """ Testa se nenhuma rota de user.urls ficou sem orçamento. """
+        self.assertEqual(set(self.budgets), route_names(urls.urlpatterns))
+
+    def test_routes_stay_within_query_and_time_budget(self):
+        """ Testa o número de consultas e o tempo de resposta de cada rota. """
+        for name, (queries, status, requires_login) in self.budgets.items():
+            with self.subTest(route=name):
+                self.client.logout()
+                if requires_login:
+                    self.client.force_login(self.user)
+                # Rotas que mudam estado (ativar, sair) não podem ser aquecidas com uma chamada extra
+                warmup = name not in ('activate', 'logout')
+                self.assertRouteWithinBudget(name, self.url_for(name), queries,
+                                             expected_status=status, warmup=warmup)
+
@@ -1,6 +1,7 @@
 from django.urls import path
 from django.contrib.auth import views as auth_views
 from . import views
+from .ratelimit import rate_limited
 from .forms import CustomPasswordResetForm, CustomSetPasswordForm
 
 urlpatterns = [
@@ -17,14 +18,14 @@ urlpatterns = [
 
     path('password_change/',
          auth_views.PasswordChangeView.as_view(
-             template_name='registration\\password_change_form.html',
+             template_name='registration/password_change_form.html',
              success_url='/user/password_change/done/'  # URL para redirecionar após sucesso
          ),
          name='password_change'),
 
     path('password_change/done/',
          auth_views.PasswordChangeDoneView.as_view(
-             template_name='registration\\password_change_done.html'
+             template_name='registration/password_change_done.html'
          ),
          name='password_change_done'),
 
@@ -32,21 +33,25 @@ urlpatterns = [
 
     # 1. Página para solicitar a redefinição de senha (onde o usuário digita o e-mail)
     path('password_reset/',
-         auth_views.PasswordResetView.as_view(template_name='registration\\password_reset_form.html', form_class=CustomPasswordResetForm),
+         rate_limited('password_reset')(
+             auth_views.PasswordResetView.as_view(template_name='registration/password_reset_form.html', form_class=CustomPasswordResetForm)
+         ),
          name='password_reset'),
 
     # 2. Página de sucesso após o envio do e-mail de redefinição
     path('password_reset/done/',
-         auth_views.PasswordResetDoneView.as_view(template_name='registration\\password_reset_done.html'),
+         auth_views.PasswordResetDoneView.as_view(template_name='registration/password_reset_done.html'),
          name='password_reset_done'),
 
     # 3. O link enviado por e-mail, que leva à página para digitar a nova senha
     path('reset/<uidb64>/<token>/',
-         auth_views.PasswordResetConfirmView.as_view(template_name='registration\\password_reset_confirm.html', form_class=CustomSetPasswordForm),
+         rate_limited('password_reset_confirm')(
+             auth_views.PasswordResetConfirmView.as_view(template_name='registration/password_reset_confirm.html', form_class=CustomSetPasswordForm)
+         ),
          name='password_reset_confirm'),
 
     # 4. Página de sucesso após a senha ter sido redefinida
     path('reset/done/',
-         auth_views.PasswordResetCompleteView.as_view(template_name='registration\\password_reset_complete.html'),
+         auth_views.PasswordResetCompleteView.as_view(template_name='registration/password_reset_complete.html'),
          name='password_reset_complete'),
 ]
\ No newline at end of file
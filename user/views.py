@@ -9,13 +9,15 @@ from django.contrib.sites.shortcuts import get_current_site
 from django.utils.encoding import force_bytes, force_str
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.template.loader import render_to_string
-from django.core.mail import EmailMessage
 
 from .forms import CustomUserCreationForm, LoginForm, UserProfileForm
+from .mail import enqueue_email
+from .ratelimit import rate_limited
 from .models import CustomUser
 from .tokens import account_activation_token
 
 
+@rate_limited('signup')
 def signup(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -26,15 +28,15 @@ def signup(request):
 
             current_site = get_current_site(request)
             mail_subject = 'Ative sua conta Growplant.'
-            message = render_to_string('registration\\acc_active_email.html', {
+            message = render_to_string('registration/acc_active_email.html', {
                 'user': user,
                 'domain': current_site.domain,
                 'uid': urlsafe_base64_encode(force_bytes(user.pk)),
                 'token': account_activation_token.make_token(user),
             })
             to_email = form.cleaned_data.get('email')
-            email = EmailMessage(mail_subject, message, to=[to_email])
-            email.send()
+            # O envio pelo SMTP fica com o worker da fila (manage.py send_queued_mail)
+            enqueue_email(mail_subject, message, to_email, dedup_key=f'activation:{user.pk}')
             messages.success(request, 'Um email de confirmação foi enviado para seu email. Favor ativar seu email no link para fazer o login.')
             return redirect('login')
         else:
@@ -49,7 +51,7 @@ def signup(request):
                 pass  # Se o usuário não existe, apenas deixamos a página recarregar com os erros do formulário
     else:
         form = CustomUserCreationForm()
-    return render(request, 'registration\\signup.html', {'form': form})
+    return render(request, 'registration/signup.html', {'form': form})
 
 
 def activate(request, uidb64, token):
@@ -91,20 +93,22 @@ def resend_activation_view(request, emailb64):
     if request.method == 'POST':
         current_site = get_current_site(request)
         mail_subject = 'Ative sua conta Growplant.'
-        message = render_to_string('registration\\acc_active_email.html', {
+        message = render_to_string('registration/acc_active_email.html', {
             'user': user,
             'domain': current_site.domain,
             'uid': urlsafe_base64_encode(force_bytes(user.pk)),
             'token': account_activation_token.make_token(user),
         })
-        email_message = EmailMessage(mail_subject, message, to=[user.email])
-        email_message.send()
+        # Cliques repetidos enquanto a mensagem ainda está na fila não geram e-mails duplicados
+        enqueue_email(mail_subject, message, user.email, dedup_key=f'activation:{user.pk}')
         messages.success(request, 'Um novo e-mail de ativação foi enviado com sucesso.')
         return redirect('resend_activation', emailb64=emailb64)
 
-    return render(request, 'registration\\resend_activation.html', {'email': user.email})
+    return render(request, 'registration/resend_activation.html', {'email': user.email})
 
 
+# O limite por IP e por e-mail é aplicado antes do check_password (PBKDF2)
+@rate_limited('login')
 def login_view(request):
     if request.method == 'POST':
         form = LoginForm(request.POST)
@@ -128,7 +132,7 @@ def login_view(request):
             messages.error(request, 'Por favor, preencha todos os campos corretamente.')
     else:
         form = LoginForm()
-    return render(request, 'registration\\login.html', {'form': form})
+    return render(request, 'registration/login.html', {'form': form})
 
 
 @login_required
@@ -148,7 +152,7 @@ def profile_display_view(request):
     View para apenas EXIBIR as informações do perfil.
     """
     # O objeto 'user' já está disponível em templates de views protegidas
-    return render(request, 'registration\\profile_display.html')
+    return render(request, 'registration/profile_display.html')
 
 
 @login_required
@@ -167,4 +171,4 @@ def profile_edit_view(request):
         form = UserProfileForm(instance=request.user)
 
     # Renomeamos o template para ficar mais claro
-    return render(request, 'registration\\profile_edit.html', {'form': form})
\ No newline at end of file
+    return render(request, 'registration/profile_edit.html', {'form': form})
\ No newline at end of file